@@ -1,9 +1,14 @@
 # main.py
+import time
+_T_START = time.perf_counter() # 启动计时起点，尽量早于其他导入
 import sys
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton,
                                QVBoxLayout, QWidget, QStackedWidget, QSizePolicy)
-from widgets.yolo_data_yaml.yolo_data_yaml import YoloDataYamlWidget
-from widgets.display_train_info.view_combine import viewr_photo_csv
+# 各个工具页在第一次打开时才导入，窗口无需等它们（以及 yaml 等依赖）加载完就能显示
+
+# 启动时不应被导入的重量级模块，测量模式下会检查
+HEAVY_MODULES = ("torch", "ultralytics", "yaml", "cv2")
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -50,12 +55,14 @@ class MainWindow(QMainWindow):
     # ---------- 原有逻辑 ----------
     def show_yaml_widget(self):
         if not hasattr(self, '_yaml_widget'):
+            from widgets.yolo_data_yaml.yolo_data_yaml import YoloDataYamlWidget
             self._yaml_widget = YoloDataYamlWidget()
             self.stack.addWidget(self._yaml_widget)
         self.stack.setCurrentWidget(self._yaml_widget)
 
     def show_view_widget(self):
         if not hasattr(self, '_view_widget'):
+            from widgets.display_train_info.view_combine import viewr_photo_csv
             self._view_widget = viewr_photo_csv()
             self.stack.addWidget(self._view_widget)
         self.stack.setCurrentWidget(self._view_widget)
@@ -63,8 +70,28 @@ class MainWindow(QMainWindow):
     def go_home(self):
         self.stack.setCurrentIndex(0)
 
+def report_startup(t_imported: float, t_window: float):
+    """
+    启动耗时测量：在事件循环处理完第一批事件（窗口首次绘制）后打印各阶段耗时，
+    以及启动期间已被导入的重量级模块，然后退出。用法: python Main_Program.py --startup-time
+    """
+    t_painted = time.perf_counter()
+    print(f"[startup] imports   {(t_imported - _T_START) * 1000:8.1f} ms")
+    print(f"[startup] window    {(t_window - t_imported) * 1000:8.1f} ms")
+    print(f"[startup] 1st paint {(t_painted - t_window) * 1000:8.1f} ms")
+    print(f"[startup] total     {(t_painted - _T_START) * 1000:8.1f} ms")
+    loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+    print(f"[startup] heavy modules loaded: {', '.join(loaded) if loaded else 'none'}")
+    QApplication.quit()
+
+
 if __name__ == '__main__':
+    measure_startup = "--startup-time" in sys.argv
+    t_imported = time.perf_counter()
     app = QApplication(sys.argv)
     w = MainWindow()
     w.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    if measure_startup:
+        t_window = time.perf_counter()
+        QTimer.singleShot(0, lambda: report_startup(t_imported, t_window))
+    sys.exit(app.exec())
@@ -1,16 +1,75 @@
 #config.py
+from functools import lru_cache
 from pathlib import Path
-import torch
 ROOT_DIR = Path(__file__).parent
 RUNS_DIR = ROOT_DIR / 'runs'
-DEVICE = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
-DEVICE_NAME = torch.cuda.get_device_name(DEVICE) if DEVICE.type == 'cuda' else 'CPU'
+
+
+# DEVICE / DEVICE_NAME 在第一次被访问时才导入 torch 并检测 CUDA，界面启动不必等待 torch 加载
+@lru_cache(maxsize=None)
+def _detect_device():
+    import torch
+    device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
+    name = torch.cuda.get_device_name(device) if device.type == 'cuda' else 'CPU'
+    return device, name
+
+
+def __getattr__(name):
+    if name == 'DEVICE':
+        return _detect_device()[0]
+    if name == 'DEVICE_NAME':
+        return _detect_device()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 #项目定义
 PROGECT_NAME = 'my_project'
 DATASET_YAML_PATH = ROOT_DIR / 'resource' / "datasets"/'data.yaml'
 INITIAL_MODEL_WEIGHT = ROOT_DIR/"resource"/"yolo11n.pt"
 TRAIN_RUN_NAME,VALIDATION_RUN_NAME = f'{PROGECT_NAME}_train',f'{PROGECT_NAME}_val'
 PLAY_INTERVAL_MS =10
+# 摄像头流水线：每个阶段的队列深度与队列满时的策略 ('drop_oldest' / 'latest_only' / 'block')
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_DROP_POLICY = 'latest_only'
+# 摄像头采集复用的帧缓冲区个数（应大于流水线中同时在途的帧数，不足时会自动增长）
+FRAME_RING_SIZE = 8
+# 性能 HUD：启动时是否显示（运行时按 F12 切换），Ctrl+Shift+D 导出耗时记录到 PERF_TRACE_DIR
+PERF_HUD = False
+PERF_TRACE_DIR = RUNS_DIR / 'perf'
+# 检测结果表格的刷新间隔（毫秒），新结果按此频率批量插入
+TABLE_REFRESH_MS = 100
+# 检测结果边检测边写入磁盘（csv / jsonl / parquet），表格只保留最近 TABLE_MAX_ROWS 行（0 表示不限）
+RESULT_STREAM_ENABLED = True
+RESULT_STREAM_FORMAT = 'csv'
+RESULT_STREAM_DIR = RUNS_DIR / 'detections'
+TABLE_MAX_ROWS = 100000
+# 幻灯片模式：提前解码的图片张数，已解码图片缓存上限（MB）
+SLIDESHOW_PREFETCH = 4
+SLIDESHOW_CACHE_MB = 512
+# 大尺寸 JPEG 按推理尺寸/显示尺寸降分辨率解码（IMREAD_REDUCED_COLOR_2/4/8），检测框仍映射回原图坐标
+REDUCED_DECODE = True
+# 摄像头/视频流来源：整数为本地摄像头编号，字符串为 RTSP/HTTP 地址或视频文件；多于一路时以网格视图并发推理
+CAMERA_SOURCES = [0]
+# 进程内缓存的已加载模型个数（来回切换模型时无需重新加载），以及加载后是否用空白帧预热
+MODEL_CACHE_SIZE = 3
+MODEL_WARMUP = True
+# 推理后端：'pytorch' / 'onnx' / 'openvino'，后两者首次使用时由 .pt 自动导出并缓存在权重旁边
+INFER_BACKEND = 'pytorch'
+# 多进程推理：>0 时启动该数量的推理进程（各持一份模型，帧经共享内存传递），0 表示在界面进程内推理
+INFER_PROCESSES = 0
+# 跟踪模式（视频/摄像头）的默认开关：开启后目标有稳定的 ID，结果表每条轨迹只记录一行
+TRACKING_ENABLED = False
+# 跟踪模式下每隔多少帧运行一次检测器，中间的帧由跟踪器外推检测框
+TRACK_DETECT_EVERY = 3
+# 运动门控（视频/摄像头/多路视频源）：画面相对上次推理的帧几乎没有变化时跳过推理，复用上次的检测结果
+MOTION_GATE_ENABLED = False
+# 缩小后的灰度图中发生变化的像素比例达到该值才重新推理
+MOTION_GATE_THRESHOLD = 0.01
+# 连续跳过这么多帧后强制推理一次
+MOTION_GATE_MAX_SKIP = 50
+# 切块推理（detect.py --tile）：超大图像切成该尺寸的重叠方块分别推理，再跨块合并
+TILE_SIZE = 640
+# 相邻切块的重叠比例，应大于待检测目标尺寸占切块的比例
+TILE_OVERLAP = 0.2
 TITLE = 'YoloV8 system'
 WINDOWS_SIZE = (800, 600)
 SHOULD_HIDE_TITLE_BAR = True
@@ -1,13 +1,242 @@
 import sys
 import os
+import argparse
+import glob
+import time
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'widgets', 'display_apply'))
 
-from display_apply import BgMainWindow, DisplayApp
-from PySide6.QtWidgets import QApplication
 
-if __name__ == "__main__":
+def run_gui():
+    from display_apply import BgMainWindow, DisplayApp
+    from PySide6.QtWidgets import QApplication
+
     app = QApplication(sys.argv)
     window = DisplayApp()
     window = BgMainWindow(window)
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
+
+
+# ---------------- 无界面批量检测 ----------------
+# 以下代码不导入 PySide6，可在服务器上直接运行：
+#   python detect.py resource/input/imgs "dump/**/*.jpg" a.mp4 -o out.parquet --batch-size 16 --workers 8
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    from config import MODEL_STORE_PATH, TILE_SIZE, TILE_OVERLAP
+
+    parser = argparse.ArgumentParser(description="YOLO 批量检测（无界面）。不带参数运行时启动图形界面。")
+    parser.add_argument("inputs", nargs="+", help="图片/视频文件、文件夹或通配符（如 'data/**/*.jpg'）")
+    parser.add_argument("-w", "--weights", default=str(Path(MODEL_STORE_PATH) / "best.pt"), help="模型权重路径")
+    parser.add_argument("-o", "--output", default="detections.csv", help="输出文件路径")
+    parser.add_argument("-f", "--format", choices=["csv", "jsonl", "parquet"], default=None,
+                        help="输出格式，默认根据输出文件后缀推断")
+    parser.add_argument("-b", "--batch-size", type=int, default=8, help="每次送入模型的帧数")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="图片解码线程数")
+    parser.add_argument("-r", "--recursive", action="store_true", help="递归搜索文件夹")
+    parser.add_argument("--conf", type=float, default=0.25, help="置信度阈值")
+    parser.add_argument("--iou", type=float, default=0.45, help="NMS IOU 阈值")
+    parser.add_argument("--device", default="cpu", help="推理设备，如 cpu / cuda:0")
+    parser.add_argument("-p", "--procs", type=int, default=0,
+                        help="推理进程数（各持一份模型，帧经共享内存传递），0 表示在当前进程推理")
+    parser.add_argument("--backend", choices=["pytorch", "onnx", "openvino"], default="pytorch",
+                        help="推理后端，onnx / openvino 首次使用时自动由 .pt 导出")
+    parser.add_argument("--tile", action="store_true",
+                        help="图片按原分辨率切块推理并跨块合并（适合 8K 航拍等大图中的小目标），视频不受影响")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="切块边长（像素）")
+    parser.add_argument("--tile-overlap", type=float, default=TILE_OVERLAP, help="相邻切块的重叠比例")
+    return parser.parse_args(argv)
+
+
+def expand_inputs(inputs: List[str], recursive: bool) -> Tuple[List[Path], List[Path]]:
+    """把文件、文件夹、通配符展开为 (图片列表, 视频列表)，保持输入顺序并去重。"""
+    from functions.yolo_api import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
+    from functions.image_source import iter_image_paths
+
+    images, videos, seen = [], [], set()
+
+    def add(p: Path):
+        if p in seen:
+            return
+        ext = p.suffix.lower()
+        if ext in IMAGE_EXTENSIONS:
+            images.append(p)
+        elif ext in VIDEO_EXTENSIONS:
+            videos.append(p)
+        else:
+            return
+        seen.add(p)
+
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            # 惰性遍历目录，不把整棵目录树一次性排序进内存
+            for f in iter_image_paths(p, IMAGE_EXTENSIONS | VIDEO_EXTENSIONS, recursive):
+                add(f)
+        elif p.is_file():
+            add(p)
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                print(f"[警告] 未找到匹配的输入: {item}")
+            for m in matches:
+                if Path(m).is_file():
+                    add(Path(m))
+    return images, videos
+
+
+def iter_image_frames(paths: List[Path], workers: int, target_size: int) -> Iterator[Tuple[str, int, object, float, float]]:
+    """在线程池中并行解码图片（大 JPEG 降分辨率解码），按输入顺序产出，内存中的图片数有上限。"""
+    from functions.image_decode import decode_image
+    from functions.image_source import iter_parallel_ordered
+
+    def timed_decode(path: Path):
+        t0 = time.perf_counter()
+        try:
+            img, scale = decode_image(path, target_size)
+        except Exception as e:
+            print(f"[警告] 读取失败 {path}: {e}")
+            img, scale = None, 1.0
+        return img, scale, (time.perf_counter() - t0) * 1000
+
+    for p, (img, scale, ms) in iter_parallel_ordered(paths, timed_decode, workers=workers):
+        if img is None:
+            print(f"[警告] 跳过无法读取的图片: {p}")
+            continue
+        yield str(p), 0, img, ms, scale
+
+
+def iter_video_frames(paths: List[Path]) -> Iterator[Tuple[str, int, object, float, float]]:
+    import cv2
+
+    for p in paths:
+        cap = cv2.VideoCapture(str(p))
+        if not cap.isOpened():
+            print(f"[警告] 无法打开视频: {p}")
+            continue
+        try:
+            idx = 0
+            while True:
+                t0 = time.perf_counter()
+                ret, frame = cap.read()
+                ms = (time.perf_counter() - t0) * 1000
+                if not ret:
+                    break
+                yield str(p), idx, frame, ms, 1.0
+                idx += 1
+        finally:
+            cap.release()
+
+
+def _latency_line(name: str, values: List[float]) -> str:
+    import numpy as np
+
+    if not values:
+        return f"  {name:<8} -"
+    arr = np.asarray(values)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return f"  {name:<8} mean {arr.mean():7.2f} ms | p50 {p50:7.2f} | p95 {p95:7.2f} | p99 {p99:7.2f}"
+
+
+def run_headless(args: argparse.Namespace) -> int:
+    from itertools import chain
+    from functions.yolo_api import YoloAPI, rescale_result
+    from functions.result_sink import open_sink
+
+    images, videos = expand_inputs(args.inputs, args.recursive)
+    if not images and not videos:
+        print("[错误] 没有找到任何可处理的图片或视频。")
+        return 1
+    print(f"待处理: {len(images)} 张图片, {len(videos)} 个视频")
+
+    if args.procs > 0:
+        from functions.process_pool import ProcessInferencePool
+        yolo = ProcessInferencePool(args.weights, workers=args.procs, device=args.device,
+                                    backend=args.backend, batch_size=args.batch_size).start()
+    else:
+        yolo = YoloAPI.create_instance(args.weights, device=args.device, backend=args.backend)
+        if yolo is None:
+            return 1
+
+    # 切块模式下图片单独按原分辨率逐张处理，不进入下面的整图批次
+    tiled_images, images = (images, []) if args.tile else ([], images)
+    frames = chain(iter_image_frames(images, args.workers, yolo.imgsz), iter_video_frames(videos))
+    batch_size = max(1, args.batch_size)
+    timings = {"decode": [], "infer": [], "write": []}
+    n_frames = n_dets = 0
+
+    t_start = time.perf_counter()
+    # infer 一项统一取 Ultralytics 报告的单帧模型耗时（预处理 + 推理 + 后处理），各路径之间可比
+    try:
+        with open_sink(args.output, args.format) as sink:
+            def write_result(source, idx, scale, result):
+                nonlocal n_frames, n_dets
+                t1 = time.perf_counter()
+                dets = rescale_result(result, scale)["detections"]
+                sink.write(source, idx, dets)
+                timings["write"].append((time.perf_counter() - t1) * 1000)
+                n_frames += 1
+                n_dets += len(dets)
+
+            if tiled_images:
+                from functions.tiling import infer_tiled
+
+                for path in tiled_images:
+                    t0 = time.perf_counter()
+                    image = YoloAPI.read_image(path)
+                    timings["decode"].append((time.perf_counter() - t0) * 1000)
+                    if image is None:
+                        print(f"[警告] 跳过无法读取的图片: {path}")
+                        continue
+                    # 多进程时各批切块分给多个推理进程并行处理
+                    result = next(infer_tiled(yolo, image, args.tile_size, args.tile_overlap, args.conf, args.iou,
+                                              batch_size=batch_size, workers=args.workers, stream=False))
+                    timings["infer"].append(sum(result["speed"].values())) # 所有切块的模型耗时之和
+                    print(f"{path.name}: {result['tiles_total']} 块, {len(result['detections'])} 个目标")
+                    write_result(str(path), 0, 1.0, result)
+
+            if args.procs > 0:
+                # 多进程：持续把帧送进共享内存槽位，结果按输入顺序取回
+                for (source, idx, _, decode_ms, scale), result in yolo.imap(frames, lambda item: item[2],
+                                                                            args.conf, args.iou):
+                    timings["decode"].append(decode_ms)
+                    timings["infer"].append(sum(result["speed"].values()))
+                    write_result(source, idx, scale, result)
+            else:
+                batch: list = []
+
+                def flush_batch():
+                    results = yolo.infer_batch([b[2] for b in batch], args.conf, args.iou, batch_size=len(batch))
+                    for (source, idx, _, _, scale), result in zip(batch, results):
+                        timings["infer"].append(sum(result["speed"].values()))
+                        write_result(source, idx, scale, result)
+                    batch.clear()
+
+                for item in frames:
+                    timings["decode"].append(item[3])
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        flush_batch()
+                if batch:
+                    flush_batch()
+    finally:
+        if args.procs > 0:
+            yolo.close()
+    elapsed = time.perf_counter() - t_start
+
+    print("\n" + "=" * 15 + " 批量检测完成 " + "=" * 15)
+    print(f"帧数: {n_frames}, 检测框: {n_dets}, 结果已写入: {args.output}")
+    print(f"总耗时: {elapsed:.2f} s, 吞吐量: {n_frames / elapsed if elapsed > 0 else 0:.2f} images/s")
+    print("各阶段单帧延迟:")
+    for name, values in timings.items():
+        print(_latency_line(name, values))
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        run_gui()
+    else:
+        sys.exit(run_headless(parse_args(sys.argv[1:])))
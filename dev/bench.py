@@ -0,0 +1,359 @@
+# bench.py
+"""
+非交互式性能基准测试。
+
+自动生成合成图片/视频（与 test_api.py 的 setup_test_environment 同样的方式），
+在多种分辨率、检测框数量下测量 YoloAPI.infer、draw_boxes、MediaHandler._frame_to_pixmap、
+检测结果导出，以及无界面的 采集 → 推理 → 渲染 流水线（FramePipeline + PerfTrace 分阶段计时）的耗时，
+输出 p50/p95/p99 延迟与吞吐量的 JSON，方便在版本之间对比。
+
+用法:
+    python dev/bench.py -o bench.json
+    python dev/bench.py --weights resource/best.pt --repeat 50
+    python dev/bench.py --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "widgets" / "display_apply"))
+sys.path.insert(0, str(ROOT_DIR))
+
+from functions.yolo_api import Detections  # noqa: E402
+
+RESOLUTIONS = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+BOX_COUNTS = (0, 10, 100, 500)
+CLASS_NAMES = {i: f"class_{i}" for i in range(10)}
+
+
+# ---------------- 合成数据 ----------------
+
+def make_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """生成带噪声和文字的合成图片，避免全黑图像让解码/缩放耗时失真。"""
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    cv2.putText(img, f"Bench {width}x{height}", (width // 8, height // 2),
+                cv2.FONT_HERSHEY_SIMPLEX, max(1.0, width / 640), (255, 255, 255), 2)
+    return img
+
+
+def make_detections(n: int, width: int, height: int, seed: int = 0) -> Detections:
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, width * 0.9, n)
+    y1 = rng.uniform(0, height * 0.9, n)
+    w = rng.uniform(10, width * 0.1, n)
+    h = rng.uniform(10, height * 0.1, n)
+    xyxy = np.stack([x1, y1, np.minimum(x1 + w, width - 1), np.minimum(y1 + h, height - 1)], axis=1)
+    return Detections(xyxy.astype(np.float32), rng.uniform(0.25, 1.0, n).astype(np.float32),
+                      rng.integers(0, len(CLASS_NAMES), n).astype(np.int32), CLASS_NAMES)
+
+
+def make_video(path: Path, width: int = 640, height: int = 480, fps: int = 20, n_frames: int = 60):
+    """生成一个有移动圆形的测试视频。"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(n_frames):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        cx = int(width / 2 + 100 * np.sin(2 * np.pi * i / (fps * 2)))
+        cy = int(height / 2 + 100 * np.cos(2 * np.pi * i / (fps * 2)))
+        cv2.circle(frame, (cx, cy), 30, (0, 255, 0), -1)
+        cv2.putText(frame, f"Frame: {i + 1}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+
+
+# ---------------- 计时 ----------------
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int, items_per_call: int = 1) -> Dict[str, float]:
+    """运行 fn 若干次并返回延迟分位数（毫秒）与吞吐量（items/s）。"""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = (time.perf_counter() - t0) * 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    total_s = samples.sum() / 1000
+    return {
+        "n": repeat,
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "throughput_per_s": float(repeat * items_per_call / total_s) if total_s > 0 else 0.0,
+    }
+
+
+# ---------------- 各项基准 ----------------
+
+def bench_draw_boxes(resolutions: List[str], repeat: int, warmup: int) -> Dict[str, dict]:
+    from functions.draw_yolo import draw_boxes
+
+    out = {}
+    for res in resolutions:
+        w, h = RESOLUTIONS[res]
+        frame = make_image(w, h)
+        for n in BOX_COUNTS:
+            boxes = make_detections(n, w, h).to_boxes()
+            out[f"{res}/{n}"] = measure(lambda: draw_boxes(frame, boxes), repeat, warmup)
+    return out
+
+
+def bench_frame_to_pixmap(resolutions: List[str], repeat: int, warmup: int) -> Dict[str, dict]:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtGui import QGuiApplication
+    from functions.media_handler import MediaHandler
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])  # noqa: F841
+    out = {}
+    for res in resolutions:
+        frame = make_image(*RESOLUTIONS[res])
+        out[res] = measure(lambda: MediaHandler._frame_to_pixmap(frame), repeat, warmup)
+    return out
+
+
+def bench_export(tmp_dir: Path, repeat: int, warmup: int) -> Dict[str, dict]:
+    from functions.result_sink import open_sink
+
+    out = {}
+    frames_per_call = 100
+    for n in BOX_COUNTS[1:]:
+        dets = make_detections(n, 1920, 1080)
+        for fmt in ("csv", "jsonl"):
+            path = tmp_dir / f"bench.{fmt}"
+
+            def export():
+                with open_sink(path, fmt) as sink:
+                    for i in range(frames_per_call):
+                        sink.write("bench", i, dets)
+
+            out[f"{fmt}/{n}"] = measure(export, max(1, repeat // 10), min(warmup, 1), frames_per_call)
+    return out
+
+
+def bench_infer(weights: str, resolutions: List[str], tmp_dir: Path, repeat: int, warmup: int,
+                backend: str = "pytorch") -> Dict[str, dict]:
+    from functions.yolo_api import YoloAPI
+
+    yolo = YoloAPI.create_instance(weights, device="cpu", backend=backend)
+    if yolo is None:
+        return {}
+    out = {}
+    for res in resolutions:
+        frame = make_image(*RESOLUTIONS[res])
+        out[f"frame/{res}"] = measure(lambda: next(yolo.infer(frame)), repeat, warmup)
+
+    video = tmp_dir / "bench.mp4"
+    n_frames = 60
+    make_video(video, n_frames=n_frames)
+    for batch_size in (1, 8):
+        out[f"video/batch{batch_size}"] = measure(
+            lambda: sum(1 for _ in yolo.infer(str(video), batch_size=batch_size)),
+            max(1, repeat // 10), min(warmup, 1), n_frames)
+    return out
+
+
+def _trace_stats(stats: Dict[str, float], wall_s: float) -> Dict[str, float]:
+    """把 PerfTrace.summary() 的一项转换成与 measure() 相同的字段，便于 --compare 对比。"""
+    return {
+        "n": stats["n"],
+        "mean_ms": stats["mean"],
+        "p50_ms": stats["p50"],
+        "p95_ms": stats["p95"],
+        "throughput_per_s": stats["n"] / wall_s if wall_s > 0 else 0.0,
+    }
+
+
+def run_pipeline(frame: np.ndarray, infer_fn: Callable[[np.ndarray], Detections], n_frames: int,
+                 policy: str, display_size=(1280, 720)) -> Dict[str, dict]:
+    """
+    无界面地跑一遍 采集 → 推理 → 渲染 流水线，返回各阶段耗时与端到端延迟。
+
+    采集端是一个不限速的假视频源（每次复制一帧，模拟解码出新缓冲区）；渲染端在当前线程里
+    像 GUI 定时器一样轮询 get_latest_result()，画框并缩放到显示尺寸后转 RGB。
+    各阶段用全局 TRACE 计时，所以 draw_boxes 等已有埋点也一并统计。
+    """
+    from functions.draw_yolo import draw_boxes
+    from functions.frame_pipeline import FramePipeline
+    from functions.perf_trace import TRACE
+
+    remaining = [n_frames]
+
+    def capture():
+        if remaining[0] <= 0:
+            return None
+        remaining[0] -= 1
+        with TRACE.stage("capture"):
+            return time.perf_counter(), frame.copy()
+
+    def infer(item):
+        captured_at, img = item
+        with TRACE.stage("infer"):
+            return captured_at, img, infer_fn(img)
+
+    TRACE.clear()
+    pipeline = FramePipeline(capture, infer, policy=policy, name="bench")
+    rendered = 0
+    t0 = time.perf_counter()
+    pipeline.start()
+    while not pipeline.drained:
+        item = pipeline.get_latest_result()
+        if item is None:
+            time.sleep(0.001)
+            continue
+        captured_at, img, dets = item
+        with TRACE.stage("render"):
+            shown = draw_boxes(img, dets.to_boxes())
+            shown = cv2.cvtColor(cv2.resize(shown, display_size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+        TRACE.record("latency", (time.perf_counter() - captured_at) * 1000, captured_at)
+        rendered += 1
+    wall_s = time.perf_counter() - t0
+    pipeline.stop()
+
+    out = {name: _trace_stats(s, wall_s) for name, s in TRACE.summary(window_s=wall_s + 1).items()}
+    stats = pipeline.stats()
+    out["pipeline"] = {"n": rendered, "wall_s": wall_s, "captured": stats["captured"],
+                       "inferred": stats["inferred"], "rendered": rendered,
+                       "dropped": stats["capture_queue"]["dropped"] + stats["render_queue"]["dropped"],
+                       "throughput_per_s": rendered / wall_s if wall_s > 0 else 0.0}
+    TRACE.clear()
+    return out
+
+
+def bench_pipeline(resolutions: List[str], repeat: int, warmup: int, weights: str = None,
+                   backend: str = "pytorch") -> Dict[str, dict]:
+    """
+    用假视频源驱动 FramePipeline，测量采集、推理、渲染各阶段与端到端延迟。
+    提供权重时推理用真实模型，否则用固定耗时的假推理（缩放到 640 并生成 100 个框），只测流水线本身的开销。
+    """
+    from functions.frame_pipeline import BLOCK, DROP_OLDEST
+
+    yolo = None
+    if weights:
+        from functions.yolo_api import YoloAPI
+        yolo = YoloAPI.create_instance(weights, device="cpu", backend=backend)
+
+    out = {}
+    for res in resolutions:
+        w, h = RESOLUTIONS[res]
+        frame = make_image(w, h)
+        fake_dets = make_detections(100, w, h)
+
+        def infer_fn(img):
+            if yolo is not None:
+                return next(yolo.infer(img))["detections"]
+            cv2.resize(img, (640, 640), interpolation=cv2.INTER_LINEAR)
+            return fake_dets
+
+        run_pipeline(frame, infer_fn, warmup, BLOCK)
+        for policy in (BLOCK, DROP_OLDEST):
+            for name, stats in run_pipeline(frame, infer_fn, max(repeat, 10), policy).items():
+                out[f"{res}/{policy}/{name}"] = stats
+    return out
+
+
+def environment_info() -> Dict[str, str]:
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": str(os.cpu_count()),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+    }
+    try:
+        import ultralytics
+        info["ultralytics"] = ultralytics.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """
+    对比两次基准结果，p95 变慢超过 threshold（比例）时返回非零。
+    没有延迟分位数的用例（如流水线整体）改为对比吞吐量，下降超过 threshold 视为回归。
+    """
+    old = json.loads(Path(old_path).read_text(encoding="utf-8"))["results"]
+    new = json.loads(Path(new_path).read_text(encoding="utf-8"))["results"]
+    regressions = 0
+    for suite, cases in new.items():
+        for case, stats in cases.items():
+            base = old.get(suite, {}).get(case)
+            if not base:
+                continue
+            flag = ""
+            if "p95_ms" in stats and base.get("p95_ms", 0) > 0:
+                ratio = stats["p95_ms"] / base["p95_ms"]
+                if ratio > 1 + threshold:
+                    flag = "  <-- 回归"
+                    regressions += 1
+                print(f"{suite:>14} {case:<16} p95 {base['p95_ms']:9.3f} -> {stats['p95_ms']:9.3f} ms ({ratio:5.2f}x){flag}")
+            elif base.get("throughput_per_s", 0) > 0:
+                ratio = stats["throughput_per_s"] / base["throughput_per_s"]
+                if ratio < 1 - threshold:
+                    flag = "  <-- 回归"
+                    regressions += 1
+                print(f"{suite:>14} {case:<16} 吞吐 {base['throughput_per_s']:9.1f} -> "
+                      f"{stats['throughput_per_s']:9.1f} /s ({ratio:5.2f}x){flag}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="YOLO Qt 性能基准测试")
+    parser.add_argument("--weights", default=None, help="模型权重；不提供时跳过推理基准")
+    parser.add_argument("--backend", default="pytorch", choices=["pytorch", "onnx", "openvino"], help="推理后端")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--repeat", type=int, default=30, help="每个用例的计时次数")
+    parser.add_argument("--warmup", type=int, default=3, help="每个用例的预热次数")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["infer", "draw", "pixmap", "export", "pipeline"])
+    parser.add_argument("-o", "--output", default=None, help="结果 JSON 路径，默认打印到标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两份结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="--compare 时判定回归的 p95 变慢比例")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    results: Dict[str, Dict[str, dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        if "draw" not in args.skip:
+            results["draw_boxes"] = bench_draw_boxes(args.resolutions, args.repeat, args.warmup)
+        if "pixmap" not in args.skip:
+            try:
+                results["frame_to_pixmap"] = bench_frame_to_pixmap(args.resolutions, args.repeat, args.warmup)
+            except ImportError as e:
+                print(f"[跳过] frame_to_pixmap: {e}", file=sys.stderr)
+        if "export" not in args.skip:
+            results["export"] = bench_export(tmp_dir, args.repeat, args.warmup)
+        if "pipeline" not in args.skip:
+            results["pipeline"] = bench_pipeline(args.resolutions, args.repeat, args.warmup, args.weights,
+                                                 backend=args.backend)
+        if "infer" not in args.skip and args.weights:
+            results["infer"] = bench_infer(args.weights, args.resolutions, tmp_dir, args.repeat, args.warmup,
+                                           backend=args.backend)
+
+    report = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "env": environment_info(),
+              "config": {"repeat": args.repeat, "warmup": args.warmup}, "results": results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"基准结果已写入: {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
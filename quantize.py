@@ -0,0 +1,253 @@
+# quantize.py
+#
+# 由训练好的 best.pt 生成量化模型，并在验证集上与原模型对比精度和延迟：
+#   python quantize.py                                   # 默认权重与全部量化方式
+#   python quantize.py -w runs/.../best.pt --variants onnx-int8-static openvino-int8 --runs 100
+#
+# 量化方式：
+#   onnx-int8-dynamic  ONNX Runtime 动态量化（只量化权重，无需校准数据）
+#   onnx-int8-static   ONNX Runtime 静态量化（QDQ，按通道量化，用验证集图片校准）
+#   openvino-int8      OpenVINO + NNCF 训练后量化（由 Ultralytics 导出，用数据集校准）
+#   openvino-fp16      OpenVINO FP16 权重
+# 所有量化模型都可以直接在界面/detect.py 中加载（YOLO 可直接读取 .onnx 与 *_openvino_model）。
+# 量化模型写到 runs/quantize/models/ 下，不会覆盖权重旁边由推理后端缓存的 best.onnx / best_openvino_model。
+
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import cv2
+from ultralytics import YOLO
+
+from config import DATASET_YAML_PATH, MODEL_TO_VALIDATE, IMG_SIZE, RUNS_DIR, VALIDATION_RUN_NAME
+from val import validate
+
+VARIANTS = ("onnx-int8-dynamic", "onnx-int8-static", "openvino-int8", "openvino-fp16")
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def val_images(limit: int) -> List[Path]:
+    """从 data.yaml 的 val（没有则 train）目录中取最多 limit 张图片，用于校准和延迟测量。"""
+    import yaml
+
+    data = yaml.safe_load(DATASET_YAML_PATH.read_text(encoding="utf-8"))
+    root = Path(data.get("path") or DATASET_YAML_PATH.parent)
+    entry = data.get("val") or data.get("train")
+    entries = entry if isinstance(entry, list) else [entry]
+    images: List[Path] = []
+    for e in entries:
+        d = Path(e) if Path(e).is_absolute() else root / e
+        # Ultralytics 约定的 images 子目录
+        if (d / "images").is_dir():
+            d = d / "images"
+        images.extend(sorted(p for p in d.rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS))
+        if len(images) >= limit:
+            break
+    return images[:limit]
+
+
+def letterbox_tensor(path: Path, imgsz: int) -> np.ndarray:
+    """与 Ultralytics 预处理一致：等比缩放 + 灰边填充、BGR→RGB、归一化，返回 1x3xHxW float32。"""
+    img = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    h, w = img.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor)
+
+
+# ---------------- 各种量化方式 ----------------
+
+def _isolated_weights(weights: Path, out_dir: Path) -> Path:
+    """
+    把权重复制到 out_dir 后再导出。Ultralytics 总是把导出结果写在权重旁边（best.onnx / best_openvino_model），
+    而那正是推理后端的缓存路径（见 functions.backends），直接在原权重上导出会覆盖界面/detect.py 正在使用的模型。
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    copy = out_dir / weights.name
+    shutil.copy2(weights, copy)
+    return copy
+
+
+def export_onnx_fp32(weights: Path, imgsz: int, out_dir: Path) -> Path:
+    """静态形状（batch=1）的 FP32 ONNX，作为 ONNX Runtime 量化的输入。"""
+    return Path(YOLO(str(_isolated_weights(weights, out_dir / "onnx_fp32_static"))).export(
+        format="onnx", imgsz=imgsz, dynamic=False, simplify=True))
+
+
+def _copy_metadata(src: Path, dst: Path):
+    # Ultralytics 从 ONNX 的 metadata_props 读取类别名、输入尺寸等，量化后需保留
+    import onnx
+
+    src_model, dst_model = onnx.load(str(src)), onnx.load(str(dst))
+    if not dst_model.metadata_props:
+        for prop in src_model.metadata_props:
+            dst_model.metadata_props.add(key=prop.key, value=prop.value)
+        onnx.save(dst_model, str(dst))
+
+
+def quantize_onnx_dynamic(fp32: Path) -> Path:
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    out = fp32.with_name(f"{fp32.stem}_int8_dynamic.onnx")
+    quantize_dynamic(str(fp32), str(out), weight_type=QuantType.QUInt8)
+    _copy_metadata(fp32, out)
+    return out
+
+
+def quantize_onnx_static(fp32: Path, calib_images: List[Path], imgsz: int) -> Path:
+    from onnxruntime import InferenceSession
+    from onnxruntime.quantization import (quantize_static, CalibrationDataReader, QuantFormat,
+                                          QuantType, CalibrationMethod)
+
+    input_name = InferenceSession(str(fp32), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._it = iter(calib_images)
+
+        def get_next(self):
+            path = next(self._it, None)
+            return None if path is None else {input_name: letterbox_tensor(path, imgsz)}
+
+    out = fp32.with_name(f"{fp32.stem}_int8_static.onnx")
+    quantize_static(str(fp32), str(out), _Reader(),
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax)
+    _copy_metadata(fp32, out)
+    return out
+
+
+def export_openvino(weights: Path, imgsz: int, int8: bool, out_dir: Path) -> Path:
+    kwargs = {"int8": True, "data": str(DATASET_YAML_PATH)} if int8 else {"half": True}
+    # 两种导出各用一个目录，互不覆盖
+    copy = _isolated_weights(weights, out_dir / f"openvino_{'int8' if int8 else 'fp16'}")
+    return Path(YOLO(str(copy)).export(format="openvino", imgsz=imgsz, **kwargs))
+
+
+def build_variant(variant: str, weights: Path, imgsz: int, calib_images: List[Path],
+                  fp32_cache: Dict[str, Path], out_dir: Path) -> Path:
+    if variant.startswith("onnx"):
+        if "fp32" not in fp32_cache:
+            fp32_cache["fp32"] = export_onnx_fp32(weights, imgsz, out_dir)
+        fp32 = fp32_cache["fp32"]
+        if variant == "onnx-int8-dynamic":
+            return quantize_onnx_dynamic(fp32)
+        return quantize_onnx_static(fp32, calib_images, imgsz)
+    return export_openvino(weights, imgsz, int8=(variant == "openvino-int8"), out_dir=out_dir)
+
+
+# ---------------- 精度与延迟 ----------------
+
+def measure_latency(model_path: Path, images: List[Path], imgsz: int, runs: int, warmup: int = 3) -> Dict[str, float]:
+    """单张图片（batch=1）端到端 predict 延迟（含预处理与 NMS），单位 ms。"""
+    model = YOLO(str(model_path))
+    frames = [cv2.imdecode(np.fromfile(p, dtype=np.uint8), cv2.IMREAD_COLOR) for p in images[:max(1, min(len(images), 16))]]
+    if not frames:
+        frames = [np.zeros((imgsz, imgsz, 3), dtype=np.uint8)]
+    for i in range(warmup):
+        model.predict(frames[i % len(frames)], imgsz=imgsz, device="cpu", verbose=False)
+    times = []
+    for i in range(runs):
+        t0 = time.perf_counter()
+        model.predict(frames[i % len(frames)], imgsz=imgsz, device="cpu", verbose=False)
+        times.append((time.perf_counter() - t0) * 1000)
+    p50, p95 = np.percentile(times, [50, 95])
+    return {"p50_ms": float(p50), "p95_ms": float(p95)}
+
+
+def _size_mb(path: Path) -> float:
+    files = [path] if path.is_file() else [p for p in path.rglob("*") if p.is_file()]
+    return sum(p.stat().st_size for p in files) / 1024 / 1024
+
+
+def evaluate(name: str, model_path: Path, images: List[Path], imgsz: int, runs: int, skip_val: bool) -> dict:
+    row = {"variant": name, "path": str(model_path), "size_mb": _size_mb(model_path)}
+    if not skip_val:
+        # ONNX Runtime 量化模型是静态 batch=1，统一用 batch=1 验证，保证对比公平
+        metrics = validate(model_path, run_name=f"{VALIDATION_RUN_NAME}_{name}", batch=1, device="cpu")
+        if metrics is not None:
+            row["map50"] = float(metrics.box.map50)
+            row["map50_95"] = float(metrics.box.map)
+    row.update(measure_latency(model_path, images, imgsz, runs))
+    return row
+
+
+def print_report(rows: List[dict]):
+    base = rows[0]
+    print("\n" + "=" * 30 + " 量化对比 " + "=" * 30)
+    print(f"{'variant':<20}{'size MB':>9}{'mAP50':>9}{'Δ':>8}{'mAP50-95':>10}{'Δ':>8}{'p50 ms':>9}{'p95 ms':>9}{'speedup':>9}")
+    for r in rows:
+        def metric(key):
+            if key not in r:
+                return f"{'-':>9}", f"{'-':>8}"
+            delta = r[key] - base[key] if key in base else float("nan")
+            return f"{r[key]:>9.4f}", f"{delta:>+8.4f}"
+        m50, d50 = metric("map50")
+        m95, d95 = metric("map50_95")
+        speedup = base["p50_ms"] / r["p50_ms"] if r["p50_ms"] > 0 else 0.0
+        print(f"{r['variant']:<20}{r['size_mb']:>9.1f}{m50}{d50:>8}{m95:>10}{d95:>8}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{speedup:>8.2f}x")
+    print("=" * 70)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="生成 INT8 / FP16 量化模型，并与原模型对比 mAP 与 CPU 延迟。")
+    parser.add_argument("-w", "--weights", default=str(MODEL_TO_VALIDATE), help="训练好的 .pt 权重")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--calib-images", type=int, default=200, help="静态量化使用的校准图片数")
+    parser.add_argument("--runs", type=int, default=50, help="每个模型的延迟测量次数")
+    parser.add_argument("--skip-val", action="store_true", help="只测延迟，不跑验证集")
+    parser.add_argument("-o", "--output", default=str(RUNS_DIR / "quantize" / "report.json"), help="对比结果 JSON")
+    parser.add_argument("--model-dir", default=str(RUNS_DIR / "quantize" / "models"),
+                        help="量化模型的输出目录（不会写到权重旁边，避免覆盖推理后端的缓存）")
+    args = parser.parse_args(argv)
+
+    weights = Path(args.weights)
+    if not weights.is_file():
+        print(f"[错误] 找不到权重文件: {weights}")
+        return 1
+    images = val_images(max(args.calib_images, 16)) if DATASET_YAML_PATH.exists() else []
+    if not images:
+        print("[警告] 未找到验证集图片：静态量化将被跳过，延迟用空白帧测量。")
+
+    rows = [evaluate("original", weights, images, args.imgsz, args.runs, args.skip_val)]
+    fp32_cache: Dict[str, Path] = {}
+    for variant in args.variants:
+        if variant == "onnx-int8-static" and not images:
+            continue
+        print(f"\n---------- {variant} ----------")
+        try:
+            path = build_variant(variant, weights, args.imgsz, images[:args.calib_images], fp32_cache,
+                                 Path(args.model_dir))
+        except ImportError as e:
+            print(f"[警告] 跳过 {variant}：缺少依赖 ({e.name})")
+            continue
+        except Exception as e:
+            print(f"[警告] {variant} 量化失败: {e}")
+            continue
+        print(f"已生成: {path}")
+        rows.append(evaluate(variant, path, images, args.imgsz, args.runs, args.skip_val))
+
+    print_report(rows)
+    out = Path(args.output)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"对比结果已保存: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
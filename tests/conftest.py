@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# 与 detect.py 相同：functions 包位于 widgets/display_apply 下
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'widgets', 'display_apply'))
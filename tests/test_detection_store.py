@@ -0,0 +1,52 @@
+# tests/test_detection_store.py
+import numpy as np
+import pytest
+
+pytest.importorskip("PySide6") # detection_model 同时定义了 Qt 表格模型
+
+from functions.detection_model import DetectionStore, TABLE_HEADERS
+from functions.yolo_api import Detections
+
+NAMES = {0: "person", 1: "car"}
+
+
+def make_detections(n: int, cls: int = 0, offset: int = 0) -> Detections:
+    xyxy = np.array([[i + offset, i, i + 10, i + 20] for i in range(n)], np.float32)
+    return Detections(xyxy, np.full(n, 0.5, np.float32), np.full(n, cls, np.int32), NAMES)
+
+
+def test_append_and_cells():
+    store = DetectionStore(capacity=2)
+    assert store.append("a.jpg", make_detections(3)) == 3 # 触发扩容
+    assert store.append("b.jpg", Detections.empty(NAMES)) == 0
+    store.append("b.jpg", make_detections(1, cls=1))
+    assert len(store) == store.total == 4
+    assert list(store.iter_rows())[-1] == ["4", "b.jpg", "car", "0.50", "(0, 0, 10, 20)", ""]
+    assert all(len(row) == len(TABLE_HEADERS) for row in store.iter_rows())
+
+
+def test_drop_front_keeps_numbering_and_columns():
+    store = DetectionStore(capacity=4)
+    for k in range(5):
+        store.append(f"{k}.jpg", make_detections(2, offset=k))
+    store.drop_front(3)
+    assert len(store) == 7
+    assert store.dropped == 3
+    assert store.total == 10
+    first = next(store.iter_rows())
+    # 第 4 行是 1.jpg 的第 2 个框
+    assert first[:2] == ["4", "1.jpg"]
+    assert first[4] == "(2, 1, 11, 21)"
+    store.drop_front(100)
+    assert len(store) == 0 and store.dropped == 10
+
+
+def test_track_columns():
+    store = DetectionStore()
+    dets = make_detections(2)
+    dets.track_id = np.array([7, 9], np.int32)
+    store.append("v.mp4", dets, np.array([[3, 40], [12, 12]], np.int32))
+    store.append("v.mp4", make_detections(1))
+    rows = list(store.iter_rows())
+    assert [r[1] for r in rows] == ["v.mp4"] * 3 # 路径不被轨迹信息改写
+    assert [r[5] for r in rows] == ["#7 (帧 3-40)", "#9 (帧 12-12)", ""]
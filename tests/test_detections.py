@@ -0,0 +1,53 @@
+# tests/test_detections.py
+import numpy as np
+
+from functions.yolo_api import Detections, FrameResult, empty_result, rescale_result
+
+NAMES = {0: "person", 1: "car"}
+
+
+def test_from_data_splits_columns():
+    data = np.array([[1, 2, 3, 4, 0.9, 1], [5, 6, 7, 8, 0.4, 0]], np.float64)
+    dets = Detections.from_data(data, NAMES)
+    assert len(dets) == 2
+    assert dets.xyxy.dtype == np.float32 and dets.cls.dtype == np.int32
+    assert dets.cls.tolist() == [1, 0]
+    assert dets.track_id is None
+    assert len(Detections.from_data(np.zeros((0, 6)), NAMES)) == 0
+
+
+def test_to_boxes_and_scaled():
+    dets = Detections.from_data(np.array([[10, 20, 30, 40, 0.5, 1], [0, 0, 1, 1, 0.25, 7]]), NAMES)
+    boxes = dets.to_boxes()
+    assert boxes[0] == [10.0, 20.0, 30.0, 40.0, 0.5, 1, "car"]
+    assert boxes[1][6] == "7" # 未知类别 ID 退回为数字字符串
+    dets.track_id = np.array([3, 4], np.int32)
+    half = dets.scaled(0.5)
+    assert half.xyxy[0].tolist() == [5, 10, 15, 20]
+    assert half.track_id is dets.track_id
+
+
+def test_frame_result_lazy_keys():
+    calls = []
+
+    def make_boxes():
+        calls.append(1)
+        return ["box"]
+
+    result = FrameResult({"speed": {}}, lazy={"boxes": make_boxes})
+    assert "boxes" in result and list(result) == ["speed"]
+    assert result["boxes"] == ["box"] and result.get("boxes") == ["box"]
+    assert calls == [1] # 只计算一次
+    assert result.get("missing", 0) == 0
+    assert "annotated_frame" not in FrameResult(lazy={"boxes": make_boxes}).materialize()
+
+
+def test_rescale_result_maps_boxes_back():
+    frame = np.zeros((10, 10, 3), np.uint8)
+    result = empty_result(frame, NAMES)
+    assert rescale_result(result, 1.0) is result
+    dets = Detections.from_data(np.array([[1, 2, 3, 4, 0.5, 0]]), NAMES)
+    scaled = rescale_result(FrameResult({"raw_frame": frame, "detections": dets}, lazy={"boxes": dets.to_boxes}), 0.25)
+    assert scaled["decode_scale"] == 0.25
+    assert scaled["boxes"][0][:4] == [4.0, 8.0, 12.0, 16.0]
+    assert scaled["raw_frame"] is frame
@@ -0,0 +1,97 @@
+# tests/test_frame_queue.py
+import threading
+import time
+
+import pytest
+
+from functions.frame_pipeline import BLOCK, DROP_OLDEST, LATEST_ONLY, BoundedFrameQueue, Closed, FramePipeline
+
+
+def test_drop_oldest_keeps_newest_and_reports_drops():
+    dropped = []
+    q = BoundedFrameQueue(maxsize=2, policy=DROP_OLDEST, on_drop=dropped.append)
+    for i in range(5):
+        assert q.put(i)
+    assert dropped == [0, 1, 2]
+    assert [q.get_nowait(), q.get_nowait(), q.get_nowait()] == [3, 4, None]
+    assert q.stats() == {"depth": 0, "maxsize": 2, "put": 5, "dropped": 3}
+
+
+def test_latest_only_ignores_maxsize():
+    q = BoundedFrameQueue(maxsize=8, policy=LATEST_ONLY)
+    for i in range(3):
+        q.put(i)
+    assert q.maxsize == 1
+    assert len(q) == 1 and q.get(timeout=0) == 2
+
+
+def test_get_latest_discards_backlog():
+    dropped = []
+    q = BoundedFrameQueue(maxsize=4, on_drop=dropped.append)
+    for i in range(3):
+        q.put(i)
+    assert q.get_latest() == 2
+    assert dropped == [0, 1] and len(q) == 0
+    assert q.get_latest() is None
+
+
+def test_block_waits_for_space_without_dropping():
+    q = BoundedFrameQueue(maxsize=1, policy=BLOCK)
+    q.put("a")
+    assert q.put("b", timeout=0.05) is False # 满时超时返回 False，不丢帧
+    assert q.drop_count == 0
+
+    def consume():
+        time.sleep(0.05)
+        q.get()
+
+    t = threading.Thread(target=consume)
+    t.start()
+    assert q.put("b", timeout=2.0) is True
+    t.join()
+    assert q.get_nowait() == "b"
+
+
+def test_close_wakes_blocked_producer_and_consumer():
+    q = BoundedFrameQueue(maxsize=1, policy=BLOCK)
+    q.put(1)
+    errors = []
+
+    def producer():
+        try:
+            q.put(2)
+        except Closed:
+            errors.append("put")
+
+    t = threading.Thread(target=producer)
+    t.start()
+    time.sleep(0.05)
+    q.close()
+    t.join(timeout=2.0)
+    assert errors == ["put"]
+    assert q.get(timeout=0) == 1 # 关闭前已入队的元素仍可取出
+    with pytest.raises(Closed):
+        q.get(timeout=0)
+    with pytest.raises(TimeoutError):
+        BoundedFrameQueue().get(timeout=0.01)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        BoundedFrameQueue(policy="nope")
+
+
+def test_block_pipeline_processes_every_frame():
+    frames = iter(range(50))
+    pipeline = FramePipeline(lambda: next(frames, None), lambda f: f * 2, queue_size=2, policy=BLOCK)
+    pipeline.start()
+    results = []
+    deadline = time.monotonic() + 5.0
+    while not pipeline.drained and time.monotonic() < deadline:
+        item = pipeline.render_queue.get_nowait()
+        if item is None:
+            time.sleep(0.001)
+        else:
+            results.append(item)
+    pipeline.stop()
+    assert results == [f * 2 for f in range(50)]
@@ -0,0 +1,103 @@
+# tests/test_frame_ring.py
+import gc
+
+import numpy as np
+
+from functions.frame_ring import FrameRing
+
+SHAPE = (4, 6, 3)
+
+
+class FakeCapture:
+    """模拟 cv2.VideoCapture.read(image=...)：写入给定缓冲区；wrap=True 时返回包装同一块内存的新数组对象。"""
+    def __init__(self, frames: int = 1000, wrap: bool = False, shape=SHAPE):
+        self.frames = frames
+        self.wrap = wrap
+        self.shape = shape
+        self.count = 0
+
+    def read(self, image=None):
+        if self.count >= self.frames:
+            return False, None
+        self.count += 1
+        if image is None or image.shape != self.shape:
+            image = np.empty(self.shape, np.uint8)
+        image[...] = self.count % 256
+        return True, (image[...] if self.wrap else image)
+
+
+def test_released_frames_are_reused():
+    ring, cap = FrameRing(slots=2), FakeCapture()
+    for _ in range(20):
+        frame = ring.read(cap)
+        assert frame is not None
+        del frame
+    assert ring.allocations == 1
+    assert ring.overflow == 0
+    assert ring.reuses == 19
+
+
+def test_new_array_object_on_same_memory_still_reuses():
+    ring, cap = FrameRing(slots=2), FakeCapture(wrap=True)
+    for _ in range(10):
+        ring.read(cap)
+    assert ring.allocations == 1
+    assert ring.reuses == 9
+
+
+def test_held_frames_grow_ring_then_overflow():
+    ring, cap = FrameRing(slots=2, max_slots=3), FakeCapture()
+    held = [ring.read(cap) for _ in range(5)]
+    assert ring.stats()["slots"] == 3
+    assert ring.overflow == 2
+    # 所有帧的内存互不重叠，没有任何一块被提前覆盖
+    assert [int(f[0, 0, 0]) for f in held] == [1, 2, 3, 4, 5]
+
+    del held
+    gc.collect()
+    assert ring.stats()["free"] == 3
+    ring.read(cap)
+    assert ring.reuses == 1
+
+
+def test_views_keep_buffer_leased():
+    ring, cap = FrameRing(slots=2, max_slots=2), FakeCapture()
+    first = ring.read(cap)
+    roi = first[1:3, 2:4] # 例如显示缓存或裁剪出的目标
+    del first
+    assert ring.stats()["free"] == 0
+    second = ring.read(cap)
+    assert int(roi[0, 0, 0]) == 1 # roi 所在的缓冲区没有被覆盖
+    del roi
+    assert ring.stats()["free"] == 1
+    third = ring.read(cap)
+    assert int(third[0, 0, 0]) == 3
+    assert ring.allocations == 2 and ring.overflow == 0
+    del second, third
+
+
+def test_reset_ignores_late_releases():
+    ring, cap = FrameRing(slots=2), FakeCapture()
+    frame = ring.read(cap)
+    ring.reset()
+    del frame
+    assert ring.stats() == {"slots": 0, "free": 0, "allocations": 1, "overflow": 0, "reuses": 0}
+
+
+def test_resolution_change_rebuilds_ring():
+    ring = FrameRing(slots=2)
+    ring.read(FakeCapture())
+    frame = ring.read(FakeCapture(shape=(8, 8, 3)))
+    assert frame.shape == (8, 8, 3)
+    assert ring.stats()["slots"] == 1
+    del frame
+    assert ring.stats()["free"] == 1
+
+
+def test_flip_uses_another_buffer():
+    ring, cap = FrameRing(slots=2), FakeCapture()
+    frame = ring.read(cap)
+    frame[:, 0] = 200
+    flipped = ring.flip(frame, 1)
+    assert not np.shares_memory(frame, flipped)
+    assert (flipped[:, -1] == 200).all()
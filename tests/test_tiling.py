@@ -0,0 +1,64 @@
+# tests/test_tiling.py
+import numpy as np
+
+from functions.tiling import IOS, IOU, merge_detections, nms, tile_grid
+from functions.yolo_api import Detections
+
+
+def boxes(*rows):
+    return np.array(rows, np.float32)
+
+
+def test_tile_grid_covers_image_without_overflow():
+    tiles = tile_grid(1500, 700, tile_size=640, overlap=0.2)
+    xs = sorted({t[0] for t in tiles})
+    ys = sorted({t[1] for t in tiles})
+    assert xs == [0, 512, 860] # 最后一块贴齐右边缘
+    assert ys == [0, 60]
+    assert all(x1 <= 1500 and y1 <= 700 and x1 - x0 == 640 for x0, _, x1, y1 in tiles)
+
+
+def test_tile_grid_small_image_is_single_tile():
+    assert tile_grid(300, 200, tile_size=640) == [(0, 0, 300, 200)]
+
+
+def test_nms_iou_suppresses_same_class_only():
+    xyxy = boxes([0, 0, 10, 10], [1, 1, 11, 11], [0, 0, 10, 10])
+    conf = np.array([0.9, 0.8, 0.7], np.float32)
+    cls = np.array([0, 0, 1], np.int32)
+    keep, kept = nms(xyxy, conf, cls, threshold=0.5, metric=IOU, merge=False)
+    # 第 2 个框与第 1 个同类且重叠被抑制；第 3 个框位置相同但类别不同，保留
+    assert keep.tolist() == [0, 2]
+    np.testing.assert_array_equal(kept, xyxy[[0, 2]])
+
+
+def test_nms_ios_removes_truncated_box_and_merges():
+    # 被切块边缘截断的残框完全落在完整框内：IoU 很小，但交集/较小框面积为 1
+    xyxy = boxes([0, 0, 100, 100], [90, 0, 130, 100])
+    conf = np.array([0.9, 0.6], np.float32)
+    cls = np.zeros(2, np.int32)
+    keep, _ = nms(xyxy, conf, cls, threshold=0.5, metric=IOU)
+    assert keep.tolist() == [0, 1]
+    keep, kept = nms(xyxy, conf, cls, threshold=0.2, metric=IOS, merge=True)
+    assert keep.tolist() == [0]
+    np.testing.assert_array_equal(kept[0], [0, 0, 130, 100]) # 合并为外接框
+    _, kept = nms(xyxy, conf, cls, threshold=0.2, metric=IOS, merge=False)
+    np.testing.assert_array_equal(kept[0], [0, 0, 100, 100])
+
+
+def test_nms_empty():
+    keep, kept = nms(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32))
+    assert keep.shape == (0,) and kept.shape == (0, 4)
+
+
+def test_merge_detections_across_tiles():
+    names = {0: "car", 1: "person"}
+    left = Detections(boxes([600, 10, 640, 50]), np.array([0.6], np.float32), np.array([0], np.int32), names)
+    right = Detections(boxes([600, 10, 700, 50], [0, 0, 5, 5]), np.array([0.9, 0.4], np.float32),
+                       np.array([0, 1], np.int32), names)
+    merged = merge_detections([left, Detections.empty(names), right], names, threshold=0.5)
+    assert len(merged) == 2
+    order = np.argsort(-merged.conf)
+    np.testing.assert_array_equal(merged.xyxy[order[0]], [600, 10, 700, 50])
+    assert merged.cls[order].tolist() == [0, 1]
+    assert len(merge_detections([], names)) == 0
@@ -0,0 +1,119 @@
+# tests/test_tracker.py
+import numpy as np
+
+from functions.result_sink import iter_records, open_sink
+from functions.tracker import ByteTracker, TrackingSession, tracks_to_detections
+from functions.yolo_api import Detections, FrameResult
+
+NAMES = {0: "person", 1: "car"}
+
+
+def dets(rows, track_id=None):
+    """rows: [[x1, y1, x2, y2, conf, cls], ...]"""
+    d = Detections.from_data(np.array(rows, np.float32), NAMES)
+    d.track_id = track_id
+    return d
+
+
+class FakeYolo:
+    """按帧内写入的真实帧号生成一个每帧右移 2 像素的目标。"""
+    class_names = NAMES
+    imgsz = 640
+
+    def __init__(self):
+        self.calls = []
+
+    def _predict_one(self, frame, conf, iou):
+        index = int(frame[0, 0])
+        self.calls.append(index)
+        x = 2.0 * index
+        return FrameResult({"detections": dets([[x, 0, x + 100, 100, 0.9, 0]]),
+                            "speed": {"preprocess": 0.0, "inference": 1.0, "postprocess": 0.0}})
+
+
+def frame(index):
+    return np.full((4, 4), index, np.int32)
+
+
+def test_session_records_real_frame_indices_with_gaps():
+    yolo = FakeYolo()
+    session = TrackingSession(yolo)
+    indices = [0, 5, 10, 40]
+    results = [session.process(frame(i), frame_index=i) for i in indices]
+    assert [r["frame_index"] for r in results] == indices
+    assert yolo.calls == indices
+    assert session.frames_processed == 4
+
+    tracks = session.finish()
+    assert len(tracks) == 1
+    assert (tracks[0].first_frame, tracks[0].last_frame) == (0, 40)
+    assert tracks[0].hits == 4
+
+
+def test_detect_every_counts_skipped_frames():
+    yolo = FakeYolo()
+    session = TrackingSession(yolo, detect_every=3)
+    detected = [session.process(frame(i), frame_index=i)["detected"] for i in [0, 1, 2, 5, 6, 9, 10]]
+    assert detected == [True, False, False, True, False, True, False]
+    assert yolo.calls == [0, 5, 9]
+    assert session.detector_runs == 3
+
+
+def test_default_indices_and_backwards_index_restarts():
+    session = TrackingSession(FakeYolo())
+    for i in range(4):
+        assert session.process(frame(i))["frame_index"] == i
+
+    # 序号倒退（重新打开视频）：之前的轨迹结束，新轨迹从新序号开始
+    session.process(frame(0), frame_index=0)
+    session.process(frame(1), frame_index=1)
+    ended = session.drain_finished()
+    assert [(t.track_id, t.first_frame, t.last_frame) for t in ended] == [(1, 0, 3)]
+    [track] = session.finish()
+    assert (track.track_id, track.first_frame, track.last_frame) == (2, 0, 1)
+
+
+def test_byte_tracker_keeps_ids_and_matches_within_class():
+    tracker = ByteTracker(min_hits=1)
+    tracker.update(dets([[0, 0, 50, 50, 0.9, 0], [200, 0, 250, 50, 0.8, 1]]), 0)
+    tracker.update(dets([[205, 0, 255, 50, 0.8, 1], [4, 0, 54, 50, 0.9, 0]]), 1)
+    active = tracker.active(NAMES)
+    assert dict(zip(active.cls.tolist(), active.track_id.tolist())) == {0: 1, 1: 2}
+
+    # 同一位置换了类别不会接上旧轨迹
+    tracker.update(dets([[8, 0, 58, 50, 0.9, 1]]), 2)
+    assert sorted(t.track_id for t in tracker.tracks) == [1, 2, 3]
+
+
+def test_byte_tracker_low_confidence_second_round():
+    tracker = ByteTracker(min_hits=1)
+    tracker.update(dets([[0, 0, 50, 50, 0.9, 0]]), 0)
+    # 置信度低于 high_thresh 但高于 low_thresh：只用来延续已有轨迹
+    tracker.update(dets([[1, 0, 51, 50, 0.15, 0]]), 1)
+    [track] = tracker.tracks
+    assert track.hits == 2 and track.misses == 0 and track.last_frame == 1
+    # 单独出现的低置信度检测不会建立新轨迹
+    tracker.update(dets([[300, 300, 350, 350, 0.15, 0], [2, 0, 52, 50, 0.9, 0]]), 2)
+    assert len(tracker.tracks) == 1
+
+
+def test_byte_tracker_discards_unconfirmed_tracks():
+    tracker = ByteTracker(max_misses=0, min_hits=2)
+    tracker.update(dets([[0, 0, 50, 50, 0.9, 0]]), 0)
+    assert len(tracker.active(NAMES)) == 0 # 命中一次还未确认
+    assert tracker.update(Detections.empty(NAMES), 1) == []
+    assert tracker.discarded == 1 and tracker.tracks == []
+
+
+def test_sink_frame_column_uses_track_end_frame(tmp_path):
+    session = TrackingSession(FakeYolo())
+    for i in [3, 8, 20]:
+        session.process(frame(i), frame_index=i)
+    tracks = session.finish()
+    frame_range = np.array([[t.first_frame, t.last_frame] for t in tracks], np.int64)
+    with open_sink(tmp_path / "tracks.jsonl") as sink:
+        sink.write("video.mp4", None, tracks_to_detections(tracks, NAMES), frame_range=frame_range)
+        sink.write("video.mp4", 21, dets([[0, 0, 10, 10, 0.5, 1]]))
+        records = list(iter_records(sink))
+    assert [(r["frame"], r["track_id"], r["first_frame"], r["last_frame"]) for r in records] == [
+        (20, 1, 3, 20), (21, None, None, None)]
@@ -1,13 +1,45 @@
 # val.py
 
-import torch
 from ultralytics import YOLO
 from functions.update_file import update_file
 from pathlib import Path
+from typing import Union
 from config import (  DATASET_YAML_PATH,MODEL_TO_VALIDATE,IMG_SIZE,BATCH_SIZE,VALIDATION_RUN_NAME,
     RUNS_DIR, ROOT_DIR,DEVICE_NAME,DEVICE
 )
 
+def validate(model_path: Union[str, Path], run_name: str = VALIDATION_RUN_NAME,
+             batch: int = BATCH_SIZE, device=None):
+    """
+    在 DATASET_YAML_PATH 上验证一个模型，返回 Ultralytics 的验证指标（失败时返回 None）。
+    model_path 可以是 .pt，也可以是导出/量化后的 .onnx 或 *_openvino_model 目录。
+    """
+    model_path = Path(model_path)
+    if not model_path.exists():
+        print(f"[错误] 找不到要验证的模型权重文件: {model_path}")
+        return None
+    if not DATASET_YAML_PATH.exists():
+        print(f"[错误] 找不到数据集配置文件: {DATASET_YAML_PATH}")
+        return None
+
+    try:
+        print(f"\n正在加载模型: {model_path}")
+        model = YOLO(str(model_path))
+
+        print(f"正在使用数据集 '{DATASET_YAML_PATH}' 进行验证...")
+        return model.val(
+            data=str(DATASET_YAML_PATH),
+            imgsz=IMG_SIZE,
+            batch=batch,
+            device=DEVICE if device is None else device,
+            project=str(RUNS_DIR),
+            name=run_name
+        )
+    except Exception as e:
+        print(f"验证过程中发生严重错误: {e}")
+        return None
+
+
 def main():
     """
     主验证函数。
@@ -20,38 +52,22 @@ def main():
         print("请确保 config.py 中的 MODEL_TO_VALIDATE 路径是正确的。")
         print("您可能需要先运行 train.py 来生成 'best.pt' 文件。")
         return
-    if not DATASET_YAML_PATH.exists():
-        print(f"[错误] 找不到数据集配置文件: {DATASET_YAML_PATH}")
-        return
 
     # 3. 加载模型并开始验证
-    try:
-        print(f"\n正在加载模型: {MODEL_TO_VALIDATE}")
-        model = YOLO(MODEL_TO_VALIDATE)
-
-        print(f"正在使用数据集 '{DATASET_YAML_PATH}' 进行验证...")
-        metrics = model.val(
-            data=str(DATASET_YAML_PATH),
-            imgsz=IMG_SIZE,
-            batch=BATCH_SIZE,
-            device=DEVICE,
-            project=str(RUNS_DIR),
-            name=VALIDATION_RUN_NAME
-        )
-
-        print("\n" + "="*15 + " 验证结果摘要 " + "="*15)
-        print(f"mAP50-95 (Box): {metrics.box.map:.4f}")
-        print(f"   mAP50 (Box): {metrics.box.map50:.4f}")
-        print(f"   mAP75 (Box): {metrics.box.map75:.4f}")
-        print(f"验证结果的详细图表和数据保存在: {metrics.save_dir}")
-        rel_val_dir  = Path(metrics.save_dir).relative_to(ROOT_DIR)
-        update_file('config.py',{'VAL_INFO_DIR =': f'VAL_INFO_DIR = ROOT_DIR / "{rel_val_dir.as_posix()}"'})
+    metrics = validate(MODEL_TO_VALIDATE)
+    if metrics is None:
+        return
 
-        print("="*47)
+    print("\n" + "="*15 + " 验证结果摘要 " + "="*15)
+    print(f"mAP50-95 (Box): {metrics.box.map:.4f}")
+    print(f"   mAP50 (Box): {metrics.box.map50:.4f}")
+    print(f"   mAP75 (Box): {metrics.box.map75:.4f}")
+    print(f"验证结果的详细图表和数据保存在: {metrics.save_dir}")
+    rel_val_dir  = Path(metrics.save_dir).relative_to(ROOT_DIR)
+    update_file('config.py',{'VAL_INFO_DIR =': f'VAL_INFO_DIR = ROOT_DIR / "{rel_val_dir.as_posix()}"'})
 
-    except Exception as e:
-        print(f"验证过程中发生严重错误: {e}")
+    print("="*47)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -15,10 +15,10 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PySide6.QtWidgets import (QApplication, QComboBox, QFormLayout, QGridLayout,
+from PySide6.QtWidgets import (QApplication, QCheckBox, QComboBox, QFormLayout, QGridLayout,
     QGroupBox, QHBoxLayout, QHeaderView, QLabel,
     QLayout, QLineEdit, QPushButton, QSizePolicy,
-    QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget)
+    QTableView, QVBoxLayout, QWidget)
 import resources_rc
 
 class Ui_mainlayout(object):
@@ -61,26 +61,14 @@ class Ui_mainlayout(object):
 
         self.verticalLayout_4.addWidget(self.display)
 
-        self.tableWidget = QTableWidget(mainlayout)
-        if (self.tableWidget.columnCount() < 5):
-            self.tableWidget.setColumnCount(5)
-        __qtablewidgetitem = QTableWidgetItem()
-        self.tableWidget.setHorizontalHeaderItem(0, __qtablewidgetitem)
-        __qtablewidgetitem1 = QTableWidgetItem()
-        self.tableWidget.setHorizontalHeaderItem(1, __qtablewidgetitem1)
-        __qtablewidgetitem2 = QTableWidgetItem()
-        self.tableWidget.setHorizontalHeaderItem(2, __qtablewidgetitem2)
-        __qtablewidgetitem3 = QTableWidgetItem()
-        self.tableWidget.setHorizontalHeaderItem(3, __qtablewidgetitem3)
-        __qtablewidgetitem4 = QTableWidgetItem()
-        self.tableWidget.setHorizontalHeaderItem(4, __qtablewidgetitem4)
-        self.tableWidget.setObjectName(u"tableWidget")
-        self.tableWidget.setMinimumSize(QSize(700, 150))
-        self.tableWidget.horizontalHeader().setMinimumSectionSize(100)
-        self.tableWidget.horizontalHeader().setDefaultSectionSize(100)
-        self.tableWidget.horizontalHeader().setStretchLastSection(True)
-
-        self.verticalLayout_4.addWidget(self.tableWidget)
+        self.tableView = QTableView(mainlayout)
+        self.tableView.setObjectName(u"tableView")
+        self.tableView.setMinimumSize(QSize(700, 150))
+        self.tableView.horizontalHeader().setMinimumSectionSize(100)
+        self.tableView.horizontalHeader().setDefaultSectionSize(100)
+        self.tableView.horizontalHeader().setStretchLastSection(True)
+
+        self.verticalLayout_4.addWidget(self.tableView)
 
         self.verticalLayout_4.setStretch(0, 3)
         self.verticalLayout_4.setStretch(1, 1)
@@ -172,6 +160,22 @@ class Ui_mainlayout(object):
 
         self.formLayout.setWidget(4, QFormLayout.ItemRole.FieldRole, self.le_open_dir)
 
+        self.lb_backend = QLabel(self.groupBox)
+        self.lb_backend.setObjectName(u"lb_backend")
+        self.lb_backend.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.formLayout.setWidget(2, QFormLayout.ItemRole.LabelRole, self.lb_backend)
+
+        self.cb_backend = QComboBox(self.groupBox)
+        self.cb_backend.setObjectName(u"cb_backend")
+
+        self.formLayout.setWidget(2, QFormLayout.ItemRole.FieldRole, self.cb_backend)
+
+        self.chk_tracking = QCheckBox(self.groupBox)
+        self.chk_tracking.setObjectName(u"chk_tracking")
+
+        self.formLayout.setWidget(3, QFormLayout.ItemRole.SpanningRole, self.chk_tracking)
+
 
         self.verticalLayout_5.addWidget(self.groupBox)
 
@@ -343,22 +347,14 @@ class Ui_mainlayout(object):
         mainlayout.setWindowTitle(QCoreApplication.translate("mainlayout", u"Form", None))
         self.lb_title.setText(QCoreApplication.translate("mainlayout", u"\u7cfb\u7edf", None))
         self.display.setText(QCoreApplication.translate("mainlayout", u"display", None))
-        ___qtablewidgetitem = self.tableWidget.horizontalHeaderItem(0)
-        ___qtablewidgetitem.setText(QCoreApplication.translate("mainlayout", u"\u5e8f\u53f7", None));
-        ___qtablewidgetitem1 = self.tableWidget.horizontalHeaderItem(1)
-        ___qtablewidgetitem1.setText(QCoreApplication.translate("mainlayout", u"\u6587\u4ef6\u8def\u5f84", None));
-        ___qtablewidgetitem2 = self.tableWidget.horizontalHeaderItem(2)
-        ___qtablewidgetitem2.setText(QCoreApplication.translate("mainlayout", u"\u7c7b\u522b", None));
-        ___qtablewidgetitem3 = self.tableWidget.horizontalHeaderItem(3)
-        ___qtablewidgetitem3.setText(QCoreApplication.translate("mainlayout", u"\u7f6e\u4fe1\u5ea6", None));
-        ___qtablewidgetitem4 = self.tableWidget.horizontalHeaderItem(4)
-        ___qtablewidgetitem4.setText(QCoreApplication.translate("mainlayout", u"\u5750\u6807\u4f4d\u7f6e", None));
         self.groupBox.setTitle(QCoreApplication.translate("mainlayout", u"\u4fe1\u606f\u8f93\u5165", None))
         self.btn_model_select.setText(QCoreApplication.translate("mainlayout", u"\u6a21\u578b\u9009\u62e9", None))
         self.btn_camera.setText(QCoreApplication.translate("mainlayout", u"\u542f\u7528/\u5173\u95ed\u6444\u50cf\u5934", None))
         self.lb_cameracheck.setText(QCoreApplication.translate("mainlayout", u"\u6444\u50cf\u5934\u5df2\u5173\u95ed", None))
         self.btn_open_one_file.setText(QCoreApplication.translate("mainlayout", u"\u6253\u5f00\u6587\u4ef6", None))
         self.btn_open_dir.setText(QCoreApplication.translate("mainlayout", u"\u6253\u5f00\u6587\u4ef6\u5939", None))
+        self.lb_backend.setText(QCoreApplication.translate("mainlayout", u"\u63a8\u7406\u540e\u7aef", None))
+        self.chk_tracking.setText(QCoreApplication.translate("mainlayout", u"\u8ddf\u8e2a\u6a21\u5f0f", None))
         self.groupBox_2.setTitle(QCoreApplication.translate("mainlayout", u"\u68c0\u6d4b\u7ed3\u679c", None))
         self.label_14.setText(QCoreApplication.translate("mainlayout", u"ymin", None))
         self.label_6.setText(QCoreApplication.translate("mainlayout", u"\u76ee\u6807\u9009\u62e9", None))
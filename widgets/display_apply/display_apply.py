@@ -1,18 +1,30 @@
 import sys
 import csv
 from pathlib import Path
-from PySide6.QtWidgets import QApplication, QWidget, QSizePolicy, QTableWidgetItem, QFileDialog, QMessageBox, QHeaderView
-from PySide6.QtGui import QFont
+import time
+from PySide6.QtWidgets import (QApplication, QWidget, QSizePolicy, QFileDialog, QMessageBox,
+                               QHeaderView, QLabel, QProgressBar)
+from PySide6.QtGui import QFont, QKeySequence, QShortcut
 from PySide6.QtCore import QTimer, Qt
-from functions.yolo_api import YoloAPI, Box, FrameResult
+from functions.yolo_api import YoloAPI, Box, FrameResult, rescale_result
 from functions.media_handler import MediaHandler
 from functions.camera_yolo_api import CameraYoloAPI
-from functions.draw_yolo import draw_boxes
+from functions.stream_manager import StreamManager
+from functions.stream_grid import StreamGridWidget
+from functions.infer_worker import InferenceWorker, empty_result
+from functions.model_loader import ModelLoaderThread
+from functions.process_pool import ProcessInferencePool
+from functions.tracker import TrackingSession, Track, tracks_to_detections
+from functions.motion_gate import MotionGate, MotionGatedModel
+from functions.backends import PYTORCH, available_backends
+from functions.perf_trace import TRACE
+from functions.detection_model import DetectionTableModel, TABLE_HEADERS, format_track
+from functions.result_sink import ResultSink, CsvSink, JsonlSink, open_sink, iter_records
 from functions.file_cp_selector import open_selector
 from Ui_display import Ui_mainlayout
 import cv2
 import numpy as np
-from typing import Optional
+from typing import Dict, Optional
 from functions.title_bar_dragger import TitleBarDragger
 import resources_rc
 from PySide6.QtWidgets import QMainWindow
@@ -21,7 +33,14 @@ from PySide6.QtWidgets import QMainWindow
 project_root = Path(__file__).resolve().parents[2]
 sys.path.append(str(project_root))
 from config import (MODEL_STORE_PATH, INPUT_FILE_PATH,PLAY_INTERVAL_MS,
-                    WINDOWS_SIZE,SHOULD_HIDE_TITLE_BAR,FIX_SIZE,TITLE)
+                    WINDOWS_SIZE,SHOULD_HIDE_TITLE_BAR,FIX_SIZE,TITLE,
+                    PIPELINE_QUEUE_SIZE,PIPELINE_DROP_POLICY,PERF_HUD,PERF_TRACE_DIR,
+                    TABLE_REFRESH_MS,TABLE_MAX_ROWS,RESULT_STREAM_ENABLED,RESULT_STREAM_FORMAT,
+                    RESULT_STREAM_DIR,SLIDESHOW_PREFETCH,SLIDESHOW_CACHE_MB,
+                    IMG_SIZE,REDUCED_DECODE,CAMERA_SOURCES,
+                    MODEL_CACHE_SIZE,MODEL_WARMUP,INFER_BACKEND,INFER_PROCESSES,FRAME_RING_SIZE,
+                    TRACKING_ENABLED,TRACK_DETECT_EVERY,
+                    MOTION_GATE_ENABLED,MOTION_GATE_THRESHOLD,MOTION_GATE_MAX_SKIP)
 
 class BgMainWindow(QMainWindow):
     def __init__(self, central_widget, parent=None):
@@ -51,43 +70,152 @@ class DisplayApp(QWidget):
         self.ui = Ui_mainlayout()
         self.ui.setupUi(self)
         self.resize(*WINDOWS_SIZE)
-        self.media_manager = MediaHandler(self.ui.display)
+        self.media_manager = MediaHandler(self.ui.display,
+                                          prefetch_lookahead=SLIDESHOW_PREFETCH,
+                                          prefetch_cache_mb=SLIDESHOW_CACHE_MB,
+                                          decode_min_size=IMG_SIZE if REDUCED_DECODE else None)
         self.playback_timer = QTimer(self)
         self.playback_timer.timeout.connect(self._process_and_display_frame)
 
 
-        self.yolo: Optional[YoloAPI] = None
+        self.yolo: Optional[YoloAPI | ProcessInferencePool] = None
         YoloAPI.set_global_logging(True)
+        YoloAPI.set_model_cache_size(MODEL_CACHE_SIZE)
 
         self.camera_api: Optional[CameraYoloAPI] = None
+        # 多路视频源（CAMERA_SOURCES 多于一路）时使用，共享 self.yolo 并以网格视图显示
+        self.stream_manager: Optional[StreamManager] = None
+        self.stream_grid: Optional[StreamGridWidget] = None
+        # 跟踪模式下包装 self.yolo，只在一次视频/摄像头会话内有效
+        self.tracking: Optional[TrackingSession] = None
+        self._selected_track_id: Optional[int] = None # 跨帧保持选中的目标
+        # 运动门控同样只在一次视频/摄像头会话内有效，套在（跟踪后的）模型外层
+        self.motion_gate: Optional[MotionGatedModel] = None
+
+        # 推理放在工作线程中，GUI 线程只负责取帧和绘制最新结果
+        self._session_id: int = 0
+        self.infer_worker = InferenceWorker(parent=self)
+        self.infer_worker.result_ready.connect(self._on_inference_result)
+        self.infer_worker.error.connect(print)
+        self.infer_worker.start()
 
         self.current_media_path: str = "N/A"
-        self.all_detection_results: list[list] = []
+        # 检测记录保存在列式模型中，表格视图只绘制可见行
+        self.detection_model = DetectionTableModel(refresh_ms=TABLE_REFRESH_MS, max_rows=TABLE_MAX_ROWS, parent=self)
+        # 完整的检测记录边检测边写到磁盘，会话中途崩溃也不会丢失
+        self.result_sink: Optional[ResultSink] = None
+        self._frame_counters: Dict[str, int] = {} # 没有真实帧号的来源（图片、幻灯片）各自的计数
         self.last_yolo_result: Optional[FrameResult] = None
 
-
-        model_store_dir = Path(MODEL_STORE_PATH)
-        default_model_path = model_store_dir / "best.pt"
-        self.ui.le_model_path.setText(str(default_model_path))
-        self.load_model(default_model_path)
+        # 模型在后台线程中加载；加载期间打开的媒体/摄像头先排队，加载完成后再执行
+        self.model_loader: Optional[ModelLoaderThread] = None
+        self._finished_loaders: list[ModelLoaderThread] = [] # 已被新请求取代、仍在运行的旧加载线程
+        self._queued_action = None
 
         self.slideshow_interval_ms: int = PLAY_INTERVAL_MS
 
         self.bind()
         self.init_work()
 
+        # 窗口先显示出来，默认模型在后台加载
+        model_store_dir = Path(MODEL_STORE_PATH)
+        default_model_path = model_store_dir / "best.pt"
+        self.ui.le_model_path.setText(str(default_model_path))
+        self.load_model(default_model_path)
+
         self.ui.lb_cameracheck.setText("摄像头: <font color='gray'>已关闭</font>")
 
     def init_work(self):
         self.ui.lb_title.setText(TITLE)
         compact_font = QFont()
         compact_font.setPointSize(9)
-        self.ui.tableWidget.setFont(compact_font)
-        self.ui.tableWidget.verticalHeader().setDefaultSectionSize(22)
-        self.ui.tableWidget.verticalHeader().setVisible(False)
-        self.ui.tableWidget.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.ui.tableWidget.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
-        self.ui.tableWidget.horizontalHeader().setMinimumSectionSize(100)
+        self.ui.tableView.setModel(self.detection_model)
+        self.ui.tableView.setFont(compact_font)
+        self.ui.tableView.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.ui.tableView.verticalHeader().setDefaultSectionSize(22)
+        self.ui.tableView.verticalHeader().setVisible(False)
+        # ResizeToContents 会遍历所有行，行数很多时非常慢，因此使用固定列宽
+        self.ui.tableView.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.ui.tableView.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.ui.tableView.horizontalHeader().setMinimumSectionSize(100)
+        self.ui.tableView.setColumnWidth(1, 200)
+        self.detection_model.rows_inserted.connect(self._on_rows_inserted)
+        self._init_backend_selector()
+        self.ui.chk_tracking.setChecked(TRACKING_ENABLED)
+        self.ui.chk_tracking.setToolTip(f"视频/摄像头中为目标分配稳定的 ID，每 {TRACK_DETECT_EVERY} 帧检测一次，"
+                                        f"结果表每条轨迹记录一行（对之后打开的媒体生效）")
+        self._init_perf_hud()
+        self._init_model_progress()
+
+    def _init_backend_selector(self):
+        """推理后端下拉框：只列出运行时已安装的后端，默认选中配置中的 INFER_BACKEND。"""
+        self.ui.cb_backend.blockSignals(True)
+        self.ui.cb_backend.addItems(available_backends())
+        index = self.ui.cb_backend.findText(INFER_BACKEND)
+        self.ui.cb_backend.setCurrentIndex(index if index >= 0 else self.ui.cb_backend.findText(PYTORCH))
+        self.ui.cb_backend.blockSignals(False)
+        self.ui.cb_backend.currentTextChanged.connect(self.on_backend_changed)
+
+    def on_backend_changed(self, backend: str):
+        """切换后端后用新后端重新加载当前模型（首次切换到 onnx / openvino 时会先导出）。"""
+        path_str = self.ui.le_model_path.text().strip()
+        if path_str:
+            print(f"切换推理后端: {backend}")
+            self.load_model(Path(path_str))
+
+    def _init_model_progress(self):
+        """表格下方的模型加载进度条，只在加载期间显示。"""
+        self.model_progress = QProgressBar(self)
+        self.model_progress.setRange(0, 0) # 加载耗时未知，使用忙碌动画
+        self.model_progress.setTextVisible(True)
+        self.model_progress.setFixedHeight(16)
+        self.model_progress.hide()
+        self.ui.verticalLayout_4.addWidget(self.model_progress)
+
+    def _init_perf_hud(self):
+        """在显示区域左上角叠加一个半透明的性能信息面板。"""
+        self.perf_hud = QLabel(self.ui.display)
+        self.perf_hud.setStyleSheet("background-color: rgba(0, 0, 0, 150); color: #0f0; padding: 4px;")
+        hud_font = QFont("Consolas")
+        hud_font.setStyleHint(QFont.Monospace)
+        hud_font.setPointSize(8)
+        self.perf_hud.setFont(hud_font)
+        self.perf_hud.move(4, 4)
+        self.perf_hud.setVisible(PERF_HUD)
+        self.perf_hud_timer = QTimer(self)
+        self.perf_hud_timer.timeout.connect(self._refresh_perf_hud)
+        if PERF_HUD:
+            self.perf_hud_timer.start(500)
+        QShortcut(QKeySequence(Qt.Key_F12), self, activated=self.toggle_perf_hud)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self.dump_perf_trace)
+        # 幻灯片模式下用方向键前后翻页。快捷键只在显示区域有焦点时生效，
+        # 不抢占结果表格、下拉框等控件自身的方向键
+        self.ui.display.setFocusPolicy(Qt.ClickFocus)
+        for key, step in ((Qt.Key_Left, -1), (Qt.Key_Right, 1)):
+            QShortcut(QKeySequence(key), self.ui.display, activated=lambda step=step: self.step_slideshow(step),
+                      context=Qt.WidgetWithChildrenShortcut)
+
+    def toggle_perf_hud(self):
+        visible = not self.perf_hud.isVisible()
+        self.perf_hud.setVisible(visible)
+        if visible:
+            self._refresh_perf_hud()
+            self.perf_hud_timer.start(500)
+        else:
+            self.perf_hud_timer.stop()
+
+    def _refresh_perf_hud(self):
+        text = TRACE.format_hud()
+        if self.motion_gate is not None:
+            stats = self.motion_gate.stats()
+            text += f"\nskipped      {stats['skipped']}/{stats['skipped'] + stats['inferred']} ({stats['skip_ratio']:.0%})"
+        self.perf_hud.setText(text)
+        self.perf_hud.adjustSize()
+        self.perf_hud.raise_()
+
+    def dump_perf_trace(self):
+        path = TRACE.dump(Path(PERF_TRACE_DIR) / f"trace_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+        print(f"耗时记录已导出到: {path}")
 
 
 
@@ -99,7 +227,7 @@ class DisplayApp(QWidget):
         self.ui.le_model_path.returnPressed.connect(self.on_model_path_entered)
         self.ui.le_open_one_file.returnPressed.connect(self.on_media_path_entered)
         self.ui.btn_camera.clicked.connect(self.toggle_camera)
-        self.ui.cb_select_target.currentIndexChanged.connect(self.on_target_selection_change)
+        self.ui.cb_select_target.currentIndexChanged.connect(self._on_target_selected)
         self.ui.btn_exit.clicked.connect(self.close)
         self.ui.btn_save.clicked.connect(self.save_results_to_csv)
         if hasattr(self.ui, 'btn_clear'):
@@ -150,10 +278,18 @@ class DisplayApp(QWidget):
     def stop_all_media_sources(self):
         """统一停止所有正在播放的媒体和摄像头"""
         self.playback_timer.stop()
+        # 使尚在工作线程中的旧结果失效
+        self._session_id += 1
+        self.infer_worker.clear()
         self.media_manager.release()
         if self.camera_api and self.camera_api.is_active:
             self.camera_api.stop()
             self.ui.lb_cameracheck.setText("摄像头: <font color='gray'>已关闭</font>")
+        if self.stream_manager:
+            self._stop_streams()
+            self.ui.lb_cameracheck.setText("摄像头: <font color='gray'>已关闭</font>")
+        self._end_motion_gate()
+        self._end_tracking()
 
         self.current_media_path = "N/A"
         self.ui.display.setText("空闲")
@@ -162,6 +298,9 @@ class DisplayApp(QWidget):
         self.ui.lb_time.setText("0.0 ms")
 
     def load_media(self, path: Path):
+        if self.is_model_loading:
+            self._queue_until_model_ready(lambda: self.load_media(path), path.name)
+            return
         self.stop_all_media_sources() # 停止所有当前活动源
 
         if path.suffix.lower() in {".pt", ".pth"}:
@@ -177,7 +316,11 @@ class DisplayApp(QWidget):
         )
 
         if effective_interval is not None:
+            if self.media_manager.media_type == MediaHandler.TYPE_VIDEO:
+                self.infer_worker.set_model(self._session_model())
             self._process_and_display_frame() # 显示第一帧
+            if self.media_manager.media_type == MediaHandler.TYPE_SLIDESHOW:
+                self.ui.display.setFocus() # 打开文件夹后可以直接用方向键翻页
             if effective_interval > 0: # 如果有效间隔大于0，则启动定时器
                 self.playback_timer.start(effective_interval)
             # 如果 effective_interval 为 0，表示单张图片，无需定时器
@@ -185,65 +328,269 @@ class DisplayApp(QWidget):
             QMessageBox.critical(self, "加载失败", f"无法加载指定的媒体文件或文件夹:\n{path}")
             self.stop_all_media_sources()
 
+    def step_slideshow(self, step: int):
+        """手动前进/后退一张图片（幻灯片模式下），并重新开始计时。"""
+        if self.media_manager.media_type != MediaHandler.TYPE_SLIDESHOW:
+            return
+        success, frame = self.media_manager.step_slideshow(step)
+        if not success:
+            return
+        if self.playback_timer.isActive():
+            self.playback_timer.start() # 重新计时，避免刚翻页就被定时器切走
+        if self.yolo:
+            self.infer_worker.submit(frame, (self._session_id, self.current_media_path, self.media_manager.frame_scale))
+        else:
+            self._show_result(empty_result(frame))
+
+    def _queue_until_model_ready(self, action, description: str):
+        """模型加载期间收到的打开请求先记下（只保留最近一个），加载完成后自动执行。"""
+        self._queued_action = action
+        self.ui.display.setText(f"模型加载中，完成后将自动打开: {description}")
+
     def start_camera(self):
+        if self.is_model_loading:
+            self._queue_until_model_ready(self.start_camera, "摄像头")
+            return
         self.stop_all_media_sources()
 
         if not self.yolo:
             QMessageBox.warning(self, "操作错误", "请先加载一个有效的YOLO模型！");
             return
 
-        if self.camera_api is None or self.camera_api.yolo is not self.yolo:
+        if len(CAMERA_SOURCES) > 1:
+            self._start_streams(CAMERA_SOURCES)
+            return
+
+        source = CAMERA_SOURCES[0] if CAMERA_SOURCES else 0
+        model = self._session_model()
+        if self.camera_api is None or self.camera_api.yolo is not model or self.camera_api._source != source:
             try:
-                self.camera_api = CameraYoloAPI(yolo_api=self.yolo, source=0)
+                self.camera_api = CameraYoloAPI(yolo_api=model, source=source, ring_size=FRAME_RING_SIZE)
             except Exception as e:
                 QMessageBox.critical(self, "摄像头初始化失败", f"无法创建摄像头API实例: {e}");
                 self.ui.lb_cameracheck.setText("摄像头: <font color='red'>初始化失败</font>")
                 self.stop_all_media_sources()
                 return
 
-        if self.camera_api.start():
+        # 采集与推理在后台流水线中运行，定时器只作为渲染端取最新结果
+        if self.camera_api.start_pipeline(mirror_flip=True,
+                                          queue_size=PIPELINE_QUEUE_SIZE,
+                                          policy=PIPELINE_DROP_POLICY):
             self.playback_timer.start(33) # 约30帧/秒
             self.ui.lb_cameracheck.setText("摄像头: <font color='green'>已开启</font>")
-            self.current_media_path = "Camera Source 0"
+            self.current_media_path = f"Camera Source {source}"
         else:
             self.ui.lb_cameracheck.setText("摄像头: <font color='red'>开启失败</font>")
             QMessageBox.critical(self, "摄像头启动失败", "未能成功启动摄像头。")
             self.stop_all_media_sources()
 
+    def _session_model(self):
+        """视频/摄像头会话使用的模型：按设置依次套上跟踪与运动门控。"""
+        model = self._begin_tracking()
+        if MOTION_GATE_ENABLED and model is not None:
+            self.motion_gate = MotionGatedModel(model, MotionGate(threshold=MOTION_GATE_THRESHOLD,
+                                                                  max_skip=MOTION_GATE_MAX_SKIP))
+            model = self.motion_gate
+        return model
+
+    def _end_motion_gate(self):
+        if self.motion_gate is None:
+            return
+        stats = self.motion_gate.stats()
+        self.motion_gate = None
+        self.infer_worker.set_model(self.yolo)
+        print(f"运动门控: 推理 {stats['inferred']} 帧，跳过 {stats['skipped']} 帧 ({stats['skip_ratio']:.0%})")
+
+    def _begin_tracking(self):
+        """跟踪模式开启时为新的视频/摄像头会话创建 TrackingSession 并返回它，否则返回原模型。"""
+        if not (self.ui.chk_tracking.isChecked() and self.yolo):
+            return self.yolo
+        self.tracking = TrackingSession(self.yolo, detect_every=TRACK_DETECT_EVERY)
+        self._selected_track_id = None
+        return self.tracking
+
+    def _end_tracking(self):
+        """结束跟踪会话：仍在进行的轨迹各记录一行，推理线程换回原模型。"""
+        if self.tracking is None:
+            return
+        tracking, self.tracking = self.tracking, None
+        self._log_tracks(self.current_media_path, tracking.finish(), tracking.class_names)
+        self.infer_worker.set_model(self.yolo)
+        self._selected_track_id = None
+        print(f"跟踪结束: 共 {tracking.frames_processed} 帧，检测器运行 {tracking.detector_runs} 次，"
+              f"丢弃 {tracking.tracker.discarded} 条未确认的轨迹")
+
+    def _log_tracks(self, path: str, tracks: list[Track], names):
+        """
+        每条结束的轨迹在结果表中记录一行（取置信度最高时的框），文件路径不变，
+        track_id 与起止帧记在单独的“轨迹”列。未确认（命中不到 min_hits 次）的轨迹视为噪声，不记录。
+        """
+        if not tracks:
+            return
+        detections = tracks_to_detections(tracks, names)
+        frame_range = np.array([(t.first_frame, t.last_frame) for t in tracks], np.int32)
+        self.detection_model.append(path, detections, frame_range)
+        self._stream_detections(path, detections, frame_range=frame_range)
+
     def stop_camera(self):
         if self.camera_api and self.camera_api.is_active:
             self.camera_api.stop()
         self.stop_all_media_sources()
 
+    def _start_streams(self, sources: list):
+        """同时打开多路视频源，共享当前模型做批量推理，并把显示区域切换为网格视图。"""
+        gate = {"threshold": MOTION_GATE_THRESHOLD, "max_skip": MOTION_GATE_MAX_SKIP} if MOTION_GATE_ENABLED else None
+        self.stream_manager = StreamManager(self.yolo, sources, mirror_flip=False, motion_gate=gate)
+        # 各路在后台并发打开，不阻塞界面；打开进度由 _poll_streams 轮询显示
+        self.stream_manager.start()
+
+        self.stream_grid = StreamGridWidget(len(sources), parent=self)
+        self.ui.verticalLayout_4.insertWidget(0, self.stream_grid)
+        self.ui.verticalLayout_4.setStretch(0, 3)
+        self.ui.verticalLayout_4.setStretch(2, 1)
+        self.ui.display.hide()
+        self.playback_timer.start(33)
+        self.ui.lb_cameracheck.setText(f"摄像头: <font color='orange'>正在打开 0/{len(sources)} 路</font>")
+        self.current_media_path = "Multi Stream"
+
+    def _stop_streams(self):
+        self.stream_manager.stop()
+        self.stream_manager = None
+        if self.stream_grid:
+            self.stream_grid.release()
+            self.ui.verticalLayout_4.removeWidget(self.stream_grid)
+            self.stream_grid.deleteLater()
+            self.stream_grid = None
+            self.ui.verticalLayout_4.setStretch(0, 3)
+            self.ui.verticalLayout_4.setStretch(1, 1)
+        self.ui.display.show()
+
+    def _poll_streams(self):
+        """多路模式下的渲染端：取出每一路的最新结果画到对应格子，并记录检测结果。"""
+        total_boxes, latest = 0, None
+        for stream_id, source in enumerate(self.stream_manager.sources):
+            result = self.stream_manager.get_latest_result(stream_id)
+            if result is None:
+                continue
+            self.stream_grid.show_result(stream_id, result)
+            total_boxes += len(result["detections"])
+            latest = result
+            with TRACE.stage("table"):
+                path = f"Stream {source}"
+                self.detection_model.append(path, result["detections"])
+                self._stream_detections(path, result["detections"], result.get("frame_index"))
+            TRACE.mark_frame()
+        self.stream_grid.update_stats(self.stream_manager.stats())
+        self._update_stream_status()
+        if latest is not None:
+            speed = latest["speed"]
+            self.ui.lb_time.setText(f"{speed['preprocess'] + speed['inference'] + speed['postprocess']:.1f} ms")
+            self.ui.lb_num.setText(str(total_boxes))
+        elif not self.stream_manager.is_active:
+            if not self.stream_manager.opened:
+                self.stop_all_media_sources()
+                self.ui.lb_cameracheck.setText("摄像头: <font color='red'>开启失败</font>")
+                QMessageBox.critical(self, "摄像头启动失败", "未能成功打开任何一路视频源。")
+                return
+            print("所有视频源均已断开或结束...")
+            self.stop_all_media_sources()
+
+    def _update_stream_status(self):
+        """显示多路视频源的打开进度：仍有源在打开时为橙色，全部结束打开后为绿色。"""
+        manager = self.stream_manager
+        total = len(manager.sources)
+        if manager.pending:
+            text = f"摄像头: <font color='orange'>正在打开 {manager.opened}/{total} 路</font>"
+        elif manager.opened:
+            text = f"摄像头: <font color='green'>已开启 {manager.opened}/{total} 路</font>"
+        else:
+            return
+        if self.ui.lb_cameracheck.text() != text:
+            self.ui.lb_cameracheck.setText(text)
+
+    @property
+    def is_model_loading(self) -> bool:
+        return self.model_loader is not None
+
     def load_model(self, model_path: Path):
-        if self.all_detection_results:
+        """在后台线程中加载模型，界面保持响应；结果由 _on_model_loaded / _on_model_load_failed 处理。"""
+        if self.detection_model.total_rows():
             self._reset_session_with_confirmation()
 
         self.stop_all_media_sources()
-        QApplication.processEvents()
-
-        new_api_instance = YoloAPI.create_instance(model_path, device="cpu")
-        if new_api_instance:
-            self.yolo = new_api_instance
-            print(f"已加载模型: {model_path.name}")
-            self.ui.display.setText(f"模型 '{model_path.name}' 已加载完毕。\n请打开图片或视频进行检测。")
-            self.last_yolo_result = None
-            self.clear_target_details()
-            self.ui.lb_num.setText("0")
-            self.ui.lb_time.setText("0.0 ms")
+        self.infer_worker.set_model(None)
+        self._release_model(self.yolo)
+        self.yolo = None
+
+        if self.model_loader is not None:
+            # 旧的加载请求已被取代：断开信号，等它自行结束后再释放（若启动了推理进程池则直接关闭）
+            self.model_loader.loaded.disconnect(self._on_model_loaded)
+            self.model_loader.failed.disconnect(self._on_model_load_failed)
+            self.model_loader.loaded.connect(lambda yolo, _path: self._release_model(yolo))
+            self._finished_loaders.append(self.model_loader)
+
+        loader = ModelLoaderThread(model_path, device="cpu", imgsz=IMG_SIZE, warmup=MODEL_WARMUP,
+                                   backend=self.ui.cb_backend.currentText() or PYTORCH,
+                                   processes=INFER_PROCESSES, parent=self)
+        loader.progress.connect(self._on_model_load_progress)
+        loader.loaded.connect(self._on_model_loaded)
+        loader.failed.connect(self._on_model_load_failed)
+        loader.finished.connect(lambda: self._release_loader(loader))
+        self.model_loader = loader
+        self._on_model_load_progress(f"正在加载模型 {model_path.name} ...")
+        self.model_progress.show()
+        loader.start()
+
+    @staticmethod
+    def _release_model(yolo):
+        """多进程推理池持有子进程和共享内存，不再使用时必须显式关闭。"""
+        if isinstance(yolo, ProcessInferencePool):
+            yolo.close()
+
+    def _release_loader(self, loader: ModelLoaderThread):
+        if loader in self._finished_loaders:
+            self._finished_loaders.remove(loader)
+        loader.deleteLater()
+
+    def _on_model_load_progress(self, message: str):
+        self.model_progress.setFormat(message)
+        if self.current_media_path == "N/A" and self._queued_action is None:
+            self.ui.display.setText(message)
+
+    def _on_model_loaded(self, yolo: YoloAPI, model_path: Path):
+        self.model_loader = None
+        self.model_progress.hide()
+        self.yolo = yolo
+        self.infer_worker.set_model(self.yolo)
+        print(f"已加载模型: {model_path.name} ({yolo.backend})")
+        self.last_yolo_result = None
+        self.clear_target_details()
+        self.ui.lb_num.setText("0")
+        self.ui.lb_time.setText("0.0 ms")
+        if self._queued_action is not None:
+            action, self._queued_action = self._queued_action, None
+            action()
         else:
-            self.yolo = None
-            QMessageBox.critical(self, "加载失败", f"模型加载失败:\n{model_path.name}\n请检查路径或模型文件是否损坏。")
+            self.ui.display.setText(f"模型 '{model_path.name}' 已加载完毕。\n请打开图片或视频进行检测。")
+
+    def _on_model_load_failed(self, model_path: Path, message: str):
+        self.model_loader = None
+        self.model_progress.hide()
+        self._queued_action = None
+        self.yolo = None
+        self.infer_worker.set_model(None)
+        self.ui.display.setText("模型加载失败")
+        QMessageBox.critical(self, "加载失败", f"模型加载失败:\n{model_path.name}\n{message}")
 
 
     def _reset_session_with_confirmation(self):
-        if not self.all_detection_results:
+        if not self.detection_model.total_rows():
             return
         reply = QMessageBox.question(self, '确认操作', '确定要清空所有检测记录吗？\n此操作不可撤销。',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.all_detection_results.clear()
-            self.ui.tableWidget.setRowCount(0)
+            self.detection_model.clear()
+            self._close_result_sink()
             self.last_yolo_result = None
             self.clear_target_details()
             self.ui.lb_num.setText("0")
@@ -252,19 +599,23 @@ class DisplayApp(QWidget):
 
     def _process_and_display_frame(self):
         """
-        处理并显示下一帧。此函数根据当前激活的媒体源（摄像头或媒体文件）进行分发。
+        取出下一帧并交给推理线程。此函数根据当前激活的媒体源（摄像头或媒体文件）进行分发，
+        推理结果由 _on_inference_result 在 GUI 线程中异步绘制。
         """
-        result: Optional[FrameResult] = None
         frame: Optional[np.ndarray] = None
 
+        if self.stream_manager:
+            self._poll_streams()
+            return
         if self.camera_api and self.camera_api.is_active:
-            # 摄像头模式
-            result = self.camera_api.process_next_frame(mirror_flip=True)
-            if result is None:
+            # 摄像头模式：流水线已完成推理，这里只取最新结果渲染
+            result = self.camera_api.get_latest_result()
+            if result is not None:
+                self._show_result(result)
+            elif self.camera_api.pipeline_finished:
                 print("摄像头信号丢失或结束...")
                 self.stop_camera()
-                return
-            frame = result["raw_frame"]
+            return
         else:
             # 媒体文件（图片或视频）模式
             success, frame = self.media_manager.get_next_frame()
@@ -273,31 +624,30 @@ class DisplayApp(QWidget):
                 self.ui.display.setText("播放结束")
                 return
 
-            if self.yolo:
-                try:
-                    result = next(self.yolo.infer(frame))
-                except StopIteration:
-                    result = {"raw_frame": frame, "boxes": [], "speed": {'preprocess': 0, 'inference': 0, 'postprocess': 0}}
-                except Exception as e:
-                    print(f"YOLO推理发生错误: {e}")
-                    result = {"raw_frame": frame, "boxes": [], "speed": {'preprocess': 0, 'inference': 0, 'postprocess': 0}}
-            else:
-                cv2.putText(frame, "No Model Loaded", (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                result = {"raw_frame": frame, "boxes": [], "speed": {'preprocess': 0, 'inference': 0, 'postprocess': 0}}
-
-        if result:
-            # 确保 media_manager 的 last_raw_frame 被更新，以供resizeEvent使用
-            self.media_manager.last_raw_frame = result["raw_frame"] # 存储原始帧数据
-            self.last_yolo_result = result
-            self.update_ui_with_results(result)
-        elif frame is not None:
-            self.media_manager.last_raw_frame = frame # 存储原始帧数据
-            self.media_manager.draw_frame(frame)
-            self.last_yolo_result = {"raw_frame": frame, "boxes": [], "speed": {'preprocess': 0, 'inference': 0, 'postprocess': 0}}
-            self.update_ui_with_results(self.last_yolo_result)
-
-
-    def update_ui_with_results(self, result: FrameResult):
+        if self.yolo:
+            self.infer_worker.submit(frame, (self._session_id, self.current_media_path, self.media_manager.frame_scale),
+                                     frame_index=self.media_manager.frame_index)
+        else:
+            cv2.putText(frame, "No Model Loaded", (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            self._show_result(empty_result(frame))
+
+    def _on_inference_result(self, result: FrameResult, tag):
+        """推理线程完成一帧后的回调（在 GUI 线程中执行）。"""
+        session_id, media_path, decode_scale = tag
+        if session_id != self._session_id:
+            return # 媒体源已切换，丢弃过期结果
+        # 图片是降分辨率解码的，把检测框映射回原图坐标
+        self._show_result(rescale_result(result, decode_scale), media_path)
+
+    def _show_result(self, result: FrameResult, media_path: Optional[str] = None):
+        # 确保 media_manager 的 last_raw_frame 被更新，以供resizeEvent使用
+        self.media_manager.last_raw_frame = result["raw_frame"] # 存储原始帧数据
+        self.last_yolo_result = result
+        with TRACE.stage("ui_update"):
+            self.update_ui_with_results(result, media_path)
+        TRACE.mark_frame()
+
+    def update_ui_with_results(self, result: FrameResult, media_path: Optional[str] = None):
         speed = result["speed"]
         total_time = speed['preprocess'] + speed['inference'] + speed['postprocess']
         self.ui.lb_time.setText(f"{total_time:.1f} ms")
@@ -306,23 +656,45 @@ class DisplayApp(QWidget):
         self.current_frame_boxes = boxes
         self.ui.lb_num.setText(str(len(boxes)))
 
+        # 跟踪模式下目标带 track_id，下拉框显示为 "类别 #ID"，并在各帧之间保持选中同一个 ID
+        track_ids = result["detections"].track_id
         self.ui.cb_select_target.blockSignals(True)
         self.ui.cb_select_target.clear()
         if len(boxes) > 1:
             self.ui.cb_select_target.addItem("All")
-            for i, box in enumerate(boxes):
-                self.ui.cb_select_target.addItem(f"{box[6]} {i}", userData=i)
-        elif len(boxes) == 1:
-            self.ui.cb_select_target.addItem(f"{boxes[0][6]} 0", userData=0)
-        else:
+        for i, box in enumerate(boxes):
+            label = f"{box[6]} #{track_ids[i]}" if track_ids is not None else f"{box[6]} {i}"
+            self.ui.cb_select_target.addItem(label, userData=i)
+        if not boxes:
             self.ui.cb_select_target.addItem("None")
             self.clear_target_details()
+        elif track_ids is not None and self._selected_track_id is not None:
+            hits = np.flatnonzero(track_ids == self._selected_track_id)
+            if len(hits):
+                self.ui.cb_select_target.setCurrentIndex(int(hits[0]) + (1 if len(boxes) > 1 else 0))
 
         self.ui.cb_select_target.blockSignals(False)
 
         self.on_target_selection_change(self.ui.cb_select_target.currentIndex())
 
-        self._add_detections_to_table(boxes)
+        with TRACE.stage("table"):
+            path = media_path or self.current_media_path
+            if self.tracking is not None:
+                # 跟踪模式：轨迹结束时才记录，每条轨迹一行，而不是每帧每个目标一行
+                self._log_tracks(path, self.tracking.drain_finished(), self.tracking.class_names)
+            else:
+                self.detection_model.append(path, result["detections"])
+                self._stream_detections(path, result["detections"], result.get("frame_index"))
+
+    def _on_target_selected(self, index: int):
+        """用户在下拉框中选择目标：跟踪模式下记住其 track_id，后续帧继续高亮同一目标。"""
+        box_index = self.ui.cb_select_target.itemData(index)
+        track_ids = self.last_yolo_result["detections"].track_id if self.last_yolo_result else None
+        if isinstance(box_index, int) and track_ids is not None and box_index < len(track_ids):
+            self._selected_track_id = int(track_ids[box_index])
+        else:
+            self._selected_track_id = None
+        self.on_target_selection_change(index)
 
     def on_target_selection_change(self, index: int):
         target_index_in_boxes = self.ui.cb_select_target.itemData(index)
@@ -343,34 +715,47 @@ class DisplayApp(QWidget):
 
         if self.last_yolo_result and self.media_manager.last_raw_frame is not None:
             highlight_index = target_index_in_boxes if isinstance(target_index_in_boxes, int) else None
-            refreshed_frame = draw_boxes(
-                raw_frame=self.media_manager.last_raw_frame, # 使用缓存的原始帧
-                all_boxes=self.last_yolo_result["boxes"],
-                target_index=highlight_index
+            # 框直接画在缩放后的显示缓冲区上，不再复制整张原始帧
+            self.media_manager.draw_frame(
+                self.media_manager.last_raw_frame, # 使用缓存的原始帧
+                boxes=self.last_yolo_result["boxes"],
+                target_index=highlight_index,
+                box_scale=self.last_yolo_result.get("decode_scale", 1.0)
             )
-            self.media_manager.draw_frame(refreshed_frame)
-
-    def _add_detections_to_table(self, boxes: list[Box]):
-        for box in boxes:
-            index = len(self.all_detection_results) + 1
-            path = self.current_media_path
-            class_name = box[6]
-            confidence = f"{box[4]:.2f}"
-            coords = f"({int(box[0])}, {int(box[1])}, {int(box[2])}, {int(box[3])})"
-
-            row_data = [index, path, class_name, confidence, coords]
-            self.all_detection_results.append(row_data)
-
-            row_position = self.ui.tableWidget.rowCount()
-            self.ui.tableWidget.insertRow(row_position)
-            for col, data in enumerate(row_data):
-                item = QTableWidgetItem(str(data))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.ui.tableWidget.setItem(row_position, col, item)
-        self.ui.tableWidget.scrollToBottom()
+
+    def _stream_detections(self, path: str, detections, frame_index: Optional[int] = None, frame_range=None):
+        """
+        把检测结果写入实时结果文件。frame_index 为帧在来源中的真实序号（视频、摄像头、多路流），
+        没有时（图片、幻灯片）按来源路径各自计数；轨迹行的帧号由 frame_range 给出。
+        """
+        if frame_index is None and frame_range is None:
+            frame_index = self._frame_counters[path] = self._frame_counters.get(path, -1) + 1
+        if not RESULT_STREAM_ENABLED or len(detections) == 0:
+            return
+        if self.result_sink is None:
+            stream_path = Path(RESULT_STREAM_DIR) / f"session_{time.strftime('%Y%m%d_%H%M%S')}.{RESULT_STREAM_FORMAT}"
+            try:
+                self.result_sink = open_sink(stream_path, RESULT_STREAM_FORMAT)
+                print(f"检测结果将实时写入: {stream_path}")
+            except Exception as e:
+                print(f"无法创建结果文件，关闭实时写入: {e}")
+                return
+        self.result_sink.write(path, frame_index, detections, frame_range)
+
+    def _on_rows_inserted(self, _count: int):
+        self.ui.tableView.scrollToBottom()
+        if self.result_sink:
+            self.result_sink.flush()
+
+    def _close_result_sink(self):
+        if self.result_sink:
+            self.result_sink.close()
+            print(f"检测结果已保存到: {self.result_sink.path}")
+            self.result_sink = None
+        self._frame_counters.clear()
 
     def save_results_to_csv(self):
-        if not self.all_detection_results:
+        if not self.detection_model.total_rows():
             QMessageBox.warning(self, "无数据", "没有检测结果可以保存。")
             return
 
@@ -380,17 +765,44 @@ class DisplayApp(QWidget):
         if not file_path:
             return
 
+        # 导出始终使用表格的列（TABLE_HEADERS）。表格超过 TABLE_MAX_ROWS 时最早的行已被移出窗口：
+        # 有可读回的实时结果文件时从中导出完整记录，否则提示用户只能导出保留的部分
+        rows = self.detection_model.iter_rows()
+        dropped = self.detection_model.store.dropped
+        from_sink = dropped > 0 and isinstance(self.result_sink, (CsvSink, JsonlSink))
+        if dropped and not from_sink:
+            reply = QMessageBox.question(
+                self, "记录不完整",
+                f"表格只保留最近 {len(self.detection_model.store)} 行，最早的 {dropped} 行已被移出且没有实时结果文件。\n"
+                f"是否仍然只导出保留的行？",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+
         try:
+            if from_sink:
+                rows = (self._record_to_table_row(r) for r in iter_records(self.result_sink))
             with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
                 writer = csv.writer(csvfile)
-                headers = [self.ui.tableWidget.horizontalHeaderItem(i).text()
-                           for i in range(self.ui.tableWidget.columnCount())]
-                writer.writerow(headers)
-                writer.writerows(self.all_detection_results)
-            QMessageBox.information(self, "保存成功", f"结果已成功保存到:\n{file_path}")
+                writer.writerow(TABLE_HEADERS)
+                writer.writerows(rows)
+            message = f"结果已成功保存到:\n{file_path}"
+            if self.result_sink and not from_sink:
+                message += f"\n\n完整记录实时保存在:\n{self.result_sink.path}"
+            QMessageBox.information(self, "保存成功", message)
         except Exception as e:
             QMessageBox.critical(self, "保存失败", f"保存文件时发生错误:\n{e}")
 
+    @staticmethod
+    def _record_to_table_row(record: dict) -> list:
+        """把实时结果文件中的一行（RESULT_COLUMNS）转换成与表格相同的列。"""
+        x1, y1, x2, y2 = (int(float(record[k])) for k in ("x1", "y1", "x2", "y2"))
+        track = ""
+        if record.get("track_id") not in (None, ""):
+            track = format_track(int(record["track_id"]), int(record["first_frame"]), int(record["last_frame"]))
+        return [record["index"], record["source"], record["class_name"],
+                f"{float(record['confidence']):.2f}", f"({x1}, {y1}, {x2}, {y2})", track]
+
     def clear_target_details(self):
         self.ui.lb_conf.setText("-")
         self.ui.lb_type.setText("-")
@@ -400,26 +812,16 @@ class DisplayApp(QWidget):
         self.ui.lb_ymax.setText("-")
 
     def toggle_camera(self):
-        if self.camera_api and self.camera_api.is_active:
+        if self.stream_manager or (self.camera_api and self.camera_api.is_active):
             self.stop_camera()
         else:
             self.start_camera()
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        # ✅ 修改：确保 resizeEvent 使用 MediaHandler 缓存的最新原始帧，并重新绘制
+        # ✅ 修改：确保 resizeEvent 使用 MediaHandler 缓存的最新原始帧，并按新尺寸重新绘制
         if self.last_yolo_result and self.media_manager.last_raw_frame is not None:
-             # 重新绘制带有检测框的帧
-            current_target_index = self.ui.cb_select_target.itemData(self.ui.cb_select_target.currentIndex())
-            highlight_index = current_target_index if isinstance(current_target_index, int) else None
-
-            # 使用 media_manager.last_raw_frame 作为 draw_boxes 的 raw_frame
-            refreshed_frame = draw_boxes(
-                raw_frame=self.media_manager.last_raw_frame,
-                all_boxes=self.last_yolo_result["boxes"],
-                target_index=highlight_index
-            )
-            self.media_manager.draw_frame(refreshed_frame)
+            self.media_manager.handle_resize()
         else:
             # 如果没有加载媒体或摄像头，清空显示
             self.ui.display.clear()
@@ -428,7 +830,14 @@ class DisplayApp(QWidget):
 
     def closeEvent(self, event):
         self.stop_all_media_sources()
+        self._queued_action = None
+        for loader in [self.model_loader, *self._finished_loaders]:
+            if loader is not None:
+                loader.wait() # 模型加载无法中途取消，等待其结束再退出
+        self.infer_worker.stop()
+        self._close_result_sink()
         if self.yolo:
+            self._release_model(self.yolo)
             del self.yolo
         super().closeEvent(event)
 
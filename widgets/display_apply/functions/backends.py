@@ -0,0 +1,80 @@
+# functions/backends.py
+import importlib.util
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+# 推理后端：pytorch 直接运行 .pt；onnx / openvino 先由 .pt 导出一次，导出结果缓存在权重旁边，
+# 之后仍通过 Ultralytics 的 YOLO(导出文件) 加载，因此推理结果（FrameResult）与 .pt 完全一致。
+PYTORCH = "pytorch"
+ONNX = "onnx"
+OPENVINO = "openvino"
+BACKENDS = (PYTORCH, ONNX, OPENVINO)
+
+# 各后端运行时依赖的模块，缺失时回退到 pytorch
+_RUNTIME_MODULES = {ONNX: "onnxruntime", OPENVINO: "openvino"}
+
+
+def backend_available(backend: str) -> bool:
+    module = _RUNTIME_MODULES.get(backend)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def available_backends() -> list[str]:
+    return [b for b in BACKENDS if backend_available(b)]
+
+
+def detect_backend(model_path: Union[str, Path]) -> str:
+    """根据模型文件本身判断其后端：.onnx、*_openvino_model 目录或 .pt。"""
+    p = Path(model_path)
+    if p.suffix.lower() == ".onnx":
+        return ONNX
+    if p.is_dir() and p.name.endswith("_openvino_model"):
+        return OPENVINO
+    return PYTORCH
+
+
+def exported_path(weights: Path, backend: str) -> Path:
+    """Ultralytics 导出文件的默认位置（与 .pt 同目录）。"""
+    if backend == ONNX:
+        return weights.with_suffix(".onnx")
+    if backend == OPENVINO:
+        return weights.with_name(f"{weights.stem}_openvino_model")
+    return weights
+
+
+def _is_stale(exported: Path, weights: Path) -> bool:
+    if not exported.exists():
+        return True
+    return exported.stat().st_mtime < weights.stat().st_mtime
+
+
+def resolve_model_path(model_path: Union[str, Path], backend: str, imgsz: int,
+                       progress: Optional[Callable[[str], None]] = None) -> Path:
+    """
+    返回按 backend 运行时实际要加载的模型路径。
+
+    传入 .pt 且 backend 为 onnx / openvino 时，若权重旁还没有导出结果（或 .pt 比导出结果新），
+    先导出一次；之后直接复用导出结果。传入的已经是导出模型时原样返回。
+    所选后端的运行时未安装时打印提示并退回 .pt。
+    """
+    report = progress or (lambda msg: None)
+    weights = Path(model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的推理后端: {backend}，可选: {', '.join(BACKENDS)}")
+    if backend == PYTORCH or detect_backend(weights) != PYTORCH:
+        return weights
+    if not backend_available(backend):
+        print(f"[警告] 未安装 {_RUNTIME_MODULES[backend]}，无法使用 {backend} 后端，改用 pytorch。")
+        return weights
+
+    target = exported_path(weights, backend)
+    if _is_stale(target, weights):
+        from ultralytics import YOLO
+
+        print(f"正在把 {weights.name} 导出为 {backend} 模型（只需一次）...")
+        report(f"正在导出 {backend} 模型 {weights.name} ...")
+        # dynamic=True 使导出模型支持任意 batch，批量推理不受影响
+        out = YOLO(str(weights)).export(format=backend, imgsz=imgsz, dynamic=True, half=False)
+        target = Path(out)
+        print(f"导出完成: {target}")
+    return target
@@ -1,24 +1,38 @@
 import cv2
-from functions.yolo_api import YoloAPI, FrameResult
+import numpy as np
+from typing import Optional, Union
+from functions.yolo_api import YoloAPI, FrameResult, empty_result
+from functions.process_pool import ProcessInferencePool
+from functions.tracker import TrackingSession
+from functions.motion_gate import MotionGatedModel
+from functions.frame_pipeline import FramePipeline, DROP_OLDEST
+from functions.perf_trace import TRACE
+from functions.frame_ring import FrameRing
 
 class CameraYoloAPI:
     """
     一个高级别的API，它封装了摄像头访问和YOLO实时推理。
     它接收一个已初始化的 YoloAPI 实例来进行推理。
     """
-    def __init__(self, yolo_api: YoloAPI, source: int = 0):
+    def __init__(self, yolo_api: Union[YoloAPI, ProcessInferencePool, TrackingSession, MotionGatedModel], source: Union[int, str] = 0,
+                 ring_size: int = 8):
         """
         初始化摄像头API实例，但不立即打开摄像头。
 
         Args:
-            yolo_api (YoloAPI): 一个已经初始化好的 YoloAPI 实例。
-            source (int): 摄像头ID。
+            yolo_api (YoloAPI): 一个已经初始化好的 YoloAPI 实例（或已启动的多进程推理池、跟踪会话、运动门控包装）。
+            source (Union[int, str]): 摄像头ID，或 RTSP/HTTP 视频流地址。
+            ring_size (int): 复用的帧缓冲区个数，应大于流水线中同时在途的帧数。
         """
-        if not isinstance(yolo_api, YoloAPI):
+        if not isinstance(yolo_api, (YoloAPI, ProcessInferencePool, TrackingSession, MotionGatedModel)):
             raise TypeError("yolo_api 必须是一个 YoloAPI 的实例。")
         self.yolo = yolo_api
         self._source = source
         self.cap = None
+        self.pipeline: Optional[FramePipeline] = None
+        # 采集与翻转都写入预分配的缓冲区，稳定后每帧不再分配新数组
+        self.frame_ring = FrameRing(slots=ring_size)
+        self.frame_index = -1 # 最近读到的一帧的序号（从 0 开始，每次打开摄像头重新计数）
         print(f"CameraYoloAPI 实例已创建，源: {self._source}，等待启动摄像头。")
 
     def start(self) -> bool:
@@ -36,6 +50,7 @@ class CameraYoloAPI:
             self.cap = cv2.VideoCapture(self._source)
             if not self.cap.isOpened():
                 raise RuntimeError(f"无法打开相机: {self._source}")
+            self.frame_index = -1
             print(f"摄像头 {self._source} 已成功启动。")
             return True
         except Exception as e:
@@ -47,6 +62,7 @@ class CameraYoloAPI:
         """
         停止并释放摄像头资源。
         """
+        self.stop_pipeline()
         self.release()
         print(f"摄像头 {self._source} 已停止。")
 
@@ -57,36 +73,117 @@ class CameraYoloAPI:
         """
         return self.cap is not None and self.cap.isOpened()
 
-    def process_next_frame(self, mirror_flip: bool = False):
+    def read_frame(self, mirror_flip: bool = False) -> Optional[np.ndarray]:
         """
-        【核心接口】读取并处理下一帧，返回包含所有信息的字典。
+        只读取（并可选镜像翻转）下一帧，不做推理。
+        供把推理放到工作线程的调用方使用。
 
         Returns:
-            Optional[FrameResult]: 如果成功读取并推理，返回 FrameResult；否则返回 None。
+            Optional[np.ndarray]: 读取成功返回 BGR 帧，否则返回 None。
         """
         if not self.is_active:
-            # print(f"摄像头 {self._source} 未激活，无法处理帧。")
             return None
 
-        ret, frame = self.cap.read()
-        if not ret:
+        with TRACE.stage("capture"):
+            frame = self.frame_ring.read(self.cap)
+        if frame is None:
             print(f"无法从摄像头 {self._source} 读取帧。")
             return None
+        self.frame_index += 1
 
         if mirror_flip:
-            frame = cv2.flip(frame, 1)
+            with TRACE.stage("flip"):
+                frame = self.frame_ring.flip(frame, 1)
+        return frame
+
+    def process_next_frame(self, mirror_flip: bool = False):
+        """
+        【核心接口】读取并处理下一帧，返回包含所有信息的字典。
+
+        Returns:
+            Optional[FrameResult]: 如果成功读取并推理，返回 FrameResult；否则返回 None。
+        """
+        frame = self.read_frame(mirror_flip)
+        if frame is None:
+            return None
 
         # 直接调用 yolo_api 处理帧，并返回结果
         try:
-            result = next(self.yolo.infer(frame))
+            result = next(self.yolo.infer(frame, frame_index=self.frame_index))
             return result
         except StopIteration:
             print("YOLO推理生成器为空，可能没有检测到目标。")
-            return {"raw_frame": frame, "boxes": [], "speed": {'preprocess': 0, 'inference': 0, 'postprocess': 0}} # 返回一个空结果
+            return empty_result(frame, self.yolo.class_names) # 返回一个空结果
         except Exception as e:
             print(f"YOLO推理发生错误: {e}")
             return None # 返回None表示推理失败
 
+    def start_pipeline(self, mirror_flip: bool = False, queue_size: int = 2, policy: str = DROP_OLDEST) -> bool:
+        """
+        以流水线模式运行：采集线程、推理线程各自独立工作，通过有界队列相连，
+        调用方（渲染端）用 get_latest_result() 取最新结果。
+
+        Args:
+            mirror_flip (bool): 是否镜像翻转。
+            queue_size (int): 每个阶段队列的最大深度。
+            policy (str): 队列满时的策略，'drop_oldest' / 'latest_only' / 'block'。
+
+        Returns:
+            bool: 摄像头已打开且流水线启动成功时返回 True。
+        """
+        if not self.is_active and not self.start():
+            return False
+        if self.pipeline and self.pipeline.is_running:
+            return True
+        self.pipeline = FramePipeline(
+            capture_fn=lambda: self._read_indexed(mirror_flip),
+            infer_fn=self._infer_frame,
+            queue_size=queue_size,
+            policy=policy,
+            name=f"camera{self._source}",
+        )
+        self.pipeline.start()
+        return True
+
+    def stop_pipeline(self):
+        """停止流水线线程（不释放摄像头）。"""
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+
+    def get_latest_result(self) -> Optional[FrameResult]:
+        """
+        渲染端接口：取出流水线中最新的推理结果，没有新结果时返回 None。
+        """
+        if not self.pipeline:
+            return None
+        return self.pipeline.get_latest_result()
+
+    @property
+    def pipeline_finished(self) -> bool:
+        """流水线的采集端是否已读不到帧（信号丢失）。"""
+        return self.pipeline is not None and self.pipeline.drained
+
+    def pipeline_stats(self) -> dict:
+        """各阶段队列深度与丢帧统计，帧缓冲区的复用情况，以及运动门控的推理/跳过计数。"""
+        stats = self.pipeline.stats() if self.pipeline else {}
+        stats["frame_ring"] = self.frame_ring.stats()
+        if isinstance(self.yolo, MotionGatedModel):
+            stats["motion_gate"] = self.yolo.stats()
+        return stats
+
+    def _read_indexed(self, mirror_flip: bool) -> Optional[tuple[int, np.ndarray]]:
+        # 流水线中帧与其采集序号一起传递，推理端拿到的是真实序号而不是推理次数
+        frame = self.read_frame(mirror_flip)
+        return None if frame is None else (self.frame_index, frame)
+
+    def _infer_frame(self, item: tuple[int, np.ndarray]) -> FrameResult:
+        frame_index, frame = item
+        result = next(self.yolo.infer(frame, frame_index=frame_index), None)
+        if result is None:
+            return empty_result(frame, self.yolo.class_names)
+        return result
+
     def release(self):
         """
         释放摄像头底层资源。
@@ -94,4 +191,5 @@ class CameraYoloAPI:
         if self.cap and self.cap.isOpened():
             self.cap.release()
             print(f"摄像头 {self._source} 资源已释放。")
-        self.cap = None
\ No newline at end of file
+        self.cap = None
+        self.frame_ring.reset()
\ No newline at end of file
@@ -0,0 +1,220 @@
+# functions/detection_model.py
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, Signal
+
+from functions.yolo_api import Detections
+
+TABLE_HEADERS = ["序号", "文件路径", "类别", "置信度", "坐标位置", "轨迹"]
+
+
+def format_track(track_id: int, first_frame: int, last_frame: int) -> str:
+    """“轨迹”列的显示文本；不是跟踪结果（track_id < 0）时为空。"""
+    if track_id < 0:
+        return ""
+    return f"#{track_id} (帧 {first_frame}-{last_frame})"
+
+
+class DetectionStore:
+    """
+    只追加的列式检测结果存储。
+
+    每一列是一块预分配的 NumPy 数组，容量不足时按倍数扩容；文件路径和类别名
+    以整数 ID 存储（字符串各只保存一份），因此百万行也只占几十 MB。
+    可以用 drop_front() 丢弃最早的行，只保留最近的窗口，序号依然连续。
+    跟踪模式下每行另存 track_id 与起止帧（非跟踪结果为 -1），文件路径保持不变，按文件分组不受影响。
+    """
+    def __init__(self, capacity: int = 4096):
+        self._size = 0
+        self._offset = 0 # 已被丢弃的行数，用于保持序号连续
+        self._alloc(capacity)
+        self._paths: List[str] = []
+        self._path_ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+
+    def _alloc(self, capacity: int):
+        self._path_id = np.empty(capacity, np.int32)
+        self._name_id = np.empty(capacity, np.int32)
+        self._conf = np.empty(capacity, np.float32)
+        self._xyxy = np.empty((capacity, 4), np.int32)
+        self._track_id = np.empty(capacity, np.int32)
+        self._frames = np.empty((capacity, 2), np.int32) # 轨迹的起止帧
+
+    def _grow(self, needed: int):
+        capacity = len(self._conf)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = self._columns()
+        self._alloc(capacity)
+        for new_arr, old_arr in zip(self._columns(), old):
+            new_arr[:self._size] = old_arr[:self._size]
+
+    def _columns(self) -> tuple:
+        return self._path_id, self._name_id, self._conf, self._xyxy, self._track_id, self._frames
+
+    @staticmethod
+    def _intern(value: str, table: List[str], ids: Dict[str, int]) -> int:
+        idx = ids.get(value)
+        if idx is None:
+            idx = ids[value] = len(table)
+            table.append(value)
+        return idx
+
+    def append(self, path: str, detections: Detections, frame_range: Optional[np.ndarray] = None) -> int:
+        """
+        追加一帧的检测结果，返回新增的行数。
+        frame_range 为 (N, 2) 的 [起始帧, 结束帧]，与 detections.track_id 一起记录结束的轨迹。
+        """
+        n = len(detections)
+        if n == 0:
+            return 0
+        self._grow(self._size + n)
+        s = slice(self._size, self._size + n)
+        names = detections.names
+        name_lut = np.array([self._intern(names.get(k, str(k)), self._names, self._name_ids)
+                             for k in range(int(detections.cls.max()) + 1)], np.int32)
+        self._path_id[s] = self._intern(path, self._paths, self._path_ids)
+        self._name_id[s] = name_lut[detections.cls]
+        self._conf[s] = detections.conf
+        self._xyxy[s] = detections.xyxy
+        self._track_id[s] = -1 if detections.track_id is None else detections.track_id
+        self._frames[s] = -1 if frame_range is None else frame_range
+        self._size += n
+        return n
+
+    def drop_front(self, n: int):
+        """丢弃最早的 n 行。"""
+        n = min(n, self._size)
+        if n <= 0:
+            return
+        keep = self._size - n
+        for arr in self._columns():
+            arr[:keep] = arr[n:self._size]
+        self._size = keep
+        self._offset += n
+
+    def clear(self):
+        self._size = 0
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dropped(self) -> int:
+        """已被 drop_front() 丢弃的行数。"""
+        return self._offset
+
+    @property
+    def total(self) -> int:
+        """追加过的总行数（包括已被丢弃的）。"""
+        return self._offset + self._size
+
+    def cell(self, row: int, col: int) -> str:
+        """与原表格一致的单元格显示文本。"""
+        if col == 0:
+            return str(self._offset + row + 1)
+        if col == 1:
+            return self._paths[self._path_id[row]]
+        if col == 2:
+            return self._names[self._name_id[row]]
+        if col == 3:
+            return f"{self._conf[row]:.2f}"
+        if col == 5:
+            first, last = self._frames[row].tolist()
+            return format_track(int(self._track_id[row]), first, last)
+        x1, y1, x2, y2 = self._xyxy[row].tolist()
+        return f"({x1}, {y1}, {x2}, {y2})"
+
+    def iter_rows(self) -> Iterator[list]:
+        """逐行产出 [序号, 文件路径, 类别, 置信度, 坐标位置, 轨迹]，用于导出。"""
+        for row in range(self._size):
+            yield [self.cell(row, col) for col in range(len(TABLE_HEADERS))]
+
+
+class DetectionTableModel(QAbstractTableModel):
+    """
+    基于 DetectionStore 的虚拟化表格模型，配合 QTableView 使用。
+
+    append() 只把结果放进待处理缓冲区，由定时器以固定频率合并成一次
+    beginInsertRows/endInsertRows，视图也只绘制可见的行。
+    max_rows 大于 0 时只保留最近的 max_rows 行（完整结果由 ResultSink 写到磁盘）。
+    """
+    rows_inserted = Signal(int) # 每次批量插入后发出，参数为插入的行数
+
+    def __init__(self, refresh_ms: int = 100, max_rows: int = 0, parent=None):
+        super().__init__(parent)
+        self.store = DetectionStore()
+        self.max_rows = max_rows
+        self._pending: List[tuple[str, Detections, Optional[np.ndarray]]] = []
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(refresh_ms)
+
+    # ---- 数据写入 ----
+    def append(self, path: str, detections: Detections, frame_range: Optional[np.ndarray] = None):
+        if len(detections):
+            self._pending.append((path, detections, frame_range))
+
+    def flush(self):
+        """把待处理的结果一次性插入模型。"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        n = sum(len(d) for _, d, _ in pending)
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + n - 1)
+        for path, detections, frame_range in pending:
+            self.store.append(path, detections, frame_range)
+        self.endInsertRows()
+        self._trim()
+        self.rows_inserted.emit(n)
+
+    def _trim(self):
+        """超出窗口时一次多丢弃 1/4 窗口，避免每次插入都搬移数组。"""
+        size = len(self.store)
+        if self.max_rows <= 0 or size <= self.max_rows:
+            return
+        n = min(size, size - self.max_rows + self.max_rows // 4)
+        self.beginRemoveRows(QModelIndex(), 0, n - 1)
+        self.store.drop_front(n)
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._pending = []
+        self.store.clear()
+        self.endResetModel()
+
+    def total_rows(self) -> int:
+        """包括尚未刷新到视图以及已移出窗口的行在内的总行数。"""
+        return self.store.total + sum(len(d) for _, d, _ in self._pending)
+
+    def iter_rows(self) -> Iterator[list]:
+        self.flush()
+        return self.store.iter_rows()
+
+    # ---- QAbstractTableModel 接口 ----
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(TABLE_HEADERS)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Optional[object]:
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.store.cell(index.row(), index.column())
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter)
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Optional[object]:
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return TABLE_HEADERS[section]
+        return None
@@ -4,6 +4,7 @@ from typing import List, Optional
 import numpy as np
 import cv2
 from functions.yolo_api import Box # 导入我们定义的Box类型
+from functions.perf_trace import TRACE
 
 # 定义颜色和字体，方便统一修改
 COLOR_GREEN = (0, 255, 0)
@@ -12,9 +13,9 @@ FONT_SCALE = 0.7
 FONT_THICKNESS = 2
 BOX_THICKNESS = 2
 
-def _draw_single_box(frame: np.ndarray, box: Box):
-    """一个在图像上绘制单个边界框的辅助函数。"""
-    x1, y1, x2, y2 = int(box[0]), int(box[1]), int(box[2]), int(box[3])
+def _draw_single_box(frame: np.ndarray, box: Box, scale: float = 1.0):
+    """一个在图像上绘制单个边界框的辅助函数。scale 用于把原图坐标映射到缩放后的图像上。"""
+    x1, y1, x2, y2 = int(box[0] * scale), int(box[1] * scale), int(box[2] * scale), int(box[3] * scale)
     confidence = box[4]
     class_name = box[6]
 
@@ -31,10 +32,13 @@ def _draw_single_box(frame: np.ndarray, box: Box):
     cv2.putText(frame, label, (x1, y1 - 5), FONT, FONT_SCALE, (0, 0, 0), FONT_THICKNESS)
 
 
+@TRACE.timed("draw_boxes")
 def draw_boxes(
     raw_frame: np.ndarray,
     all_boxes: List[Box],
-    target_index: Optional[int] = None
+    target_index: Optional[int] = None,
+    scale: float = 1.0,
+    copy: bool = True
 ) -> np.ndarray:
     """
     根据选择在原始帧上绘制边界框。
@@ -45,11 +49,13 @@ def draw_boxes(
         target_index (Optional[int]):
             - 如果是 None, 则绘制所有目标的边界框。
             - 如果是整数 (e.g., 0, 1, 2...), 则只绘制该索引对应的目标。
+        scale (float): raw_frame 相对于框坐标所在原图的缩放比例（在缩放后的显示缓冲上绘制时使用）。
+        copy (bool): 为 False 时直接在 raw_frame 上绘制，不复制整帧。
 
     Returns:
-        np.ndarray: 绘制了所需边界框的新图像。
+        np.ndarray: 绘制了所需边界框的图像。
     """
-    frame_to_draw = raw_frame.copy()
+    frame_to_draw = raw_frame.copy() if copy else raw_frame
 
     if not all_boxes:
         return frame_to_draw # 如果没有检测框，直接返回原图副本
@@ -57,10 +63,10 @@ def draw_boxes(
     if target_index is None:
         # "All" 模式：绘制所有框
         for box in all_boxes:
-            _draw_single_box(frame_to_draw, box)
+            _draw_single_box(frame_to_draw, box, scale)
     elif 0 <= target_index < len(all_boxes):
         # 单目标模式：只绘制选中的那个框
         box_to_draw = all_boxes[target_index]
-        _draw_single_box(frame_to_draw, box_to_draw)
+        _draw_single_box(frame_to_draw, box_to_draw, scale)
 
     return frame_to_draw
\ No newline at end of file
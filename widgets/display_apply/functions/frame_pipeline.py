@@ -0,0 +1,238 @@
+# functions/frame_pipeline.py
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# 队列满时的处理策略
+DROP_OLDEST = "drop_oldest" # 丢弃队首最旧的元素，为新元素腾出位置
+LATEST_ONLY = "latest_only" # 只保留最新的一个元素，其余全部丢弃
+BLOCK = "block"             # 阻塞生产者，直到队列有空位（不丢帧）
+DROP_POLICIES = (DROP_OLDEST, LATEST_ONLY, BLOCK)
+
+
+class Closed(Exception):
+    """队列已关闭时 put/get 抛出的异常。"""
+
+
+class BoundedFrameQueue:
+    """
+    一个有界的线程安全队列，满时按指定策略丢帧或阻塞，并统计深度和丢帧数。
+    """
+    def __init__(self, maxsize: int = 2, policy: str = DROP_OLDEST,
+                 on_drop: Optional[Callable[[Any], None]] = None):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"未知的丢帧策略: {policy}，可选: {DROP_POLICIES}")
+        self.maxsize = 1 if policy == LATEST_ONLY else max(1, maxsize)
+        self.policy = policy
+        self._on_drop = on_drop
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.drop_count = 0
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """
+        放入一个元素。BLOCK 策略下可能阻塞，超时返回 False。
+        """
+        dropped = []
+        with self._cond:
+            if self._closed:
+                raise Closed()
+            if self.policy == BLOCK:
+                if not self._cond.wait_for(lambda: self._closed or len(self._items) < self.maxsize, timeout):
+                    return False
+                if self._closed:
+                    raise Closed()
+            else:
+                while len(self._items) >= self.maxsize:
+                    dropped.append(self._items.popleft())
+                    self.drop_count += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify_all()
+        if self._on_drop:
+            for item in dropped:
+                self._on_drop(item)
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        取出一个元素，队列为空时阻塞。超时抛出 TimeoutError，关闭后抛出 Closed。
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or self._items, timeout):
+                raise TimeoutError()
+            if not self._items:
+                raise Closed()
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def get_nowait(self) -> Optional[Any]:
+        """非阻塞地取出一个元素，队列为空时返回 None。"""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def get_latest(self) -> Optional[Any]:
+        """取出最新的元素并丢弃其余所有元素（渲染端使用）。"""
+        with self._cond:
+            if not self._items:
+                return None
+            dropped = list(self._items)[:-1]
+            item = self._items.pop()
+            self._items.clear()
+            self.drop_count += len(dropped)
+            self._cond.notify_all()
+        if self._on_drop:
+            for old in dropped:
+                self._on_drop(old)
+        return item
+
+    def close(self):
+        """关闭队列并唤醒所有等待者。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"depth": len(self._items), "maxsize": self.maxsize,
+                    "put": self.put_count, "dropped": self.drop_count}
+
+
+class FramePipeline:
+    """
+    采集 → 推理 → 渲染 三段式流水线。
+
+    采集线程不停调用 capture_fn 读帧放入 capture 队列；推理线程从中取帧调用 infer_fn，
+    结果放入 render 队列；渲染端（通常是 GUI 定时器）调用 get_latest_result() 取最新结果。
+    两个队列都有界，满时按 policy 处理，因此显示的永远是最新帧，且延迟不会累积。
+    """
+    def __init__(self,
+                 capture_fn: Callable[[], Optional[Any]],
+                 infer_fn: Callable[[Any], Any],
+                 queue_size: int = 2,
+                 policy: str = DROP_OLDEST,
+                 name: str = "pipeline"):
+        self._capture_fn = capture_fn
+        self._infer_fn = infer_fn
+        self.name = name
+        self.capture_queue = BoundedFrameQueue(queue_size, policy)
+        self.render_queue = BoundedFrameQueue(queue_size, policy)
+        self._threads: list[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self.finished = threading.Event() # 采集端读不到帧（信号丢失/视频结束）时置位
+        self.captured = 0
+        self.inferred = 0
+        self.errors = 0
+        self._infer_ms = 0.0
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop_event.clear()
+        self.finished.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name=f"{self.name}-capture", daemon=True),
+            threading.Thread(target=self._infer_loop, name=f"{self.name}-infer", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        停止并等待两个线程结束。默认一直等到线程退出：采集线程可能正阻塞在 cap.read() 中
+        （慢速 RTSP 源），调用方要在 stop() 返回后才能安全地释放视频源。
+        """
+        self._stop_event.set()
+        self.capture_queue.close()
+        self.render_queue.close()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._threads) and not self._stop_event.is_set()
+
+    @property
+    def drained(self) -> bool:
+        """采集端已结束，且所有已采集的帧都已推理并被渲染端取走。"""
+        return self.finished.is_set() and self.render_queue.closed and len(self.render_queue) == 0
+
+    def _capture_loop(self):
+        while not self._stop_event.is_set():
+            frame = self._capture_fn()
+            if frame is None:
+                self.finished.set()
+                self.capture_queue.close()
+                return
+            try:
+                if not self._put(self.capture_queue, frame):
+                    return
+                self.captured += 1
+            except Closed:
+                return
+
+    def _infer_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                frame = self.capture_queue.get(timeout=0.5)
+            except TimeoutError:
+                continue
+            except Closed:
+                self.render_queue.close()
+                return
+            t0 = time.perf_counter()
+            try:
+                result = self._infer_fn(frame)
+            except Exception as e:
+                self.errors += 1
+                print(f"[{self.name}] 推理发生错误: {e}")
+                continue
+            self._infer_ms = (time.perf_counter() - t0) * 1000
+            self.inferred += 1
+            try:
+                if not self._put(self.render_queue, result):
+                    return
+            except Closed:
+                return
+
+    def _put(self, queue: BoundedFrameQueue, item: Any) -> bool:
+        """
+        放入队列。BLOCK 策略下超时只是为了能响应 stop()，会一直重试直到放入成功，
+        因此不会静默丢帧；只有在流水线停止时才放弃并返回 False。
+        """
+        while not queue.put(item, timeout=0.5):
+            if self._stop_event.is_set():
+                return False
+        return True
+
+    def get_latest_result(self) -> Optional[Any]:
+        """渲染端：取最新的推理结果，没有新结果时返回 None。"""
+        return self.render_queue.get_latest()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各阶段队列深度、丢帧数与计数，便于在负载下调参。"""
+        return {
+            "captured": self.captured,
+            "inferred": self.inferred,
+            "errors": self.errors,
+            "last_infer_ms": self._infer_ms,
+            "capture_queue": self.capture_queue.stats(),
+            "render_queue": self.render_queue.stats(),
+        }
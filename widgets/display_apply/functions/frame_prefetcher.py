@@ -0,0 +1,117 @@
+# functions/frame_prefetcher.py
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class ImagePrefetcher:
+    """
+    图片序列的后台预解码器。
+
+    在线程池中提前解码当前位置之后的 lookahead 张图片，解码结果放入按字节数限制的
+    LRU 缓存。前进时下一张通常已解码完毕，后退时最近看过的图片仍在缓存中，可以立即显示。
+    """
+    def __init__(self,
+                 paths: List[Path],
+                 decode_fn: Callable[[Path], Any],
+                 lookahead: int = 4,
+                 cache_bytes: int = 512 * 1024 * 1024,
+                 workers: int = 2,
+                 size_fn: Callable[[Any], int] = lambda frame: frame.nbytes,
+                 variant_fn: Optional[Callable[[], Hashable]] = None):
+        """
+        decode_fn 返回解码结果（通常是 np.ndarray，解码失败返回 None）；
+        结果不是数组时需提供 size_fn 计算其占用的字节数。
+        variant_fn 返回当前的解码参数（如降分辨率解码的目标尺寸）。提供时它是缓存键的一部分，
+        并作为第二个参数传给 decode_fn：参数变化后旧的解码结果不会再被命中，随 LRU 自然淘汰。
+        """
+        self.paths = paths
+        self._decode_fn = decode_fn
+        self._size_fn = size_fn
+        self._variant_fn = variant_fn
+        self.lookahead = max(0, lookahead)
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[Tuple[int, Hashable], Any]" = OrderedDict()
+        self._cache_size = 0
+        self._inflight: Dict[Tuple[int, Hashable], Future] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, index: int) -> Tuple[int, Hashable]:
+        return index, (self._variant_fn() if self._variant_fn else None)
+
+    def get(self, index: int) -> Any:
+        """
+        取出第 index 张图片的解码结果：命中缓存立即返回，正在解码则等待，否则同步解码。
+        """
+        key = self._key(index)
+        with self._lock:
+            frame = self._cache.get(key)
+            if frame is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return frame
+            future = self._inflight.get(key)
+        self.misses += 1
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                return None
+        frame = self._decode(key)
+        self._store(key, frame)
+        return frame
+
+    def prefetch(self, index: int, direction: int = 1):
+        """从 index 开始，按 direction 方向提前解码 lookahead 张图片（循环播放）。"""
+        n = len(self.paths)
+        if n == 0:
+            return
+        for step in range(1, self.lookahead + 1):
+            key = self._key((index + direction * step) % n)
+            with self._lock:
+                if key in self._cache or key in self._inflight:
+                    continue
+                future = self._pool.submit(self._decode, key)
+                self._inflight[key] = future
+            future.add_done_callback(lambda f, key=key: self._on_decoded(key, f))
+
+    def _decode(self, key: Tuple[int, Hashable]) -> Any:
+        index, variant = key
+        try:
+            if self._variant_fn:
+                return self._decode_fn(self.paths[index], variant)
+            return self._decode_fn(self.paths[index])
+        except Exception as e:
+            print(f"读取图片失败 '{self.paths[index].name}': {e}")
+            return None
+
+    def _on_decoded(self, key: Tuple[int, Hashable], future: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._store(key, future.result())
+
+    def _store(self, key: Tuple[int, Hashable], frame: Any):
+        if frame is None:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = frame
+            self._cache_size += self._size_fn(frame)
+            # 超出字节上限时淘汰最久未使用的图片，但至少保留刚放入的这一张
+            while self._cache_size > self.cache_bytes and len(self._cache) > 1:
+                _, old = self._cache.popitem(last=False)
+                self._cache_size -= self._size_fn(old)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._cache.clear()
+            self._inflight.clear()
+            self._cache_size = 0
@@ -0,0 +1,124 @@
+# functions/frame_ring.py
+import threading
+import weakref
+from collections import deque
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def _data_ptr(arr: np.ndarray) -> int:
+    return arr.__array_interface__['data'][0]
+
+
+class _Lease:
+    """
+    一块环缓冲区的租约。FrameRing 交出去的数组以租约为内存所有者（.base），
+    由它切出的切片、视图经 .base 链引用这个数组，因此所有这些数组都释放后租约才被回收。
+    """
+    def __init__(self, buf: np.ndarray):
+        self.buf = buf
+        self.__array_interface__ = buf.__array_interface__
+
+
+class FrameRing:
+    """
+    预分配的帧缓冲区环，供视频采集循环复用。
+
+    read() 通过 cap.read(image=buf) 直接解码进空闲缓冲区，flip() 用 cv2.flip(dst=buf) 翻转进另一块缓冲区，
+    稳定运行后每帧不再分配新的 NumPy 数组。
+    每次交出的帧都带一个租约（引用计数句柄）：队列、FrameResult、显示缓存以及由它切出的视图
+    全部丢弃引用后，租约被回收，缓冲区自动回到空闲列表，因此调用方不需要手动归还。
+    所有缓冲区都被占用时环会增长到 max_slots；再不够时临时分配一块不纳入环的数组，计入 overflow。
+    """
+    def __init__(self, slots: int = 8, max_slots: Optional[int] = None):
+        self.slots = max(2, slots)
+        self.max_slots = max(self.slots, max_slots or 2 * self.slots)
+        self._buffers: List[np.ndarray] = []
+        self._free: deque = deque() # 空闲缓冲区的下标，先归还的先复用，让刚交出去的缓冲区有更多时间被释放
+        self._shape: Optional[Tuple[int, ...]] = None
+        self._generation = 0 # reset 后旧缓冲区的租约回收时不再放回空闲列表
+        # 租约可能在任意线程（例如界面线程丢弃显示缓存时）被回收，用可重入锁保护空闲列表
+        self._lock = threading.RLock()
+        self.allocations = 0 # 纳入环的缓冲区分配次数（稳定后不再增长）
+        self.overflow = 0 # 环已满、只能临时分配的次数
+        self.reuses = 0
+
+    def reset(self):
+        """丢弃所有缓冲区（例如分辨率变化或更换视频源时）。仍被引用的旧帧不受影响，只是不再回到环中。"""
+        with self._lock:
+            self._buffers = []
+            self._free.clear()
+            self._shape = None
+            self._generation += 1
+
+    def _release(self, generation: int, index: int):
+        with self._lock:
+            if generation == self._generation:
+                self._free.append(index)
+
+    def _lease(self, index: int) -> np.ndarray:
+        lease = _Lease(self._buffers[index])
+        frame = np.asarray(lease)
+        weakref.finalize(lease, self._release, self._generation, index)
+        return frame
+
+    def _adopt(self, frame: np.ndarray) -> np.ndarray:
+        """把 OpenCV 新分配的帧作为（新尺寸的）环的第一块缓冲区，返回带租约的数组。"""
+        with self._lock:
+            self.reset()
+            self._shape = frame.shape
+            self._buffers.append(frame)
+            self.allocations += 1
+            return self._lease(0)
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """取一块空闲缓冲区（带租约），没有时按上述规则增长或临时分配。"""
+        with self._lock:
+            if self._shape != tuple(shape):
+                self.reset()
+                self._shape = tuple(shape)
+            if self._free:
+                self.reuses += 1
+                return self._lease(self._free.popleft())
+            if len(self._buffers) < self.max_slots:
+                self._buffers.append(np.empty(shape, dtype=dtype))
+                self.allocations += 1
+                return self._lease(len(self._buffers) - 1)
+            self.overflow += 1
+        return np.empty(shape, dtype=dtype)
+
+    def read(self, cap: cv2.VideoCapture) -> Optional[np.ndarray]:
+        """从 cap 读取下一帧到环中的缓冲区，失败时返回 None。"""
+        if self._shape is None:
+            # 第一帧尺寸未知，先正常读取，再把它作为环的第一块缓冲区
+            ret, frame = cap.read()
+            if not ret:
+                return None
+            return self._adopt(frame)
+
+        buf = self.acquire(self._shape)
+        ret, frame = cap.read(image=buf)
+        if not ret:
+            return None
+        if _data_ptr(frame) != _data_ptr(buf):
+            # 分辨率变化时 OpenCV 会另行分配，按新尺寸重建环；
+            # 比较数据地址而不是对象身份，cv2 返回包装同一块内存的新数组对象时仍走复用路径
+            return self._adopt(frame)
+        return buf # 带租约的是 buf 本身
+
+    def flip(self, frame: np.ndarray, flip_code: int = 1) -> np.ndarray:
+        """把 frame 翻转到另一块缓冲区；原缓冲区在调用方丢弃引用后即可复用。"""
+        dst = self.acquire(frame.shape, frame.dtype)
+        cv2.flip(frame, flip_code, dst=dst)
+        return dst
+
+    def stats(self) -> dict:
+        return {
+            "slots": len(self._buffers),
+            "free": len(self._free),
+            "allocations": self.allocations,
+            "overflow": self.overflow,
+            "reuses": self.reuses,
+        }
@@ -0,0 +1,79 @@
+# functions/image_decode.py
+import struct
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+# IMREAD_REDUCED_* 在 JPEG 上由 libjpeg 直接做 DCT 缩放，只解码 1/2、1/4、1/8 的数据量
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# JPEG 中表示帧头（含宽高）的 SOF 标记
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def read_jpeg_size(data: np.ndarray) -> Optional[Tuple[int, int]]:
+    """
+    只解析 JPEG 文件头获取 (宽, 高)，不解码像素。非 JPEG 或解析失败时返回 None。
+    """
+    buf = memoryview(np.ascontiguousarray(data, dtype=np.uint8)) # 不复制整个文件
+    if len(buf) < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    i, n = 2, len(buf)
+    while i + 4 <= n:
+        if buf[i] != 0xFF:
+            i += 1
+            continue
+        marker = buf[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        seg_len = struct.unpack(">H", buf[i + 2:i + 4])[0]
+        if marker in _SOF_MARKERS and i + 9 <= n:
+            h, w = struct.unpack(">HH", buf[i + 5:i + 9])
+            return w, h
+        i += 2 + seg_len
+    return None
+
+
+def choose_reduce_factor(width: int, height: int, target_size: int) -> int:
+    """
+    选择最大的缩小倍数（1/2/4/8），使缩小后的长边仍不小于 target_size。
+    """
+    long_side = max(width, height)
+    for factor in (8, 4, 2):
+        if long_side / factor >= target_size:
+            return factor
+    return 1
+
+
+def decode_image(path: Union[str, Path], target_size: Optional[int] = None) -> Tuple[Optional[np.ndarray], float]:
+    """
+    读取图片（支持非 ASCII 路径）。对 JPEG 且给出 target_size 时，自动使用降分辨率解码。
+
+    Args:
+        path: 图片路径。
+        target_size: 需要的最小长边像素（如推理尺寸与显示尺寸中的较大者），None 表示全分辨率。
+
+    Returns:
+        (image, scale): scale 为解码图相对原图的比例（<=1），原图坐标 = 解码图坐标 / scale。
+    """
+    data = np.fromfile(path, dtype=np.uint8)
+    factor = 1
+    size = read_jpeg_size(data) if target_size else None
+    if size is not None:
+        factor = choose_reduce_factor(size[0], size[1], target_size)
+    img = cv2.imdecode(data, _REDUCED_FLAGS[factor])
+    if img is None:
+        return None, 1.0
+    # 用长边计算比例，兼容按 EXIF 方向旋转后的图像
+    scale = max(img.shape[:2]) / max(size) if size is not None and factor > 1 else 1.0
+    return img, scale
@@ -0,0 +1,67 @@
+# functions/image_source.py
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+_END = object()
+
+
+def iter_image_paths(directory: Union[str, Path],
+                     extensions: Set[str],
+                     recursive: bool = False) -> Iterator[Path]:
+    """
+    用 os.scandir 惰性地列出目录中的图片，每一层按文件名排序，子目录在本层文件之后遍历。
+    不会一次性把整棵目录树读进内存，适合上百万张图片的目录。
+    """
+    stack = [Path(directory)]
+    while stack:
+        current = stack.pop()
+        files, subdirs = [], []
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            if os.path.splitext(entry.name)[1].lower() in extensions:
+                                files.append(entry.name)
+                        elif recursive and entry.is_dir():
+                            subdirs.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"无法读取目录 {current}: {e}")
+            continue
+        for name in sorted(files):
+            yield current / name
+        # 反序入栈，使子目录按名称顺序出栈
+        stack.extend(current / name for name in sorted(subdirs, reverse=True))
+
+
+def iter_parallel_ordered(items: Iterable[T],
+                          fn: Callable[[T], object],
+                          workers: int = 4,
+                          max_inflight: Optional[int] = None) -> Iterator[Tuple[T, object]]:
+    """
+    在线程池中并行执行 fn(item)，按输入顺序产出 (item, 结果)。
+
+    同时最多只有 max_inflight（默认 2*workers）个任务在执行或等待被取走，
+    因此内存占用有上限，与输入总量无关。fn 抛出的异常会在取到该项时重新抛出。
+    """
+    workers = max(1, workers)
+    max_inflight = max(1, max_inflight or 2 * workers)
+    it = iter(items)
+    window: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        for item in it:
+            window.append((item, pool.submit(fn, item)))
+            if len(window) >= max_inflight:
+                break
+        while window:
+            item, future = window.popleft()
+            nxt = next(it, _END)
+            if nxt is not _END:
+                window.append((nxt, pool.submit(fn, nxt)))
+            yield item, future.result()
@@ -0,0 +1,97 @@
+# functions/infer_worker.py
+import threading
+from typing import Any, Optional
+
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+
+from functions.yolo_api import YoloAPI, FrameResult, empty_result
+
+
+class InferenceWorker(QThread):
+    """
+    在独立线程中运行 YOLO 推理的工作线程。
+
+    GUI 线程通过 submit() 投递帧，工作线程推理完成后通过 result_ready 信号
+    把 FrameResult 送回 GUI 线程。待处理帧只保留最新的一帧：如果推理跟不上投递速度，
+    旧帧会被直接丢弃，GUI 永远只绘制最新完成的结果，定时器也不会再被推理阻塞。
+    """
+    # (FrameResult, tag)，tag 由调用方在 submit 时提供，原样带回
+    result_ready = Signal(object, object)
+    error = Signal(str)
+
+    def __init__(self, yolo_api: Optional[YoloAPI] = None, parent=None):
+        super().__init__(parent)
+        self._yolo = yolo_api
+        self._cond = threading.Condition()
+        self._pending: Optional[tuple[np.ndarray, Any, Optional[int]]] = None
+        self._busy = False
+        self._running = True
+        self.dropped_frames = 0
+
+    def set_model(self, yolo_api: Optional[YoloAPI]):
+        """切换推理使用的模型，下一帧开始生效。"""
+        with self._cond:
+            self._yolo = yolo_api
+
+    @property
+    def is_busy(self) -> bool:
+        """是否有帧正在推理或等待推理。"""
+        with self._cond:
+            return self._busy or self._pending is not None
+
+    def submit(self, frame: np.ndarray, tag: Any = None, frame_index: Optional[int] = None):
+        """
+        投递一帧等待推理。若上一帧尚未被取走，则用新帧覆盖它。
+
+        Args:
+            frame (np.ndarray): BGR 图像。
+            tag (Any): 附带的上下文（如会话编号、媒体路径），随结果一起返回。
+            frame_index (Optional[int]): 帧在视频中的真实序号，传给模型的 infer（跟踪模式按它计算轨迹的起止帧），
+                因为被覆盖的帧不会推理，不能在这里自行计数。
+        """
+        with self._cond:
+            if self._pending is not None:
+                self.dropped_frames += 1
+            self._pending = (frame, tag, frame_index)
+            self._cond.notify()
+
+    def clear(self):
+        """丢弃尚未开始推理的帧。"""
+        with self._cond:
+            self._pending = None
+
+    def stop(self):
+        """通知线程退出并等待其结束。"""
+        with self._cond:
+            self._running = False
+            self._pending = None
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame, tag, frame_index = self._pending
+                self._pending = None
+                yolo = self._yolo
+                self._busy = True
+
+            try:
+                if yolo is None:
+                    result = empty_result(frame)
+                else:
+                    frames = yolo.infer(frame) if frame_index is None else yolo.infer(frame, frame_index=frame_index)
+                    result = next(frames, None) or empty_result(frame)
+            except Exception as e:
+                self.error.emit(f"YOLO推理发生错误: {e}")
+                result = empty_result(frame)
+            finally:
+                with self._cond:
+                    self._busy = False
+
+            self.result_ready.emit(result, tag)
@@ -4,9 +4,13 @@ import os
 import numpy as np
 from PySide6.QtWidgets import QLabel
 from PySide6.QtGui import QPixmap, QImage
-from PySide6.QtCore import Qt
 from pathlib import Path
 from typing import Optional, Union
+from functions.perf_trace import TRACE
+from functions.draw_yolo import draw_boxes
+from functions.frame_prefetcher import ImagePrefetcher
+from functions.image_decode import decode_image
+from functions.frame_ring import FrameRing
 
 class MediaHandler:
     TYPE_NONE = 0
@@ -14,11 +18,30 @@ class MediaHandler:
     TYPE_VIDEO = 2 # 视频文件
     TYPE_SLIDESHOW = 3 # 图片文件夹幻灯片
 
-    def __init__(self, display_label: QLabel):
+    def __init__(self, display_label: QLabel, prefetch_lookahead: int = 4, prefetch_cache_mb: int = 512,
+                 decode_min_size: Optional[int] = None):
+        """
+        Args:
+            display_label (QLabel): 用于显示画面的 label。
+            prefetch_lookahead (int): 幻灯片模式下提前解码的图片张数。
+            prefetch_cache_mb (int): 幻灯片模式下已解码图片缓存的上限（MB）。
+            decode_min_size (Optional[int]): 图片降分辨率解码时长边的下限（通常为推理尺寸），
+                                             实际下限取它与显示区域长边中的较大者；None 表示总是全分辨率解码。
+        """
         if not isinstance(display_label, QLabel):
             raise TypeError("display_label 必须是一个 QLabel 实例。")
         self.display_label = display_label
+        self.prefetch_lookahead = prefetch_lookahead
+        self.prefetch_cache_mb = prefetch_cache_mb
+        self.decode_min_size = decode_min_size
+        self.frame_scale: float = 1.0 # 最近一次取出的帧相对原图的缩放比例
+        self._decode_target: Optional[int] = None
         self._last_drawn_pixmap: Optional[QPixmap] = None # 用于resizeEvent重绘
+        self._display_buffer: Optional[np.ndarray] = None # 复用的显示缓冲区，尺寸与 label 适配
+        self._last_boxes: Optional[list] = None
+        self._last_target_index: Optional[int] = None
+        self._last_box_scale: float = 1.0
+        self.frame_ring = FrameRing(slots=4) # 视频帧复用的缓冲区
         self._reset_state()
 
     def _reset_state(self):
@@ -26,6 +49,8 @@ class MediaHandler:
         self.media_list: list[Path] = []
         self.current_media_index: int = -1
         self.media_type: int = self.TYPE_NONE
+        self.prefetcher: Optional[ImagePrefetcher] = None
+        self.frame_index: Optional[int] = None # 视频最近读到的一帧的序号（从 0 开始），图片为 None
         self._last_drawn_frame_data: Optional[np.ndarray] = None # 存储最后绘制的原始帧数据，用于 draw_boxes 后的重绘
 
     def load(self, path_str: str, user_interval_ms: Optional[int] = None) -> int | None:
@@ -41,6 +66,7 @@ class MediaHandler:
                         如果加载失败，返回 None。
         """
         self.release()
+        self._update_decode_target()
 
         path = Path(path_str)
 
@@ -62,6 +88,7 @@ class MediaHandler:
                     self.display_label.setText("无法打开视频")
                     return None
                 self.media_type = self.TYPE_VIDEO
+                self.frame_index = -1
                 fps = self.cap.get(cv2.CAP_PROP_FPS)
                 # 视频文件使用其固有帧率，user_interval_ms目前不用于覆盖视频帧率
                 return int(1000 / fps) if fps > 0 else 33
@@ -77,6 +104,15 @@ class MediaHandler:
                 self.media_type = self.TYPE_SLIDESHOW
                 self.media_list = media_files # 存储 Path 对象列表
                 self.current_media_index = -1 # 第一次 get_next_frame 会递增到 0
+                self.prefetcher = ImagePrefetcher(
+                    media_files, self._decode_image,
+                    lookahead=self.prefetch_lookahead,
+                    cache_bytes=self.prefetch_cache_mb * 1024 * 1024,
+                    size_fn=lambda decoded: decoded[0].nbytes,
+                    # 解码尺寸随 label 大小变化，作为缓存键的一部分，窗口缩放后不会取到旧尺寸的结果
+                    variant_fn=lambda: self._decode_target,
+                )
+                self.prefetcher.prefetch(-1)
                 # 使用 user_interval_ms 作为幻灯片播放间隔，如果未提供或无效则默认2000ms
                 return user_interval_ms if user_interval_ms is not None and user_interval_ms > 0 else 2000
             else:
@@ -85,71 +121,134 @@ class MediaHandler:
         return None
 
     def get_next_frame(self) -> tuple[bool, np.ndarray | None]:
+        with TRACE.stage("decode"):
+            return self._read_next_frame()
+
+    def _read_next_frame(self) -> tuple[bool, np.ndarray | None]:
+        self.frame_scale = 1.0
         if self.media_type == self.TYPE_IMAGE:
             # 单张图片，只读取一次
             if self.current_media_index == 0:
                 self.current_media_index = -1 # 标记为已读取
                 path_to_read = self.media_list[0]
                 try:
-                    img_array = np.fromfile(path_to_read, dtype=np.uint8)
-                    frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                    return (frame is not None, frame)
+                    decoded = self._decode_image(path_to_read)
+                    if decoded is None:
+                        return (False, None)
+                    frame, self.frame_scale = decoded
+                    return (True, frame)
                 except Exception as e:
                     print(f"读取图片失败 '{path_to_read.name}': {e}")
                     return (False, None)
             return (False, None) # 已经读取过，不再提供帧
 
         elif self.media_type == self.TYPE_SLIDESHOW:
-            self.current_media_index = (self.current_media_index + 1) % len(self.media_list) # 循环播放
-            path_to_read = self.media_list[self.current_media_index]
-            try:
-                img_array = np.fromfile(path_to_read, dtype=np.uint8)
-                frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                return (frame is not None, frame)
-            except Exception as e:
-                print(f"读取图片失败 '{path_to_read.name}': {e}")
-                return (False, None)
+            return self.step_slideshow(1)
 
         elif self.media_type == self.TYPE_VIDEO:
             if self.cap and self.cap.isOpened():
-                return self.cap.read()
+                frame = self.frame_ring.read(self.cap)
+                if frame is not None:
+                    # 每读一帧计数一次，与之后推理时是否丢帧无关，是该帧在视频中的真实序号
+                    self.frame_index += 1
+                return (frame is not None, frame)
             return (False, None)
 
         return (False, None)
 
-    def draw_frame(self, frame: np.ndarray):
+    def step_slideshow(self, step: int = 1) -> tuple[bool, np.ndarray | None]:
+        """
+        幻灯片模式下前进（step > 0）或后退（step < 0）若干张，循环播放。
+        解码结果来自后台预解码缓存，并会沿移动方向继续预解码。
+        """
+        if self.media_type != self.TYPE_SLIDESHOW or not self.media_list:
+            return (False, None)
+        self.current_media_index = (self.current_media_index + step) % len(self.media_list)
+        decoded = self.prefetcher.get(self.current_media_index)
+        self.prefetcher.prefetch(self.current_media_index, 1 if step >= 0 else -1)
+        frame, self.frame_scale = decoded if decoded is not None else (None, 1.0)
+        return (frame is not None, frame)
+
+    def _update_decode_target(self):
+        """在 GUI 线程中计算降分辨率解码的长边下限（预解码线程只读取这个值）。"""
+        if self.decode_min_size is None:
+            self._decode_target = None
+        else:
+            label_long_side = max(self.display_label.width(), self.display_label.height())
+            self._decode_target = max(self.decode_min_size, label_long_side)
+
+    def _decode_image(self, path: Path, target: Optional[int] = -1) -> Optional[tuple[np.ndarray, float]]:
+        """
+        解码图片，JPEG 会按需降分辨率解码。返回 (图像, 相对原图的比例)，失败返回 None。
+        target 为降分辨率解码的长边下限（None 表示原尺寸），默认使用当前的 _decode_target。
+        """
+        frame, scale = decode_image(path, self._decode_target if target == -1 else target)
+        return (frame, scale) if frame is not None else None
+
+    def draw_frame(self, frame: np.ndarray, boxes: Optional[list] = None, target_index: Optional[int] = None,
+                   box_scale: float = 1.0):
+        """
+        把原始帧（以及可选的检测框）显示到 label 上。
+
+        先用 OpenCV 把帧一次性缩放到 label 大小的复用缓冲区，再在缩放后的缓冲区上画框，
+        最后以 BGR888 格式直接包装成 QImage，避免整帧的颜色转换和多次全尺寸复制。
+        box_scale 为框坐标到 frame 坐标的比例（frame 是降分辨率解码的图像时使用）。
+        """
         if not isinstance(frame, np.ndarray) or frame.size == 0: return
         self._last_drawn_frame_data = frame # 缓存原始帧数据
-        self._last_drawn_pixmap = self._frame_to_pixmap(frame) # 缓存pixmap
-        self._draw_scaled_pixmap()
+        self._last_boxes = boxes
+        self._last_target_index = target_index
+        self._last_box_scale = box_scale
+        self._render()
 
     def release(self):
         if self.cap: self.cap.release()
+        if self.prefetcher: self.prefetcher.close()
         self._reset_state()
+        self.frame_ring.reset()
         self._last_drawn_pixmap = None
         self.display_label.clear()
         self._last_drawn_frame_data = None # 清除缓存的帧数据
 
     def handle_resize(self):
-        self._draw_scaled_pixmap()
-
-    def _draw_scaled_pixmap(self):
-        if self._last_drawn_pixmap and not self._last_drawn_pixmap.isNull():
-            scaled_pm = self._last_drawn_pixmap.scaled(
-                self.display_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
-            )
-            self.display_label.setPixmap(scaled_pm)
-        else:
-            self.display_label.clear() # 如果没有可绘制的pixmap，则清空
+        self._update_decode_target()
+        self._render()
+
+    def _render(self):
+        frame = self._last_drawn_frame_data
+        if frame is None or frame.ndim != 3 or frame.shape[2] != 3:
+            self.display_label.clear() # 如果没有可绘制的帧，则清空
+            return
+        fh, fw = frame.shape[:2]
+        lw, lh = self.display_label.width(), self.display_label.height()
+        if lw < 1 or lh < 1:
+            return
+        scale = min(lw / fw, lh / fh)
+        dw, dh = max(1, int(fw * scale)), max(1, int(fh * scale))
+
+        with TRACE.stage("scale"):
+            buf = self._display_buffer
+            if buf is None or buf.shape[:2] != (dh, dw):
+                buf = self._display_buffer = np.empty((dh, dw, 3), dtype=np.uint8)
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            cv2.resize(frame, (dw, dh), dst=buf, interpolation=interpolation)
+
+        if self._last_boxes:
+            draw_boxes(buf, self._last_boxes, self._last_target_index, scale=scale * self._last_box_scale, copy=False)
+
+        self._last_drawn_pixmap = self._frame_to_pixmap(buf)
+        if self._last_drawn_pixmap is not None:
+            self.display_label.setPixmap(self._last_drawn_pixmap)
 
     @staticmethod
+    @TRACE.timed("to_pixmap")
     def _frame_to_pixmap(frame: np.ndarray) -> QPixmap | None:
         if frame.ndim == 3 and frame.shape[2] == 3:
             try:
-                rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
+                # 直接以 BGR888 包装 NumPy 缓冲区，无需 cvtColor；QPixmap.fromImage 是唯一一次复制
+                frame = np.ascontiguousarray(frame)
+                h, w, _ = frame.shape
+                qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
                 return QPixmap.fromImage(qt_image)
             except Exception as e:
                 print(f"帧到 QPixmap 转换失败: {e}")
@@ -0,0 +1,52 @@
+# functions/model_loader.py
+from pathlib import Path
+from typing import Union
+
+from PySide6.QtCore import QThread, Signal
+
+from functions.yolo_api import YoloAPI
+from functions.backends import PYTORCH
+from functions.process_pool import ProcessInferencePool
+
+
+class ModelLoaderThread(QThread):
+    """
+    在后台线程中加载（并预热）YOLO 模型，避免大权重文件加载时界面卡死。
+    processes > 0 时改为启动一个多进程推理池（ProcessInferencePool），loaded 带回的是推理池。
+
+    加载过程中通过 progress 信号报告当前阶段，成功后 loaded 信号带回 YoloAPI 实例，
+    失败时 failed 信号带回错误描述。信号都在 GUI 线程中处理。
+    """
+    progress = Signal(str)
+    loaded = Signal(object, object) # (YoloAPI, 模型路径 Path)
+    failed = Signal(object, str) # (模型路径 Path, 错误描述)
+
+    def __init__(self, model_path: Union[str, Path], device: str = "cpu", imgsz: int = 640,
+                 warmup: bool = True, backend: str = PYTORCH, processes: int = 0, parent=None):
+        super().__init__(parent)
+        self.model_path = Path(model_path)
+        self.device = device
+        self.imgsz = imgsz
+        self.warmup = warmup
+        self.backend = backend
+        self.processes = processes
+
+    def run(self):
+        self.progress.emit(f"正在加载模型 {self.model_path.name} ...")
+        try:
+            if self.processes > 0:
+                self.progress.emit(f"正在启动 {self.processes} 个推理进程 ...")
+                pool = ProcessInferencePool(self.model_path, workers=self.processes, device=self.device,
+                                            imgsz=self.imgsz, backend=self.backend)
+                self.loaded.emit(pool.start(), self.model_path)
+                return
+            instance = YoloAPI.create_instance(self.model_path, device=self.device, imgsz=self.imgsz,
+                                               warmup=self.warmup, progress=self.progress.emit,
+                                               backend=self.backend)
+        except Exception as e:
+            self.failed.emit(self.model_path, str(e))
+            return
+        if instance is None:
+            self.failed.emit(self.model_path, "请检查路径或模型文件是否损坏。")
+        else:
+            self.loaded.emit(instance, self.model_path)
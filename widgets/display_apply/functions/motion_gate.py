@@ -0,0 +1,119 @@
+# functions/motion_gate.py
+import threading
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+from functions.yolo_api import Detections, FrameResult
+from functions.perf_trace import TRACE
+
+_NO_SPEED = {'preprocess': 0, 'inference': 0, 'postprocess': 0}
+
+
+class MotionGate:
+    """
+    基于帧差的运动门控：把帧缩小成 size x size 的灰度图，与上一次真正推理时的参考帧逐像素比较，
+    差值超过 pixel_delta 的像素比例不到 threshold 时认为画面没有变化，可以复用上一次的结果。
+
+    与“上一次推理的帧”而不是“上一帧”比较，缓慢的变化也会逐渐累积并触发推理；
+    另外连续跳过 max_skip 帧后强制推理一次，避免光照等缓慢变化长期不被检测。
+    """
+    def __init__(self, threshold: float = 0.01, pixel_delta: int = 25, size: int = 64, max_skip: int = 50):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.max_skip = max_skip
+        self._reference: Optional[np.ndarray] = None
+        self._run = 0 # 当前连续跳过的帧数
+        self.inferred = 0
+        self.skipped = 0
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        # 先缩小再转灰度，转换只处理 size x size 个像素；轻微模糊抑制传感器噪声
+        small = cv2.resize(frame, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def changed(self, frame: np.ndarray, force: bool = False) -> bool:
+        """
+        判断 frame 相对参考帧是否有足够变化；返回 True 时该帧成为新的参考帧。
+        force=True 时无论如何都视为变化（例如还没有可复用的结果）。
+        """
+        thumb = self._thumbnail(frame)
+        if (force or self._reference is None or self._reference.shape != thumb.shape
+                or self._run >= self.max_skip):
+            moved = True
+        else:
+            diff = cv2.absdiff(thumb, self._reference)
+            moved = np.count_nonzero(diff > self.pixel_delta) >= self.threshold * diff.size
+        if moved:
+            self._reference = thumb
+            self._run = 0
+            self.inferred += 1
+        else:
+            self._run += 1
+            self.skipped += 1
+        return moved
+
+    def reset(self):
+        self._reference = None
+        self._run = 0
+        self.inferred = 0
+        self.skipped = 0
+
+    def stats(self) -> dict:
+        total = self.inferred + self.skipped
+        return {
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / total if total else 0.0,
+        }
+
+
+class MotionGatedModel:
+    """
+    在模型前加一道 MotionGate：画面没有变化时不运行推理，直接复用上一次的检测结果（raw_frame 换成当前帧）。
+    接口与 YoloAPI.infer 相同，可以直接交给 InferenceWorker / CameraYoloAPI；被包装的可以是 YoloAPI、
+    多进程推理池或 TrackingSession。结果额外包含 "skipped"（本帧是否复用了上次结果）。
+    其余关键字参数（如 frame_index）原样传给被包装模型的 infer。
+    """
+    def __init__(self, model, gate: Optional[MotionGate] = None):
+        self.model = model
+        self.gate = gate or MotionGate()
+        self.class_names = model.class_names
+        self.imgsz = model.imgsz
+        # 只保存上次的检测结果，不保存整帧，避免长期占用帧缓冲区
+        self._last_detections: Optional[Detections] = None
+        self._lock = threading.Lock()
+
+    def infer(self, source: np.ndarray, conf: float = 0.25, iou: float = 0.45, **kwargs) -> Iterator[FrameResult]:
+        if not isinstance(source, np.ndarray):
+            raise TypeError("MotionGatedModel.infer 只接受 np.ndarray 帧")
+        yield self.process(source, conf, iou, **kwargs)
+
+    def process(self, frame: np.ndarray, conf: float = 0.25, iou: float = 0.45, **kwargs) -> FrameResult:
+        with TRACE.stage("motion_gate"), self._lock:
+            detections = self._last_detections
+            moved = self.gate.changed(frame, force=detections is None)
+        if not moved:
+            return FrameResult(
+                {"raw_frame": frame, "detections": detections, "speed": _NO_SPEED, "skipped": True,
+                 "frame_index": kwargs.get("frame_index")},
+                lazy={"boxes": detections.to_boxes},
+            )
+
+        result = next(self.model.infer(frame, conf=conf, iou=iou, **kwargs))
+        result["skipped"] = False
+        with self._lock:
+            self._last_detections = result["detections"]
+        return result
+
+    def stats(self) -> dict:
+        return self.gate.stats()
+
+    def reset(self):
+        with self._lock:
+            self._last_detections = None
+            self.gate.reset()
@@ -0,0 +1,109 @@
+# functions/perf_trace.py
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, Union
+
+import numpy as np
+
+
+class PerfTrace:
+    """
+    轻量级的分阶段耗时记录器。
+
+    每条记录为 (时间戳, 阶段名, 耗时ms, 线程名)，保存在固定容量的环形缓冲区中，
+    旧记录会被自动覆盖，因此可以长期开启。可随时计算滚动 FPS 和各阶段 p95，
+    或把缓冲区导出为 JSONL 做离线分析。
+    """
+    def __init__(self, capacity: int = 5000, enabled: bool = True):
+        self.enabled = enabled
+        self._records: deque = deque(maxlen=capacity)
+        self._frames: deque = deque(maxlen=240) # 最近若干帧的完成时间戳，用于计算 FPS
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000, t0)
+
+    def stage(self, name: str):
+        """
+        以 with 语句记录一个阶段的耗时::
+
+            with TRACE.stage("decode"):
+                frame = cv2.imdecode(...)
+        """
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def timed(self, name: str):
+        """装饰器形式：记录被装饰函数每次调用的耗时。"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name: str, ms: float, ts: float = None):
+        """直接记录一个已知耗时的阶段。"""
+        if self.enabled:
+            self._records.append((ts if ts is not None else time.perf_counter(), name, ms,
+                                  threading.current_thread().name))
+
+    def mark_frame(self):
+        """标记一帧显示完成，用于计算滚动 FPS。"""
+        if self.enabled:
+            self._frames.append(time.perf_counter())
+
+    def fps(self, window_s: float = 2.0) -> float:
+        frames = list(self._frames)
+        if len(frames) < 2:
+            return 0.0
+        recent = [t for t in frames if t >= frames[-1] - window_s]
+        span = recent[-1] - recent[0]
+        return (len(recent) - 1) / span if span > 0 else 0.0
+
+    def summary(self, window_s: float = 5.0) -> Dict[str, Dict[str, float]]:
+        """最近 window_s 秒内各阶段的次数、均值、p50、p95（毫秒）。"""
+        now = time.perf_counter()
+        per_stage: Dict[str, list] = {}
+        for ts, name, ms, _ in list(self._records):
+            if ts >= now - window_s:
+                per_stage.setdefault(name, []).append(ms)
+        out = {}
+        for name, values in per_stage.items():
+            arr = np.asarray(values)
+            p50, p95 = np.percentile(arr, [50, 95])
+            out[name] = {"n": len(values), "mean": float(arr.mean()), "p50": float(p50), "p95": float(p95)}
+        return out
+
+    def format_hud(self) -> str:
+        """生成用于叠加显示的多行文本。"""
+        lines = [f"FPS {self.fps():5.1f}"]
+        for name, s in sorted(self.summary().items()):
+            lines.append(f"{name:<12} p95 {s['p95']:7.2f} ms")
+        return "\n".join(lines)
+
+    def dump(self, path: Union[str, Path]) -> Path:
+        """把环形缓冲区中的全部记录导出为 JSONL。"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for ts, name, ms, thread in list(self._records):
+                f.write(json.dumps({"ts": round(ts, 6), "stage": name, "ms": round(ms, 4), "thread": thread}) + "\n")
+        return path
+
+    def clear(self):
+        self._records.clear()
+        self._frames.clear()
+
+
+# 进程内共享的全局记录器
+TRACE = PerfTrace()
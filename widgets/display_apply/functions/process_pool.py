@@ -0,0 +1,356 @@
+# functions/process_pool.py
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import cv2
+import numpy as np
+
+from functions.yolo_api import FrameResult, Detections, IMAGE_EXTENSIONS, YoloAPI
+from functions.backends import PYTORCH
+from functions.image_decode import decode_image
+from functions.image_source import iter_image_paths, iter_parallel_ordered
+
+T = TypeVar("T")
+_PICKLED = -1 # 帧太大放不进共享内存槽位时，直接随任务一起序列化传递
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    # 由父进程负责 unlink；子进程不应再向 resource_tracker 登记，否则退出时会误报泄漏
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError: # Python < 3.13 没有 track 参数，附加后立即从 resource_tracker 注销
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix": # 只有 POSIX 的共享内存会登记到 resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _worker_main(worker_id: int, model_path: str, device: str, imgsz: int, backend: str,
+                 threads: int, batch_size: int, shm_name: str, slot_bytes: int,
+                 tasks: mp.Queue, results: mp.Queue):
+    """
+    工作进程：加载一份模型，从 tasks 取帧（可一次取多帧凑成一批），推理后只把 (N, 6) 检测数组送回。
+    """
+    if threads > 0:
+        os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    from functions.yolo_api import YoloAPI
+
+    shm = _attach_shm(shm_name)
+    try:
+        yolo = YoloAPI.create_instance(model_path, device=device, imgsz=imgsz, backend=backend, use_cache=False)
+        if yolo is None:
+            results.put(("error", worker_id, f"工作进程 {worker_id} 模型加载失败"))
+            return
+        results.put(("ready", worker_id, yolo.class_names))
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            batch = [task]
+            # 队列里已经有的任务一起推理，不等待
+            while len(batch) < batch_size:
+                try:
+                    task = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is None:
+                    tasks.put(None) # 留给本进程下一轮退出
+                    break
+                batch.append(task)
+
+            frames = []
+            for seq, slot, shape, dtype, payload, conf, iou in batch:
+                if slot == _PICKLED:
+                    frames.append(payload)
+                else:
+                    frames.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes))
+            # 同一批内 conf / iou 相同时一次推理，否则逐帧推理
+            outs = None
+            try:
+                if len({(t[5], t[6]) for t in batch}) == 1:
+                    outs = yolo._predict_batch(frames, batch[0][5], batch[0][6])
+                else:
+                    outs = [yolo._predict_one(f, t[5], t[6]) for f, t in zip(frames, batch)]
+                for (seq, slot, *_), out in zip(batch, outs):
+                    det = out["detections"]
+                    data = np.concatenate([det.xyxy, det.conf[:, None], det.cls[:, None].astype(np.float32)], axis=1)
+                    results.put(("result", seq, slot, data, out["speed"], None))
+            except Exception as e:
+                for seq, slot, *_ in batch:
+                    results.put(("result", seq, slot, None, None, f"{type(e).__name__}: {e}"))
+            del frames, outs # 释放对共享内存的引用，否则退出时无法关闭共享内存
+    finally:
+        shm.close()
+
+
+class ProcessInferencePool:
+    """
+    多进程推理池：N 个工作进程各自持有一份模型，充分利用多核 CPU。
+
+    帧通过一块 multiprocessing.shared_memory 环形槽位传递（父进程复制一次进槽位，
+    子进程零拷贝读取），进程间只传递槽位号和很小的检测数组，不序列化整帧图像。
+    槽位数有限，提交速度超过推理速度时 submit 会阻塞，内存占用固定。
+    结果按提交顺序返回；接口与 YoloAPI 的常用部分一致（infer / infer_batch / _predict_batch），
+    因此可直接交给 InferenceWorker、CameraYoloAPI、StreamManager 使用。
+    """
+    def __init__(self, model_path: Union[str, Path], workers: int = 0, device: str = "cpu",
+                 imgsz: int = 640, backend: str = PYTORCH, batch_size: int = 4,
+                 slots_per_worker: int = 2, max_frame_shape: Tuple[int, int, int] = (1080, 1920, 3),
+                 threads_per_worker: int = 0):
+        """
+        Args:
+            workers: 工作进程数，0 表示取 CPU 核数的四分之一（至少 1 个）。每个进程内部的 torch/ONNX 推理
+                本身就是多线程的，按 4 个计算线程一个进程分配，比“每核一个进程”的吞吐更高，
+                也避免每个进程各持一份模型造成的内存翻倍。
+            batch_size: 工作进程一次最多合并推理的帧数。
+            slots_per_worker: 每个进程的共享内存槽位数（即最多在途帧数）。
+            max_frame_shape: 单个槽位能容纳的最大帧，更大的帧退回到序列化传递。
+            threads_per_worker: 每个进程的计算线程数，0 表示 CPU 核数 / 进程数，避免线程过度竞争。
+        """
+        cpus = os.cpu_count() or 1
+        self.workers = workers if workers > 0 else max(1, cpus // 4)
+        self.model_path = str(model_path)
+        self.device = device
+        self.imgsz = imgsz
+        self.backend = f"{backend} x{self.workers}"
+        self._backend = backend
+        self.batch_size = max(1, batch_size)
+        self.threads = threads_per_worker if threads_per_worker > 0 else max(1, cpus // self.workers)
+        self.slot_bytes = int(np.prod(max_frame_shape))
+        self.n_slots = max(2, self.workers * slots_per_worker)
+        self.class_names: Dict[int, str] = {}
+
+        self._ctx = mp.get_context("spawn") # 与 Qt / torch 一起使用时 fork 不安全
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._tasks = None
+        self._results = None
+        self._procs: List[mp.Process] = []
+        self._free_slots: List[int] = []
+        self._frames: Dict[int, np.ndarray] = {} # 在途帧的原图，结果返回时作为 raw_frame
+        self._done: Dict[int, FrameResult] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    # ---------------- 生命周期 ----------------
+
+    def start(self, timeout: Optional[float] = None) -> 'ProcessInferencePool':
+        """启动工作进程并等待所有进程加载完模型。"""
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.n_slots)
+        self._free_slots = list(range(self.n_slots))
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        for i in range(self.workers):
+            p = self._ctx.Process(target=_worker_main, name=f"infer-proc{i}", daemon=True,
+                                  args=(i, self.model_path, self.device, self.imgsz, self._backend,
+                                        self.threads, self.batch_size, self._shm.name, self.slot_bytes,
+                                        self._tasks, self._results))
+            p.start()
+            self._procs.append(p)
+
+        ready, deadline = 0, None if timeout is None else time.monotonic() + timeout
+        while ready < self.workers:
+            try:
+                msg = self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.name for p in self._procs if not p.is_alive()]
+                if dead or (deadline is not None and time.monotonic() > deadline):
+                    self.close()
+                    raise RuntimeError(f"推理进程启动失败: {', '.join(dead)}" if dead else "等待推理进程加载模型超时")
+                continue
+            if msg[0] == "error":
+                self.close()
+                raise RuntimeError(msg[2])
+            if msg[0] == "ready":
+                self.class_names = msg[2]
+                ready += 1
+        print(f"推理进程池已就绪: {self.workers} 个进程, 每个 {self.threads} 线程, {self.n_slots} 个共享内存槽位")
+        return self
+
+    def close(self):
+        for _ in self._procs:
+            self._tasks.put(None)
+        for p in self._procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self._procs = []
+        if self._shm is not None:
+            self._shm.close()
+            if os.name == "posix" and sys.version_info < (3, 13):
+                # spawn 出的工作进程与父进程共用同一个 resource_tracker，工作进程注销时把父进程的登记也去掉了，
+                # unlink 前重新登记（重复登记无副作用），否则 tracker 会报 KeyError
+                resource_tracker.register(self._shm._name, "shared_memory")
+            self._shm.unlink()
+            self._shm = None
+        with self._lock:
+            self._frames.clear()
+            self._done.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------- 提交与取结果 ----------------
+
+    def submit(self, frame: np.ndarray, conf: float = 0.25, iou: float = 0.45) -> int:
+        """提交一帧，返回序号；没有空闲槽位时阻塞（期间会收取已完成的结果以释放槽位）。"""
+        frame = np.ascontiguousarray(frame)
+        fits = frame.nbytes <= self.slot_bytes
+        while True:
+            with self._lock:
+                if not fits or self._free_slots:
+                    seq = self._seq
+                    self._seq += 1
+                    slot = self._free_slots.pop() if fits else _PICKLED
+                    self._frames[seq] = frame
+                    break
+            self._collect_one(timeout=0.05)
+
+        if slot == _PICKLED:
+            self._tasks.put((seq, slot, frame.shape, frame.dtype.str, frame, conf, iou))
+        else:
+            view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+            np.copyto(view, frame)
+            self._tasks.put((seq, slot, frame.shape, frame.dtype.str, None, conf, iou))
+        return seq
+
+    def result(self, seq: int, timeout: Optional[float] = None) -> FrameResult:
+        """等待并取出序号为 seq 的结果。"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                if seq in self._done:
+                    return self._done.pop(seq)
+            if timeout is not None and waited >= timeout:
+                raise TimeoutError(f"等待第 {seq} 帧的推理结果超时")
+            self._collect_one(timeout=0.05)
+            waited += 0.05
+
+    def _collect_one(self, timeout: float):
+        try:
+            msg = self._results.get(timeout=timeout)
+        except queue.Empty:
+            dead = [p.name for p in self._procs if not p.is_alive()]
+            if dead:
+                raise RuntimeError(f"推理进程意外退出: {', '.join(dead)}")
+            return
+        _, seq, slot, data, speed, error = msg
+        with self._lock:
+            frame = self._frames.pop(seq, None)
+            if slot != _PICKLED:
+                self._free_slots.append(slot)
+            if error:
+                print(f"多进程推理发生错误: {error}")
+                data, speed = None, {'preprocess': 0, 'inference': 0, 'postprocess': 0}
+            self._done[seq] = self._make_result(frame, data, speed)
+
+    def _make_result(self, frame: np.ndarray, data: Optional[np.ndarray], speed: dict) -> FrameResult:
+        detections = (Detections.from_data(data, self.class_names) if data is not None
+                      else Detections.empty(self.class_names))
+
+        def annotate():
+            from functions.draw_yolo import draw_boxes
+            return draw_boxes(frame, detections.to_boxes())
+
+        return FrameResult(
+            {"raw_frame": frame, "detections": detections, "speed": speed},
+            lazy={"boxes": detections.to_boxes, "annotated_frame": annotate},
+        )
+
+    def imap(self, items: Iterable[T], frame_fn: Callable[[T], np.ndarray] = lambda x: x,
+             conf: float = 0.25, iou: float = 0.45) -> Iterator[Tuple[T, FrameResult]]:
+        """
+        流式推理：持续提交 frame_fn(item)，按输入顺序产出 (item, 结果)。
+        在途帧数受共享内存槽位数限制，与输入总量无关。
+        """
+        pending: List[Tuple[int, T]] = []
+        for item in items:
+            pending.append((self.submit(frame_fn(item), conf, iou), item))
+            # 最早提交的结果已经完成就先产出，保持在途数量不超过槽位数
+            while pending and (len(pending) >= self.n_slots or self._is_done(pending[0][0])):
+                seq, head = pending.pop(0)
+                yield head, self.result(seq)
+        for seq, item in pending:
+            yield item, self.result(seq)
+
+    def _is_done(self, seq: int) -> bool:
+        with self._lock:
+            return seq in self._done
+
+    # ---------------- 与 YoloAPI 兼容的接口 ----------------
+
+    def _predict_batch(self, frames: List[np.ndarray], conf: float, iou: float) -> List[FrameResult]:
+        """一批帧分发到各进程并行推理，按输入顺序返回。"""
+        return [result for _, result in self.imap(frames, conf=conf, iou=iou)]
+
+    def _predict_one(self, bgr: np.ndarray, conf: float, iou: float) -> FrameResult:
+        return self.result(self.submit(bgr, conf, iou))
+
+    def infer_batch(self, frames: Iterable[np.ndarray], conf: float = 0.25, iou: float = 0.45,
+                    batch_size: int = 8) -> Iterator[FrameResult]:
+        for _, result in self.imap(frames, conf=conf, iou=iou):
+            yield result
+
+    def infer(self, source: Union[str, int, Path, np.ndarray], conf: float = 0.25, iou: float = 0.45,
+              recursive: bool = False, workers: int = 4, frame_index: Optional[int] = None,
+              **_) -> Iterator[FrameResult]:
+        """
+        与 YoloAPI.infer 相同的输入：单帧 ndarray、图片文件、图片目录（结果含 "path"）、视频文件、摄像头编号或 RTSP 地址。
+        目录中的图片在 workers 个线程中解码后分给各进程推理；不支持 reduced_decode，图片总是按原分辨率解码。
+        frame_index 与 YoloAPI.infer 相同，原样记录在单帧结果中。
+        """
+        if isinstance(source, np.ndarray):
+            result = self._predict_one(source, conf, iou)
+            if frame_index is not None:
+                result["frame_index"] = frame_index
+            yield result
+            return
+        p = Path(source) if isinstance(source, (str, Path)) else None
+        if p is not None and p.is_dir():
+            yield from self._infer_directory(p, conf, iou, recursive, workers)
+        elif p is not None and p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS:
+            img, _ = decode_image(p)
+            if img is None:
+                raise ValueError(f"图片读取失败: {source}")
+            yield self._predict_one(img, conf, iou)
+        else:
+            if p is not None and not p.exists() and "rtsp://" not in str(source):
+                raise FileNotFoundError(f"指定的路径不存在: {source}")
+            cap = cv2.VideoCapture(source)
+            if not cap.isOpened():
+                raise ValueError(f"视频/摄像头打开失败: {source}")
+            try:
+                yield from self.infer_batch(YoloAPI._iter_capture(cap), conf, iou)
+            finally:
+                cap.release()
+
+    def _infer_directory(self, directory: Path, conf: float, iou: float,
+                         recursive: bool, workers: int) -> Iterator[FrameResult]:
+        def decode(path: Path):
+            try:
+                return decode_image(path)[0]
+            except Exception as e:
+                print(f"读取图片失败 '{path.name}': {e}")
+                return None
+
+        decoded = ((path, img) for path, img in iter_parallel_ordered(
+            iter_image_paths(directory, IMAGE_EXTENSIONS, recursive), decode,
+            workers=workers, max_inflight=max(2 * workers, self.n_slots)) if img is not None)
+        for (path, _), result in self.imap(decoded, frame_fn=lambda item: item[1], conf=conf, iou=iou):
+            result["path"] = str(path)
+            yield result
@@ -0,0 +1,198 @@
+# functions/result_sink.py
+import csv
+import json
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from functions.yolo_api import Detections
+
+# 所有导出格式共用的列；track_id / first_frame / last_frame 只有跟踪模式记录的轨迹才有，否则为空
+RESULT_COLUMNS = ["index", "source", "frame", "class_id", "class_name", "confidence", "x1", "y1", "x2", "y2",
+                  "track_id", "first_frame", "last_frame"]
+SINK_FORMATS = ("csv", "jsonl", "parquet")
+
+
+class ResultSink(ABC):
+    """
+    检测结果写出器的抽象基类。调用 write() 逐帧追加检测结果，close() 收尾。
+    支持 with 语句。子类必须实现 _write_rows()，否则无法实例化。
+    """
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rows_written = 0
+
+    def write(self, source: str, frame_index: Optional[int], detections: Detections,
+              frame_range: Optional[np.ndarray] = None):
+        """
+        追加一帧的所有检测结果。frame_range 为结束轨迹的 (N, 2) [起始帧, 结束帧]，
+        此时每行的 frame 取该轨迹的结束帧，frame_index 可以为 None。
+        """
+        if len(detections) == 0:
+            return
+        rows = self._to_rows(source, frame_index, detections, frame_range)
+        self._write_rows(rows)
+        self.rows_written += len(rows)
+
+    def _to_rows(self, source: str, frame_index: Optional[int], detections: Detections,
+                 frame_range: Optional[np.ndarray] = None) -> List[list]:
+        names = detections.names
+        start = self.rows_written + 1
+        n = len(detections)
+        track_ids = detections.track_id.tolist() if detections.track_id is not None else [None] * n
+        frames = frame_range.tolist() if frame_range is not None else [(None, None)] * n
+        return [
+            [start + i, source, frame_index if last is None else last, k, names.get(k, str(k)), round(c, 4),
+             round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1), tid, first, last]
+            for i, ((x1, y1, x2, y2), c, k, tid, (first, last)) in enumerate(
+                zip(detections.xyxy.tolist(), detections.conf.tolist(), detections.cls.tolist(), track_ids, frames))
+        ]
+
+    @abstractmethod
+    def _write_rows(self, rows: List[list]):
+        """把若干行（列顺序同 RESULT_COLUMNS）追加到输出。"""
+
+    def flush(self):
+        """把已写入的结果推到磁盘（程序崩溃时也不会丢失）。"""
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(ResultSink):
+    def __init__(self, path: Union[str, Path]):
+        super().__init__(path)
+        self._file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(RESULT_COLUMNS)
+
+    def _write_rows(self, rows: List[list]):
+        self._writer.writerows(rows)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class JsonlSink(ResultSink):
+    def __init__(self, path: Union[str, Path]):
+        super().__init__(path)
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _write_rows(self, rows: List[list]):
+        self._file.writelines(json.dumps(dict(zip(RESULT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    Parquet 写出器（需要 pyarrow）。结果先缓存在内存中，攒够 row_group_size 行，
+    或距上次写出超过 flush_interval_s 秒时，写出一个 row group。
+    注意 Parquet 的文件尾在 close() 时才写入，异常退出时文件不可读。
+    """
+    def __init__(self, path: Union[str, Path], row_group_size: int = 50_000, flush_interval_s: float = 30.0):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("写出 Parquet 需要安装 pyarrow: pip install pyarrow") from e
+        super().__init__(path)
+        self._pa = pa
+        self._schema = pa.schema([
+            ("index", pa.int64()), ("source", pa.string()), ("frame", pa.int64()),
+            ("class_id", pa.int32()), ("class_name", pa.string()), ("confidence", pa.float32()),
+            ("x1", pa.float32()), ("y1", pa.float32()), ("x2", pa.float32()), ("y2", pa.float32()),
+            ("track_id", pa.int32()), ("first_frame", pa.int64()), ("last_frame", pa.int64()),
+        ])
+        self._writer = pq.ParquetWriter(str(self.path), self._schema)
+        self._row_group_size = row_group_size
+        self._flush_interval_s = flush_interval_s
+        self._last_write = time.monotonic()
+        self._buffer: List[list] = []
+
+    def _write_rows(self, rows: List[list]):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self._row_group_size:
+            self._write_row_group()
+
+    def flush(self):
+        # 避免每次 flush 都产生很小的 row group
+        if time.monotonic() - self._last_write >= self._flush_interval_s:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        self._last_write = time.monotonic()
+        if not self._buffer:
+            return
+        columns = list(zip(*self._buffer))
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(col, type=field.type) for col, field in zip(columns, self._schema)],
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+        self._buffer = []
+
+    def close(self):
+        if self._writer is not None:
+            self._write_row_group()
+            self._writer.close()
+            self._writer = None
+
+
+_SINKS: Dict[str, type] = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def open_sink(path: Union[str, Path], fmt: Optional[str] = None) -> ResultSink:
+    """
+    根据格式（或文件后缀）创建对应的写出器。
+
+    Args:
+        path: 输出文件路径。
+        fmt: 'csv' / 'jsonl' / 'parquet'，为 None 时根据后缀推断，默认 csv。
+    """
+    if fmt is None:
+        suffix = Path(path).suffix.lower().lstrip(".")
+        fmt = {"json": "jsonl", "pq": "parquet"}.get(suffix, suffix)
+        if fmt not in _SINKS:
+            fmt = "csv"
+    if fmt not in _SINKS:
+        raise ValueError(f"不支持的输出格式: {fmt}，可选: {SINK_FORMATS}")
+    return _SINKS[fmt](path)
+
+
+def iter_records(sink: ResultSink) -> Iterator[Dict[str, Any]]:
+    """
+    读回 CSV / JSONL 写出器到目前为止写入的全部行，每行是以 RESULT_COLUMNS 为键的字典
+    （CSV 读回的值都是字符串）。Parquet 的文件尾在 close() 时才写入，无法中途读回，抛出 TypeError。
+    """
+    sink.flush()
+    if isinstance(sink, CsvSink):
+        with open(sink.path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    elif isinstance(sink, JsonlSink):
+        with open(sink.path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        raise TypeError(f"{type(sink).__name__} 不支持中途读回")
@@ -0,0 +1,64 @@
+# functions/stream_grid.py
+import math
+from typing import List
+
+from PySide6.QtWidgets import QWidget, QLabel, QGridLayout, QSizePolicy
+from PySide6.QtGui import QFont
+from PySide6.QtCore import Qt
+
+from functions.media_handler import MediaHandler
+from functions.yolo_api import FrameResult
+
+
+class StreamGridWidget(QWidget):
+    """
+    多路视频源的网格视图：每一路一个显示格，左上角叠加该路的 FPS 与延迟。
+    每个格子用各自的 MediaHandler 绘制，沿用单路显示的缩放缓冲与画框逻辑。
+    """
+    def __init__(self, count: int, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout = QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+        cols = math.ceil(math.sqrt(count))
+        caption_font = QFont("Consolas")
+        caption_font.setStyleHint(QFont.Monospace)
+        caption_font.setPointSize(8)
+
+        self.cells: List[MediaHandler] = []
+        self.captions: List[QLabel] = []
+        for i in range(count):
+            label = QLabel(self)
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+            label.setStyleSheet("background-color: black; color: gray;")
+            label.setText(f"视频源 {i}")
+            caption = QLabel(label)
+            caption.setStyleSheet("background-color: rgba(0, 0, 0, 150); color: #0f0; padding: 2px;")
+            caption.setFont(caption_font)
+            caption.move(2, 2)
+            layout.addWidget(label, i // cols, i % cols)
+            self.cells.append(MediaHandler(label, prefetch_lookahead=0))
+            self.captions.append(caption)
+
+    def show_result(self, stream_id: int, result: FrameResult):
+        self.cells[stream_id].draw_frame(result["raw_frame"], boxes=result["boxes"])
+
+    def update_stats(self, stats: List[dict]):
+        for s in stats:
+            caption = self.captions[s["stream_id"]]
+            state = {"opening": " [打开中]", "failed": " [打开失败]"}.get(s.get("state"), "" if s["alive"] else " [已断开]")
+            skipped = f" | 跳过 {s['skipped']}" if s.get("skipped") else ""
+            caption.setText(f"#{s['stream_id']} {s['fps']:.1f} FPS | {s['latency_ms']:.0f} ms{skipped}{state}")
+            caption.adjustSize()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        for cell in self.cells:
+            if cell.last_raw_frame is not None:
+                cell.handle_resize()
+
+    def release(self):
+        for cell in self.cells:
+            cell.release()
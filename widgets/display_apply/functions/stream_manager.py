@@ -0,0 +1,307 @@
+# functions/stream_manager.py
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+
+from functions.yolo_api import YoloAPI, FrameResult
+from functions.frame_ring import FrameRing
+from functions.motion_gate import MotionGate
+
+
+# 打开 / 读取视频源的超时（FFmpeg 等支持的后端生效）：采集线程最多阻塞这么久就能看到停止信号
+_OPEN_TIMEOUT_MS = 5000
+_READ_TIMEOUT_MS = 2000
+
+
+class _StreamReader:
+    """
+    单路视频源的采集线程。只保留最新的一帧，推理跟不上时旧帧直接被覆盖。
+    视频源在采集线程中打开（网络流可能要几秒），start() 立即返回，多路可以同时打开。
+    VideoCapture 不是线程安全的，打开、读取、释放都只在采集线程中进行。
+    """
+    OPENING, OPEN, FAILED, ENDED = "opening", "open", "failed", "ended"
+
+    def __init__(self, stream_id: int, source: Union[int, str], mirror_flip: bool = False):
+        self.stream_id = stream_id
+        self.source = source
+        self.mirror_flip = mirror_flip
+        self._lock = threading.Lock()
+        self._frame: Optional[np.ndarray] = None
+        self._frame_ts = 0.0
+        self._frame_index = -1 # 最新帧在该路采集中的序号（从 0 开始）
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.alive = False
+        self.state = self.ENDED
+        self.frame_ring = FrameRing(slots=4)
+        self.captured = 0
+        self.dropped = 0
+
+    def start(self, on_state: Optional[Callable[[int, bool], None]] = None):
+        """在后台线程中打开视频源并开始采集；打开成功或失败后以 (stream_id, 是否成功) 调用 on_state（在采集线程中）。"""
+        self._stop = threading.Event() # 每次启动用新的事件，已脱离的旧线程仍看到自己的停止信号
+        self.state = self.OPENING
+        self._thread = threading.Thread(target=self._run, args=(on_state, self._stop),
+                                        name=f"stream{self.stream_id}-capture", daemon=True)
+        self._thread.start()
+
+    def _open(self, stop: threading.Event) -> Optional[cv2.VideoCapture]:
+        cap = cv2.VideoCapture(self.source, cv2.CAP_ANY,
+                               [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, _OPEN_TIMEOUT_MS,
+                                cv2.CAP_PROP_READ_TIMEOUT_MSEC, _READ_TIMEOUT_MS])
+        if not cap.isOpened() or stop.is_set():
+            if not stop.is_set():
+                print(f"无法打开视频源: {self.source}")
+            cap.release()
+            return None
+        return cap
+
+    def _run(self, on_state: Optional[Callable[[int, bool], None]], stop: threading.Event):
+        cap = self._open(stop)
+        if cap is not None:
+            self.alive = True
+            self.state = self.OPEN
+            print(f"视频源 {self.source} 已打开。")
+        else:
+            self.state = self.ENDED if stop.is_set() else self.FAILED
+        if on_state is not None:
+            on_state(self.stream_id, cap is not None)
+        if cap is not None:
+            try:
+                self._loop(cap, stop)
+            finally:
+                cap.release()
+
+    def _loop(self, cap: cv2.VideoCapture, stop: threading.Event):
+        while not stop.is_set():
+            frame = self.frame_ring.read(cap)
+            if frame is None:
+                if not stop.is_set():
+                    print(f"视频源 {self.source} 信号丢失或结束。")
+                break
+            if self.mirror_flip:
+                frame = self.frame_ring.flip(frame, 1)
+            with self._lock:
+                if self._frame is not None:
+                    self.dropped += 1
+                self._frame = frame
+                self._frame_ts = time.perf_counter()
+                self._frame_index = self.captured
+                self.captured += 1
+        self.alive = False
+        self.state = self.ENDED
+
+    def take(self) -> Optional[tuple[np.ndarray, float, int]]:
+        """取走最新帧（及其采集时间、采集序号），没有新帧时返回 None。"""
+        with self._lock:
+            if self._frame is None:
+                return None
+            item = (self._frame, self._frame_ts, self._frame_index)
+            self._frame = None
+            return item
+
+    @property
+    def pending(self) -> bool:
+        return self.state == self.OPENING
+
+    def request_stop(self):
+        """只发出停止信号，不等待（多路同时停止时先全部发信号，再逐个等待）。"""
+        self._stop.set()
+
+    def stop(self):
+        """
+        通知采集线程停止并等待它退出。读取有超时，线程通常很快就会自己释放视频源；
+        个别后端不支持超时、线程仍阻塞在 read/open 中时不去碰它的 VideoCapture，让线程脱离，读取返回后自行释放。
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=(_OPEN_TIMEOUT_MS + _READ_TIMEOUT_MS) / 1000)
+            if self._thread.is_alive():
+                print(f"视频源 {self.source} 的采集线程仍阻塞，已脱离，读取返回后会自行释放。")
+            self._thread = None
+        self.alive = False
+        if self.state != self.FAILED:
+            self.state = self.ENDED
+
+
+class StreamManager:
+    """
+    多路视频源并发推理管理器。
+
+    每路视频源一个采集线程；推理线程（每个模型实例一个，可以共享同一个 YoloAPI，
+    也可以传入一个小的模型池或多进程推理池 ProcessInferencePool）轮流从各路取最新帧，凑成一批送入 model.predict，
+    因此每路都能公平地得到推理机会，且不会因为某一路帧率高而饿死其他路。
+    共享同一个 YOLO 对象的模型实例推理时会按模型加锁串行执行，模型池中的实例应以 use_cache=False 各自加载。
+    """
+    def __init__(self,
+                 models: Union[YoloAPI, Sequence[YoloAPI]],
+                 sources: Sequence[Union[int, str]],
+                 batch_size: Optional[int] = None,
+                 mirror_flip: bool = False,
+                 conf: float = 0.25,
+                 iou: float = 0.45,
+                 motion_gate: Optional[dict] = None):
+        self.models: List[YoloAPI] = list(models) if isinstance(models, (list, tuple)) else [models]
+        if not self.models:
+            raise ValueError("至少需要一个 YoloAPI 实例。")
+        self.sources = list(sources)
+        self.batch_size = batch_size or len(self.sources)
+        self.conf, self.iou = conf, iou
+        self.readers = [_StreamReader(i, src, mirror_flip) for i, src in enumerate(self.sources)]
+        self._results: Dict[int, FrameResult] = {}
+        self._fresh: set = set()
+        self._infer_times: Dict[int, deque] = {i: deque(maxlen=60) for i in range(len(self.sources))}
+        self._latency_ms: Dict[int, float] = {}
+        self._inferred: Dict[int, int] = {i: 0 for i in range(len(self.sources))}
+        # motion_gate 为 MotionGate 的参数字典时，每一路单独做运动门控：画面静止的帧不进批次，直接复用该路上次的检测结果
+        self._gates: Dict[int, MotionGate] = ({i: MotionGate(**motion_gate) for i in range(len(self.sources))}
+                                              if motion_gate is not None else {})
+        # 门控在管理器锁之外计算；多个推理线程可能拿到同一路相继的帧，每路的门控各自加锁
+        self._gate_locks: Dict[int, threading.Lock] = {i: threading.Lock() for i in self._gates}
+        self._lock = threading.Lock()
+        self._next_stream = 0 # 轮询起点，每批之后后移，保证公平
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    def start(self, on_source: Optional[Callable[[int, bool], None]] = None) -> int:
+        """
+        并发打开所有视频源（每路在自己的采集线程中打开，不阻塞调用线程）并启动推理线程，返回正在打开的路数。
+        每一路打开成功或失败后以 (stream_id, 是否成功) 调用 on_source；它在采集线程中被调用，
+        GUI 中请改为轮询 opened / pending / stats() 中的 "state"，或经信号转回主线程。
+        """
+        self._stop.clear()
+        for r in self.readers:
+            r.start(on_source)
+        self._workers = [threading.Thread(target=self._infer_loop, args=(model,), name=f"stream-infer{i}", daemon=True)
+                         for i, model in enumerate(self.models)]
+        for t in self._workers:
+            t.start()
+        return len(self.readers)
+
+    def stop(self):
+        self._stop.set()
+        for r in self.readers:
+            r.request_stop()
+        for t in self._workers:
+            t.join(timeout=2.0)
+        self._workers = []
+        for r in self.readers:
+            r.stop()
+
+    @property
+    def is_active(self) -> bool:
+        """还有视频源在采集或仍在打开中。"""
+        return any(r.alive or r.pending for r in self.readers)
+
+    @property
+    def opened(self) -> int:
+        """已成功打开的路数（包括之后断开的）。"""
+        return sum(1 for r in self.readers if r.state in (_StreamReader.OPEN, _StreamReader.ENDED))
+
+    @property
+    def pending(self) -> int:
+        """仍在打开中的路数。"""
+        return sum(1 for r in self.readers if r.pending)
+
+    def _collect_batch(self) -> List[tuple[int, np.ndarray, float, int]]:
+        """从各路轮流各取最多一帧，凑成一批；被运动门控判定为静止的帧直接发布复用结果，不进批次。"""
+        taken = []
+        with self._lock:
+            n = len(self.readers)
+            start = self._next_stream
+            for k in range(n):
+                reader = self.readers[(start + k) % n]
+                item = reader.take()
+                if item is not None:
+                    taken.append((reader.stream_id, *item))
+                    if len(taken) >= self.batch_size:
+                        self._next_stream = (reader.stream_id + 1) % n
+                        break
+            else:
+                self._next_stream = (start + 1) % n
+        if not self._gates:
+            return taken
+        # 缩略图与帧差在管理器锁之外计算，不阻塞其他推理线程发布结果
+        return [item for item in taken if not self._reuse_if_static(*item)]
+
+    def _reuse_if_static(self, stream_id: int, frame: np.ndarray, captured_at: float, frame_index: int) -> bool:
+        """（不持有 self._lock 时调用）画面相对该路上次推理的帧没有变化时，用上次的检测结果发布当前帧。"""
+        gate = self._gates.get(stream_id)
+        if gate is None:
+            return False
+        with self._lock:
+            last = self._results.get(stream_id)
+        with self._gate_locks[stream_id]:
+            moved = gate.changed(frame, force=last is None)
+        if moved:
+            return False
+        detections = last["detections"]
+        result = FrameResult(
+            {"raw_frame": frame, "detections": detections,
+             "speed": {'preprocess': 0, 'inference': 0, 'postprocess': 0}, "skipped": True},
+            lazy={"boxes": detections.to_boxes},
+        )
+        with self._lock:
+            self._publish(stream_id, result, captured_at, frame_index, time.perf_counter())
+        return True
+
+    def _publish(self, stream_id: int, result: FrameResult, captured_at: float, frame_index: int, now: float):
+        # 调用方需持有 self._lock
+        result["stream_id"] = stream_id
+        result["frame_index"] = frame_index
+        self._results[stream_id] = result
+        self._fresh.add(stream_id)
+        self._infer_times[stream_id].append(now)
+        self._latency_ms[stream_id] = (now - captured_at) * 1000
+
+    def _infer_loop(self, model: YoloAPI):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                if not self.is_active:
+                    return
+                time.sleep(0.002)
+                continue
+            try:
+                results = model._predict_batch([frame for _, frame, _, _ in batch], self.conf, self.iou)
+            except Exception as e:
+                print(f"多路推理发生错误: {e}")
+                continue
+            now = time.perf_counter()
+            with self._lock:
+                for (stream_id, _, captured_at, frame_index), result in zip(batch, results):
+                    self._publish(stream_id, result, captured_at, frame_index, now)
+                    self._inferred[stream_id] += 1
+
+    def get_latest_result(self, stream_id: int) -> Optional[FrameResult]:
+        """取出某一路最新的推理结果，自上次调用以来没有新结果时返回 None。"""
+        with self._lock:
+            if stream_id not in self._fresh:
+                return None
+            self._fresh.discard(stream_id)
+            return self._results.get(stream_id)
+
+    def stats(self) -> List[dict]:
+        """每一路的状态（opening/open/failed/ended）、出结果 FPS、端到端延迟（采集到出结果）以及采集/推理/门控跳过/丢帧计数。"""
+        out = []
+        with self._lock:
+            for r in self.readers:
+                times = self._infer_times[r.stream_id]
+                span = times[-1] - times[0] if len(times) > 1 else 0.0
+                out.append({
+                    "stream_id": r.stream_id,
+                    "source": r.source,
+                    "alive": r.alive,
+                    "state": r.state,
+                    "fps": (len(times) - 1) / span if span > 0 else 0.0,
+                    "latency_ms": self._latency_ms.get(r.stream_id, 0.0),
+                    "captured": r.captured,
+                    "inferred": self._inferred[r.stream_id],
+                    "skipped": self._gates[r.stream_id].skipped if self._gates else 0,
+                    "dropped": r.dropped,
+                })
+        return out
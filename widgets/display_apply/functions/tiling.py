@@ -0,0 +1,166 @@
+# functions/tiling.py
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from functions.yolo_api import Detections, FrameResult
+from functions.image_source import iter_parallel_ordered
+from functions.perf_trace import TRACE
+
+Tile = Tuple[int, int, int, int] # (x0, y0, x1, y1)
+IOU, IOS = "iou", "ios"
+
+
+def _axis_starts(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile) # 最后一块贴齐边缘，不留空白、也不越界
+    return starts
+
+
+def tile_grid(width: int, height: int, tile_size: int = 640, overlap: float = 0.2) -> List[Tile]:
+    """
+    把 width x height 的图像切成 tile_size 的方块，相邻块重叠 overlap 比例。
+    图像某一边小于 tile_size 时该方向只有一块（尺寸即图像尺寸）。
+    """
+    stride = max(1, int(tile_size * (1.0 - min(max(overlap, 0.0), 0.9))))
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in _axis_starts(height, tile_size, stride)
+            for x in _axis_starts(width, tile_size, stride)]
+
+
+def nms(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, threshold: float = 0.5,
+        metric: str = IOS, merge: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按类别的贪心 NMS（NumPy 实现，每次保留一个框、与其余框的重叠一次向量化算完）。
+
+    metric="ios"（交集 / 较小框面积）能去掉被块边缘截断的残框，"iou" 为普通 NMS。
+    merge=True 时保留的框扩展为它与被抑制框的外接框（SAHI 的 NMM），把跨块的目标拼回完整的框。
+    返回 (保留的索引, 对应的框坐标)。
+    """
+    n = len(conf)
+    if n == 0:
+        return np.zeros(0, np.int64), np.zeros((0, 4), np.float32)
+    # 按类别平移坐标，不同类别的框永远不重叠，一次 NMS 即可处理所有类别
+    offset = (cls.astype(np.float64) * (float(xyxy.max()) + 1.0))[:, None]
+    boxes = xyxy.astype(np.float64) + offset
+    areas = np.prod(np.clip(boxes[:, 2:] - boxes[:, :2], 0, None), axis=1)
+    order = np.argsort(-conf, kind="stable")
+    keep, kept_boxes = [], []
+    while order.size:
+        i, rest = order[0], order[1:]
+        tl = np.maximum(boxes[i, :2], boxes[rest, :2])
+        br = np.minimum(boxes[i, 2:], boxes[rest, 2:])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        if metric == IOS:
+            denom = np.minimum(areas[i], areas[rest])
+        else:
+            denom = areas[i] + areas[rest] - inter
+        suppressed = inter / np.maximum(denom, 1e-6) > threshold
+        box = xyxy[i].astype(np.float32)
+        if merge and suppressed.any():
+            group = xyxy[np.concatenate(([i], rest[suppressed]))]
+            box = np.concatenate((group[:, :2].min(axis=0), group[:, 2:].max(axis=0))).astype(np.float32)
+        keep.append(i)
+        kept_boxes.append(box)
+        order = rest[~suppressed]
+    return np.asarray(keep, np.int64), np.stack(kept_boxes)
+
+
+def merge_detections(parts: List[Detections], names: Dict[int, str], threshold: float = 0.5,
+                     metric: str = IOS, merge: bool = True) -> Detections:
+    """把各块（已换算到原图坐标）的检测结果拼接后做一次跨块 NMS。"""
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return Detections.empty(names)
+    xyxy = np.concatenate([p.xyxy for p in parts])
+    conf = np.concatenate([p.conf for p in parts])
+    cls = np.concatenate([p.cls for p in parts])
+    keep, boxes = nms(xyxy, conf, cls, threshold, metric, merge)
+    return Detections(boxes, conf[keep], cls[keep], names)
+
+
+def infer_tiled(model, image: np.ndarray, tile_size: int = 640, overlap: float = 0.2,
+                conf: float = 0.25, iou: float = 0.45, batch_size: int = 8, workers: int = 4,
+                merge_threshold: float = 0.5, merge_metric: str = IOS, include_full: bool = True,
+                stream: bool = True) -> Iterator[FrameResult]:
+    """
+    切块推理（SAHI 风格），适合远大于模型输入尺寸的图像（航拍、巡检大图），小目标不会因整图缩放而消失。
+
+    model 只需实现 _predict_batch / class_names / imgsz（YoloAPI、ProcessInferencePool 均可；
+    用推理池时各批切块会分给多个进程并行推理）。
+    切块（裁剪 + 缩放到模型输入尺寸）在 workers 个线程中并行准备，同时在内存中的切块最多
+    2*workers + batch_size 个，因此内存占用与图像大小无关（除了原图本身）。
+    include_full=True 时额外对缩小后的整图推理一次，保证大目标也能被完整检测。
+
+    stream=True 时每推理完一批就产出一个 "partial": True 的结果（目前为止合并好的检测），
+    最后产出 "partial": False 的最终结果；stream=False 时只产出最终结果。
+    结果另含 "tiles_done" / "tiles_total"。
+    """
+    h, w = image.shape[:2]
+    names = model.class_names
+    tiles: List[Optional[Tile]] = list(tile_grid(w, h, tile_size, overlap))
+    if include_full and len(tiles) > 1:
+        tiles.append(None) # None 表示整图
+    total = len(tiles)
+    imgsz = model.imgsz
+
+    def prepare(tile: Optional[Tile]) -> Tuple[np.ndarray, float]:
+        # 在工作线程中裁剪并缩放到模型输入尺寸；cv2.resize 释放 GIL，可以真正并行
+        crop = image if tile is None else image[tile[1]:tile[3], tile[0]:tile[2]]
+        scale = min(1.0, imgsz / max(crop.shape[:2]))
+        if scale < 1.0:
+            crop = cv2.resize(crop, (max(1, round(crop.shape[1] * scale)), max(1, round(crop.shape[0] * scale))),
+                              interpolation=cv2.INTER_AREA)
+        else:
+            crop = np.ascontiguousarray(crop)
+        return crop, scale
+
+    merged = Detections.empty(names)
+    speed = {'preprocess': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+    done = 0
+    batch: List[Tuple[Optional[Tile], np.ndarray, float]] = []
+
+    def run_batch() -> Detections:
+        nonlocal merged, done
+        results = model._predict_batch([crop for _, crop, _ in batch], conf, iou)
+        parts = [merged]
+        for (tile, _, scale), result in zip(batch, results):
+            for key in speed:
+                speed[key] += result["speed"].get(key, 0.0)
+            dets = result["detections"]
+            if len(dets):
+                x0, y0 = (0, 0) if tile is None else tile[:2]
+                xyxy = dets.xyxy / np.float32(scale) + np.array([x0, y0, x0, y0], np.float32)
+                parts.append(Detections(xyxy, dets.conf, dets.cls, names))
+        with TRACE.stage("tile_merge"):
+            # 增量合并：已合并的结果与本批结果再做一次 NMS，最终结果不必保存所有块的原始检测
+            merged = merge_detections(parts, names, merge_threshold, merge_metric)
+        done += len(batch)
+        batch.clear()
+        return merged
+
+    def make_result(partial: bool) -> FrameResult:
+        detections = merged
+        return FrameResult(
+            {"raw_frame": image, "detections": detections, "speed": dict(speed),
+             "partial": partial, "tiles_done": done, "tiles_total": total},
+            lazy={"boxes": detections.to_boxes},
+        )
+
+    t0 = time.perf_counter()
+    batch_size = max(1, int(batch_size))
+    for tile, (crop, scale) in iter_parallel_ordered(tiles, prepare, workers=workers,
+                                                     max_inflight=max(2 * workers, batch_size)):
+        batch.append((tile, crop, scale))
+        if len(batch) >= batch_size:
+            run_batch()
+            if stream and done < total:
+                yield make_result(True)
+    if batch:
+        run_batch()
+    TRACE.record("tiled_infer", (time.perf_counter() - t0) * 1000, t0)
+    yield make_result(False)
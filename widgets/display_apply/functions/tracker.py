@@ -0,0 +1,287 @@
+# functions/tracker.py
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from functions.yolo_api import YoloAPI, Detections, FrameResult
+
+_NO_SPEED = {'preprocess': 0, 'inference': 0, 'postprocess': 0}
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, 4) 与 (M, 4) 的 xyxy 框两两之间的 IoU，返回 (N, M)。"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(ious: np.ndarray, threshold: float) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """
+    按 IoU 从大到小贪心匹配（不依赖 scipy / lap），返回 (匹配对, 未匹配的行, 未匹配的列)。
+    """
+    n, m = ious.shape
+    matches = []
+    if n and m:
+        rows, cols = np.nonzero(ious >= threshold)
+        order = np.argsort(-ious[rows, cols], kind="stable")
+        used_r, used_c = set(), set()
+        for k in order:
+            r, c = int(rows[k]), int(cols[k])
+            if r in used_r or c in used_c:
+                continue
+            used_r.add(r)
+            used_c.add(c)
+            matches.append((r, c))
+    matched_r = {r for r, _ in matches}
+    matched_c = {c for _, c in matches}
+    return matches, [r for r in range(n) if r not in matched_r], [c for c in range(m) if c not in matched_c]
+
+
+@dataclass
+class Track:
+    track_id: int
+    xyxy: np.ndarray
+    cls: int
+    conf: float
+    first_frame: int
+    last_frame: int
+    velocity: np.ndarray = field(default_factory=lambda: np.zeros(4, np.float32))
+    hits: int = 1
+    misses: int = 0 # 连续多少次检测没有匹配上
+    best_conf: float = 0.0
+    best_xyxy: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        self.best_conf = self.conf
+        self.best_xyxy = self.xyxy.copy()
+
+    def predict(self, steps: int = 1):
+        """按匀速模型外推 steps 帧。"""
+        self.xyxy = self.xyxy + self.velocity * steps
+
+    def update(self, xyxy: np.ndarray, conf: float, frame_index: int, momentum: float = 0.6):
+        gap = max(1, frame_index - self.last_frame)
+        # 速度按两次检测之间的帧数平均，再做指数平滑，减少抖动
+        measured = (xyxy - (self.xyxy - self.velocity * gap)) / gap
+        self.velocity = momentum * self.velocity + (1 - momentum) * measured
+        self.xyxy = xyxy
+        self.conf = conf
+        self.last_frame = frame_index
+        self.hits += 1
+        self.misses = 0
+        if conf > self.best_conf:
+            self.best_conf = conf
+            self.best_xyxy = xyxy.copy()
+
+
+class ByteTracker:
+    """
+    ByteTrack 风格的轻量跟踪器（纯 NumPy，CPU）。
+
+    每次检测后：先用匀速模型外推所有轨迹，用高置信度检测按 IoU 匹配，
+    剩余的轨迹再与低置信度检测匹配（找回被遮挡、置信度下降的目标），
+    未匹配的高置信度检测新建轨迹，连续 max_misses 次未匹配的轨迹结束。
+    匹配只在同类别之间进行。没有检测的帧只做外推（propagate）。
+
+    命中次数不到 min_hits 就结束的轨迹（多为单帧误检）视为噪声，不会出现在 update()/reset() 的返回值里，
+    只计入 discarded；需要记录所有轨迹时传 min_hits=1。
+    """
+    def __init__(self, high_thresh: float = 0.25, low_thresh: float = 0.1, match_iou: float = 0.3,
+                 low_match_iou: float = 0.5, max_misses: int = 10, min_hits: int = 2):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.tracks: List[Track] = []
+        self._next_id = 1
+        self._last_predicted = 0 # tracks 的位置已外推到的帧号
+        self.discarded = 0 # 未确认就结束、被当作噪声丢弃的轨迹数
+
+    def _confirmed(self, ended: List[Track]) -> List[Track]:
+        confirmed = [t for t in ended if t.hits >= self.min_hits]
+        self.discarded += len(ended) - len(confirmed)
+        return confirmed
+
+    def reset(self) -> List[Track]:
+        """清空所有轨迹，返回被结束的（已确认的）轨迹。"""
+        ended = self._confirmed(self.tracks)
+        self.tracks = []
+        self._last_predicted = 0
+        return ended
+
+    def _predict_to(self, frame_index: int):
+        steps = frame_index - self._last_predicted
+        if steps > 0:
+            for t in self.tracks:
+                t.predict(steps)
+        self._last_predicted = frame_index
+
+    def _class_iou(self, tracks: List[Track], xyxy: np.ndarray, cls: np.ndarray) -> np.ndarray:
+        if not tracks or len(xyxy) == 0:
+            return np.zeros((len(tracks), len(xyxy)), np.float32)
+        ious = iou_matrix(np.stack([t.xyxy for t in tracks]), xyxy)
+        same_cls = np.array([t.cls for t in tracks])[:, None] == cls[None, :]
+        return np.where(same_cls, ious, 0.0)
+
+    def update(self, detections: Detections, frame_index: int) -> List[Track]:
+        """用第 frame_index 帧的检测结果更新轨迹，返回本次结束的（已确认的）轨迹。"""
+        self._predict_to(frame_index)
+        conf = detections.conf
+        high = conf >= self.high_thresh
+        low = (conf >= self.low_thresh) & ~high
+        hi_idx, lo_idx = np.nonzero(high)[0], np.nonzero(low)[0]
+
+        # 1. 所有轨迹 x 高置信度检测
+        matches, free_tracks, free_hi = greedy_match(
+            self._class_iou(self.tracks, detections.xyxy[hi_idx], detections.cls[hi_idx]), self.match_iou)
+        for ti, di in matches:
+            d = hi_idx[di]
+            self.tracks[ti].update(detections.xyxy[d], float(conf[d]), frame_index)
+
+        # 2. 剩余轨迹 x 低置信度检测
+        remaining = [self.tracks[i] for i in free_tracks]
+        matches2, still_free, _ = greedy_match(
+            self._class_iou(remaining, detections.xyxy[lo_idx], detections.cls[lo_idx]), self.low_match_iou)
+        for ti, di in matches2:
+            d = lo_idx[di]
+            remaining[ti].update(detections.xyxy[d], float(conf[d]), frame_index)
+
+        # 3. 未匹配的轨迹累计丢失次数，超过上限即结束
+        ended = []
+        for ti in still_free:
+            t = remaining[ti]
+            t.misses += 1
+            if t.misses > self.max_misses:
+                ended.append(t)
+        if ended:
+            ended_ids = {id(t) for t in ended}
+            self.tracks = [t for t in self.tracks if id(t) not in ended_ids]
+
+        # 4. 未匹配的高置信度检测建立新轨迹
+        for di in free_hi:
+            d = hi_idx[di]
+            self.tracks.append(Track(self._next_id, detections.xyxy[d].copy(), int(detections.cls[d]),
+                                     float(conf[d]), frame_index, frame_index))
+            self._next_id += 1
+        return self._confirmed(ended)
+
+    def propagate(self, frame_index: int):
+        """没有检测的帧：只按速度外推轨迹位置。"""
+        self._predict_to(frame_index)
+
+    def active(self, names: Dict[int, str]) -> Detections:
+        """当前可见（已确认且本轮没有丢失）的轨迹，作为带 track_id 的 Detections。"""
+        shown = [t for t in self.tracks if t.misses == 0 and t.hits >= self.min_hits]
+        if not shown:
+            return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                              np.zeros(0, np.int32), names, np.zeros(0, np.int32))
+        return Detections(np.stack([t.xyxy for t in shown]).astype(np.float32),
+                          np.array([t.conf for t in shown], np.float32),
+                          np.array([t.cls for t in shown], np.int32),
+                          names,
+                          np.array([t.track_id for t in shown], np.int32))
+
+
+def tracks_to_detections(tracks: List[Track], names: Dict[int, str]) -> Detections:
+    """把结束的轨迹汇总成每条轨迹一行（取置信度最高时的框）。"""
+    if not tracks:
+        return Detections.empty(names)
+    return Detections(np.stack([t.best_xyxy for t in tracks]).astype(np.float32),
+                      np.array([t.best_conf for t in tracks], np.float32),
+                      np.array([t.cls for t in tracks], np.int32),
+                      names,
+                      np.array([t.track_id for t in tracks], np.int32))
+
+
+class TrackingSession:
+    """
+    在 YoloAPI 之上的跟踪模式：每 detect_every 帧运行一次检测器，中间的帧只用轨迹速度外推框，
+    每个目标分配稳定的 track_id。接口与 YoloAPI.infer 相同，可以直接交给 InferenceWorker / CameraYoloAPI。
+
+    结果额外包含 "detected"（本帧是否运行了检测器）与 "frame_index"。结束的轨迹在推理线程中累积，
+    由 GUI 线程用 drain_finished() 取走，因此即使某些帧的结果被丢弃（只显示最新帧）也不会漏记。
+
+    frame_index 应为帧在视频/采集中的真实序号（由读取端计数）：InferenceWorker 只保留最新帧、
+    运动门控会跳过静止帧，送到这里的帧并不连续，轨迹的起止帧与外推步数都按真实序号计算。
+    不提供时按收到的帧依次编号。序号倒退（重新打开、跳转）时结束现有轨迹，重新开始跟踪。
+    """
+    def __init__(self, yolo: YoloAPI, detect_every: int = 1, **tracker_kwargs):
+        self.yolo = yolo
+        self.class_names = yolo.class_names
+        self.imgsz = yolo.imgsz
+        self.detect_every = max(1, detect_every)
+        self.tracker = ByteTracker(**tracker_kwargs)
+        self.frames_processed = 0
+        self.detector_runs = 0
+        self._next_index = 0 # 没有提供 frame_index 时使用的下一个序号
+        self._last_detect: Optional[int] = None # 上一次运行检测器的帧序号
+        self._finished: List[Track] = []
+        self._lock = threading.Lock()
+
+    def infer(self, source: np.ndarray, conf: float = 0.25, iou: float = 0.45,
+              frame_index: Optional[int] = None, **_) -> Iterator[FrameResult]:
+        if not isinstance(source, np.ndarray):
+            raise TypeError("TrackingSession.infer 只接受 np.ndarray 帧")
+        yield self.process(source, conf, iou, frame_index)
+
+    def process(self, frame: np.ndarray, conf: float = 0.25, iou: float = 0.45,
+                frame_index: Optional[int] = None) -> FrameResult:
+        with self._lock:
+            if frame_index is None:
+                frame_index = self._next_index
+            elif frame_index < self._next_index:
+                self._finished.extend(self.tracker.reset())
+                self._last_detect = None
+            self._next_index = frame_index + 1
+            self.frames_processed += 1
+            # 按真实帧距判断是否该运行检测器，跳过的帧也计入间隔
+            detect = self._last_detect is None or frame_index - self._last_detect >= self.detect_every
+            if detect:
+                self._last_detect = frame_index
+
+        speed = _NO_SPEED
+        if detect:
+            # 低置信度检测也要交给跟踪器做第二轮匹配，因此检测阈值取二者较小值
+            result = self.yolo._predict_one(frame, min(conf, self.tracker.low_thresh), iou)
+            speed = result["speed"]
+
+        # 推理不持锁，只有更新轨迹时持锁，避免与 GUI 线程的 drain_finished()/finish() 冲突
+        with self._lock:
+            if detect:
+                self._finished.extend(self.tracker.update(result["detections"], frame_index))
+                self.detector_runs += 1
+            else:
+                self.tracker.propagate(frame_index)
+            detections = self.tracker.active(self.class_names)
+
+        return FrameResult(
+            {
+                "raw_frame": frame,
+                "detections": detections,
+                "speed": speed,
+                "detected": detect,
+                "frame_index": frame_index,
+            },
+            lazy={"boxes": detections.to_boxes},
+        )
+
+    def drain_finished(self) -> List[Track]:
+        """取走自上次调用以来结束的（已确认的）轨迹。"""
+        with self._lock:
+            finished, self._finished = self._finished, []
+        return finished
+
+    def finish(self) -> List[Track]:
+        """结束所有仍在进行的轨迹（媒体停止时调用），连同尚未取走的一并返回。"""
+        with self._lock:
+            finished, self._finished = self._finished + self.tracker.reset(), []
+        return finished
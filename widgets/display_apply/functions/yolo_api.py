@@ -1,50 +1,298 @@
 # functions/yolo_api.py (增强后)
 
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union, Iterator, List, Optional, Dict
+from typing import Union, Iterator, Iterable, List, Optional, Dict, Callable, Any, Tuple, TYPE_CHECKING
 import numpy as np
 import cv2
-from ultralytics import YOLO
+from functions.perf_trace import TRACE
+from functions.image_decode import decode_image
+from functions.image_source import iter_image_paths, iter_parallel_ordered
+from functions.backends import PYTORCH, detect_backend, resolve_model_path
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
 
 # 定义更详细的返回类型
 Box = List[Union[float, int, str]] # [x1, y1, x2, y2, conf, cls_id, cls_name]
-FrameResult = Dict[str, Union[np.ndarray, List[Box], Dict, None]]
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv"}
+
+
+@dataclass
+class Detections:
+    """
+    列式存储的检测结果，每一列都是一整块 NumPy 数组。
+
+    xyxy: (N, 4) float32 边界框；conf: (N,) float32 置信度；cls: (N,) int32 类别 ID。
+    track_id: (N,) int32 跟踪 ID，只有跟踪模式下的结果才有，否则为 None。
+    """
+    xyxy: np.ndarray
+    conf: np.ndarray
+    cls: np.ndarray
+    names: Dict[int, str]
+    track_id: Optional[np.ndarray] = None
+
+    @classmethod
+    def empty(cls, names: Optional[Dict[int, str]] = None) -> 'Detections':
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32), names or {})
+
+    @classmethod
+    def from_data(cls, data: np.ndarray, names: Dict[int, str]) -> 'Detections':
+        """从 (N, 6) 的 [x1, y1, x2, y2, conf, cls] 数组构造。"""
+        data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+        return cls(data[:, :4], data[:, 4], data[:, 5].astype(np.int32), names)
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def scaled(self, factor: float) -> 'Detections':
+        """返回坐标乘以 factor 后的新结果（例如把降分辨率解码图上的框映射回原图）。"""
+        return Detections(self.xyxy * np.float32(factor), self.conf, self.cls, self.names, self.track_id)
+
+    def to_boxes(self) -> List[Box]:
+        """转换为旧版的 Box 列表（每个检测一个 Python list）。"""
+        names = self.names
+        return [[x1, y1, x2, y2, c, k, names.get(k, str(k))]
+                for (x1, y1, x2, y2), c, k in zip(self.xyxy.tolist(), self.conf.tolist(), self.cls.tolist())]
+
+
+class FrameResult(dict):
+    """
+    单帧推理结果。就是一个普通 dict，但部分键（如 "boxes"）可以延迟计算：
+    只有在第一次被访问时才会真正生成，之后缓存在字典里。
+
+    只有 result[key]、get()、in 会触发延迟计算。keys()/items()/values()、迭代、len() 以及
+    dict(result)、json.dumps(result) 都只包含已经生成的键，不含尚未访问的延迟键；
+    需要完整内容时先调用 materialize()。
+    """
+    def __init__(self, *args, lazy: Optional[Dict[str, Callable[[], Any]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lazy = lazy or {}
+
+    def __missing__(self, key):
+        factory = self._lazy.pop(key, None)
+        if factory is None:
+            raise KeyError(key)
+        value = factory()
+        self[key] = value
+        return value
+
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key) or key in self._lazy
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def materialize(self) -> 'FrameResult':
+        """生成所有尚未计算的延迟键，之后可以当作普通 dict 使用。"""
+        for key in list(self._lazy):
+            self[key]
+        return self
+
+
+def empty_result(frame: np.ndarray, names: Optional[Dict[int, str]] = None) -> FrameResult:
+    """构造一个没有任何检测框的结果，用于无模型或推理失败时。"""
+    return FrameResult({
+        "raw_frame": frame,
+        "detections": Detections.empty(names),
+        "boxes": [],
+        "speed": {'preprocess': 0, 'inference': 0, 'postprocess': 0},
+    })
+
+
+def rescale_result(result: FrameResult, decode_scale: float) -> FrameResult:
+    """
+    raw_frame 是按 decode_scale 缩小解码的图像时，把检测框映射回原图坐标。
+    结果中记录 "decode_scale"，在 raw_frame 上绘制时需要再乘回这个比例。
+    """
+    if decode_scale == 1.0:
+        return result
+    detections = result["detections"].scaled(1.0 / decode_scale)
+    lazy = {k: v for k, v in getattr(result, "_lazy", {}).items() if k != "boxes"}
+    lazy["boxes"] = detections.to_boxes
+    rescaled = FrameResult(
+        {k: v for k, v in result.items() if k not in ("detections", "boxes")},
+        lazy=lazy,
+    )
+    rescaled["detections"] = detections
+    rescaled["decode_scale"] = decode_scale
+    return rescaled
+
+
+def _load_yolo(weight: str) -> "YOLO":
+    # ultralytics（连同 torch）导入很慢，推迟到第一次真正加载模型时再导入
+    from ultralytics import YOLO
+    return YOLO(weight)
+
+
+_predict_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_predict_locks_guard = threading.Lock()
+
+
+def _predict_lock(model) -> threading.Lock:
+    """返回某个 YOLO 对象专属的推理锁；共享同一个 YOLO 对象的所有 YoloAPI 拿到的是同一把锁。"""
+    with _predict_locks_guard:
+        lock = _predict_locks.get(model)
+        if lock is None:
+            lock = _predict_locks[model] = threading.Lock()
+        return lock
+
+
+class _ModelCache:
+    """
+    进程内共享的模型缓存，键为 (权重绝对路径, 修改时间, 设备)，按 LRU 淘汰。
+    权重文件被覆盖（修改时间变化）后会重新加载。每个条目记录已预热过的推理尺寸。
+
+    线程约定：缓存返回的是同一个 YOLO 对象，而 Ultralytics 的 predictor 不是线程安全的。
+    YoloAPI 对每个 YOLO 对象的 predict 调用加同一把锁（见 _predict_lock），多个线程共享缓存中的模型是安全的，
+    但推理会被串行化；需要多线程真正并行推理时用 use_cache=False 各自加载，或使用 ProcessInferencePool。
+    """
+    def __init__(self, max_size: int = 3):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, int, str], Tuple[YOLO, set]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_file: Path, device: str) -> Tuple[str, int, str]:
+        resolved = model_file.resolve()
+        return str(resolved), resolved.stat().st_mtime_ns, str(device)
+
+    def get(self, key) -> Optional[Tuple["YOLO", set]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, model: "YOLO") -> Tuple["YOLO", set]:
+        with self._lock:
+            # 同一个文件的旧版本（修改时间不同）不会再被用到，直接移除
+            for stale in [k for k in self._entries if k[0] == key[0] and k[2] == key[2] and k != key]:
+                del self._entries[stale]
+            entry = self._entries.setdefault(key, (model, set()))
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(0, self.max_size):
+                old_key, _ = self._entries.popitem(last=False)
+                print(f"模型缓存已满，移除: {Path(old_key[0]).name} ({old_key[2]})")
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
 
 class YoloAPI:
     _global_infer_log = False
+    _model_cache = _ModelCache()
 
     @classmethod
     def set_global_logging(cls, enable: bool):
         print(f"--- [Global Setting] YOLO API logging set to: {enable} ---")
         cls._global_infer_log = enable
 
+    @classmethod
+    def set_model_cache_size(cls, size: int):
+        """设置进程内最多缓存的模型个数，0 表示不缓存。"""
+        cls._model_cache.max_size = size
+
+    @classmethod
+    def clear_model_cache(cls):
+        cls._model_cache.clear()
+
     @staticmethod
-    def create_instance(model_path: Union[str, Path], device: str = "cpu") -> Optional['YoloAPI']:
+    def create_instance(model_path: Union[str, Path], device: str = "cpu", imgsz: int = 640,
+                        use_cache: bool = True, warmup: bool = True,
+                        progress: Optional[Callable[[str], None]] = None,
+                        backend: str = PYTORCH) -> Optional['YoloAPI']:
+        """
+        加载模型并返回 YoloAPI 实例。
+
+        use_cache 为 True 时，同一权重文件（路径、修改时间、设备都相同）直接复用已加载的模型，
+        来回切换模型无需重新从磁盘构建。warmup 为 True 时用一帧空白图像预先推理一次，
+        使第一帧真实画面不再承担延迟初始化和层融合的开销；同一模型在同一尺寸下只预热一次。
+        progress 用于报告当前加载阶段（如在后台线程加载时更新界面上的状态文字）。
+        backend 为 onnx / openvino 时，.pt 会先被导出一次并缓存在权重旁边（见 functions.backends），
+        之后通过导出模型推理，输出与 pytorch 后端相同。
+
+        线程安全：从缓存复用时多个实例共享同一个 YOLO 对象，推理按模型加锁串行执行（见 _ModelCache）；
+        多个推理线程要并行时请传 use_cache=False，让每个线程拥有独立的模型。
+        """
+        report = progress or (lambda msg: None)
         model_file = Path(model_path)
-        if not model_file.is_file():
-            print(f"错误：模型文件不存在或不是一个文件: {model_file}")
+        if not model_file.exists():
+            print(f"错误：模型文件不存在: {model_file}")
             return None
         try:
-            print(f"正在从 {model_file.name} 加载YOLO模型...")
-            instance = YoloAPI(weight=str(model_file), device=device)
-            print("YOLO模型加载成功！")
+            model_file = resolve_model_path(model_file, backend, imgsz, progress=report)
+            key = _ModelCache.key(model_file, device)
+            entry = YoloAPI._model_cache.get(key) if use_cache else None
+            if entry is not None:
+                print(f"从缓存中复用YOLO模型: {model_file.name}")
+                model, warmed = entry
+            else:
+                print(f"正在从 {model_file.name} 加载YOLO模型...")
+                report(f"正在读取权重 {model_file.name} ...")
+                model = _load_yolo(str(model_file))
+                warmed = set()
+                if use_cache:
+                    model, warmed = YoloAPI._model_cache.put(key, model)
+                print("YOLO模型加载成功！")
+            instance = YoloAPI(device=device, imgsz=imgsz, model=model)
+            instance.backend = detect_backend(model_file)
+            if warmup and imgsz not in warmed:
+                report(f"正在预热模型 ({imgsz}x{imgsz}) ...")
+                instance.warmup()
+                warmed.add(imgsz)
             return instance
         except Exception as e:
             print(f"错误：YOLO模型初始化失败！ {e}")
             return None
 
-    def __init__(self, weight: str, device: str = "cpu"):
-        self.model = YOLO(weight)
+    def __init__(self, weight: Optional[str] = None, device: str = "cpu", imgsz: int = 640,
+                 model: Optional["YOLO"] = None):
+        """weight 与 model 二选一：model 为已加载（例如来自模型缓存）的 YOLO 对象。"""
+        if model is None:
+            if weight is None:
+                raise ValueError("必须提供 weight 或 model。")
+            model = _load_yolo(weight)
+        self.model = model
+        self._predict_lock = _predict_lock(model) # Ultralytics 的 predictor 不是线程安全的，同一模型的推理串行执行
+        self.backend = detect_backend(weight) if weight is not None else PYTORCH
         self.device = device
+        self.imgsz = imgsz # 推理尺寸，同时决定图片降分辨率解码的下限
         # ✅ 获取模型所有类别的名称
         self.class_names = self.model.names
 
-    def infer(self, source: Union[str, int, np.ndarray], conf: float = 0.25, iou: float = 0.45) -> Iterator[FrameResult]:
+    def warmup(self, runs: int = 1):
+        """用空白帧在推理尺寸上预先推理 runs 次，触发模型融合、设备搬运等一次性初始化。"""
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        t0 = time.perf_counter()
+        for _ in range(max(1, runs)):
+            with self._predict_lock:
+                self.model.predict(dummy, imgsz=self.imgsz, device=self.device, verbose=False)
+        print(f"模型预热完成，用时 {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    def infer(self, source: Union[str, int, np.ndarray], conf: float = 0.25, iou: float = 0.45,
+              batch_size: int = 1, reduced_decode: bool = False,
+              recursive: bool = False, workers: int = 4,
+              frame_index: Optional[int] = None) -> Iterator[FrameResult]:
+        """
+        reduced_decode 为 True 时，大尺寸 JPEG 按推理尺寸降分辨率解码，检测框仍为原图坐标，
+        此时 raw_frame 是缩小后的图像，结果中的 "decode_scale" 记录缩放比例。
+        recursive / workers 只对目录有效，见 infer_directory。
+        frame_index 为单帧在视频中的序号，原样记录在结果的 "frame_index" 中（视频源的结果自动编号）。
+        """
         # 注意：为了简化，这里的 mirror_flip 逻辑移到了主程序中
-        # ... infer 方法的其他部分保持不变 ...
         if isinstance(source, np.ndarray):
-            yield self._predict_one(source, conf, iou)
+            result = self._predict_one(source, conf, iou)
+            if frame_index is not None:
+                result["frame_index"] = frame_index
+            yield result
             return
 
         # 其他 source 类型的处理逻辑...
@@ -52,7 +300,7 @@ class YoloAPI:
         if isinstance(source, (str, Path)):
             p = Path(source)
             if p.is_dir():
-                # ... 目录处理逻辑
+                yield from self.infer_directory(p, conf, iou, batch_size, recursive, workers, reduced_decode)
                 return
             elif p.is_file():
                 if p.suffix.lower() not in IMAGE_EXTENSIONS:
@@ -65,34 +313,131 @@ class YoloAPI:
             cap = cv2.VideoCapture(source)
             if not cap.isOpened(): raise ValueError(f"视频/摄像头打开失败: {source}")
             try:
-                while True:
-                    ret, frame = cap.read()
-                    if not ret: break
-                    yield self._predict_one(frame, conf, iou)
+                for index, result in enumerate(self.infer_batch(self._iter_capture(cap), conf, iou, batch_size)):
+                    result["frame_index"] = index
+                    yield result
             finally:
                 cap.release()
         else: # 单张图片
-             img_array = np.fromfile(source, dtype=np.uint8)
-             img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+             img, scale = decode_image(source, self.imgsz if reduced_decode else None)
              if img is None: raise ValueError(f"图片读取失败: {source}")
-             yield self._predict_one(img, conf, iou)
+             yield rescale_result(self._predict_one(img, conf, iou), scale)
+
+    def infer_batch(self, frames: Iterable[np.ndarray], conf: float = 0.25, iou: float = 0.45,
+                    batch_size: int = 8) -> Iterator[FrameResult]:
+        """
+        将帧序列按 batch_size 分组，每组只调用一次 model.predict，并按输入顺序逐帧产出结果。
+
+        Args:
+            frames (Iterable[np.ndarray]): BGR 帧的可迭代对象（列表、生成器均可）。
+            batch_size (int): 每次送入模型的帧数，<=1 时退化为逐帧推理。
+
+        Yields:
+            FrameResult: 与输入帧一一对应的结果。
+        """
+        batch_size = max(1, int(batch_size))
+        batch: List[np.ndarray] = []
+        for frame in frames:
+            batch.append(frame)
+            if len(batch) >= batch_size:
+                yield from self._predict_batch(batch, conf, iou)
+                batch = []
+        if batch:
+            yield from self._predict_batch(batch, conf, iou)
+
+    def infer_tiled(self, source: Union[str, Path, np.ndarray], tile_size: int = 640, overlap: float = 0.2,
+                    conf: float = 0.25, iou: float = 0.45, batch_size: int = 8, workers: int = 4,
+                    merge_threshold: float = 0.5, include_full: bool = True,
+                    stream: bool = True) -> Iterator[FrameResult]:
+        """
+        对超大图像（如 8K 航拍图）做切块推理：重叠切块成批推理，跨块 NMS 合并，检测框为原图坐标。
+        图片按原分辨率解码（不做降分辨率解码）。参数与产出的结果见 functions.tiling.infer_tiled。
+        """
+        from functions.tiling import infer_tiled
+
+        if isinstance(source, np.ndarray):
+            image = source
+        else:
+            image = self.read_image(source)
+            if image is None:
+                raise ValueError(f"图片读取失败: {source}")
+        yield from infer_tiled(self, image, tile_size, overlap, conf, iou, batch_size, workers,
+                               merge_threshold, include_full=include_full, stream=stream)
+
+    @staticmethod
+    def read_image(path: Union[str, Path]) -> Optional[np.ndarray]:
+        """读取图片，支持包含非 ASCII 字符的路径。"""
+        img_array = np.fromfile(path, dtype=np.uint8)
+        return cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+
+    def infer_directory(self, directory: Union[str, Path], conf: float = 0.25, iou: float = 0.45,
+                        batch_size: int = 8, recursive: bool = False, workers: int = 4,
+                        reduced_decode: bool = False) -> Iterator[FrameResult]:
+        """
+        对目录中的图片做流式批量推理。
+
+        图片路径用 scandir 惰性列出（按文件名排序，可递归），在 workers 个线程中并行解码，
+        按原顺序分批送入模型。任意时刻只有有限张已解码图片在内存中，适合大目录的离线处理。
+        每个结果额外包含 "path" 键。
+        """
+        target = self.imgsz if reduced_decode else None
+
+        def decode(path: Path):
+            try:
+                return decode_image(path, target)
+            except Exception as e:
+                print(f"读取图片失败 '{path.name}': {e}")
+                return None, 1.0
+
+        batch_size = max(1, int(batch_size))
+        decoded = iter_parallel_ordered(iter_image_paths(directory, IMAGE_EXTENSIONS, recursive), decode,
+                                        workers=workers, max_inflight=max(2 * workers, batch_size))
+        batch: List[tuple] = []
+        for path, (img, scale) in decoded:
+            if img is None:
+                print(f"跳过无法读取的图片: {path.name}")
+                continue
+            batch.append((path, img, scale))
+            if len(batch) >= batch_size:
+                yield from self._predict_decoded(batch, conf, iou)
+                batch = []
+        if batch:
+            yield from self._predict_decoded(batch, conf, iou)
+
+    def _predict_decoded(self, batch: List[tuple], conf: float, iou: float) -> Iterator[FrameResult]:
+        results = self._predict_batch([img for _, img, _ in batch], conf, iou)
+        for (path, _, scale), result in zip(batch, results):
+            result = rescale_result(result, scale)
+            result["path"] = str(path)
+            yield result
+
+    @staticmethod
+    def _iter_capture(cap: cv2.VideoCapture) -> Iterator[np.ndarray]:
+        while True:
+            ret, frame = cap.read()
+            if not ret: break
+            yield frame
 
     # ✅ --- 核心修改：_predict_one 返回更丰富的数据 ---
     def _predict_one(self, bgr: np.ndarray, conf: float, iou: float) -> FrameResult:
         """
         对单帧图像进行预测，并返回一个包含所有详细信息的字典。
         """
-        results = self.model.predict(bgr, conf=conf, iou=iou, device=self.device, verbose=False)
-        r = results[0]
-
-        # 1. 提取详细的 boxes 信息
-        detailed_boxes = []
-        for box in r.boxes:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            cls_id = int(box.cls[0].item())
-            cls_name = self.class_names[cls_id]
-            confidence = box.conf[0].item()
-            detailed_boxes.append([x1, y1, x2, y2, confidence, cls_id, cls_name])
+        return self._predict_batch([bgr], conf, iou)[0]
+
+    def _predict_batch(self, frames: List[np.ndarray], conf: float, iou: float) -> List[FrameResult]:
+        """
+        对一组帧进行一次批量预测，返回与输入顺序一致的结果列表。
+        """
+        with TRACE.stage("predict"), self._predict_lock:
+            results = self.model.predict(frames, conf=conf, iou=iou, imgsz=self.imgsz, device=self.device, verbose=False)
+        with TRACE.stage("extract"):
+            return [self._to_frame_result(bgr, r) for bgr, r in zip(frames, results)]
+
+    def _to_frame_result(self, bgr: np.ndarray, r) -> FrameResult:
+        """把 Ultralytics 的单帧 Results 转换为 FrameResult 字典。"""
+        # 1. 一次性把所有框取成 NumPy 数组（N x [x1, y1, x2, y2, conf, cls]）
+        detections = Detections.from_data(r.boxes.data.cpu().numpy(), self.class_names)
 
         # 2. 提取处理速度
         speed = r.speed  # 这是一个字典, e.g., {'preprocess': 1.0, 'inference': 2.0, 'postprocess': 3.0}
@@ -100,10 +445,20 @@ class YoloAPI:
         if self.__class__._global_infer_log:
             print(f"    [Result] {r.verbose()}")
 
-        # 3. 返回包含所有信息的字典
-        return {
-            "raw_frame": bgr,  # 未经修改的原始帧
-            "annotated_frame": r.plot(), # 画了所有框的帧
-            "boxes": detailed_boxes, # 结构化的检测框数据
-            "speed": speed # 推理速度
-        }
\ No newline at end of file
+        # 3. 返回包含所有信息的字典。延迟键只引用已提取的检测结果和原始帧，
+        #    不持有 Ultralytics 的 Results（orig_img、框张量等），结果可以尽早释放
+        def annotate() -> np.ndarray:
+            from functions.draw_yolo import draw_boxes
+            return draw_boxes(bgr, detections.to_boxes())
+
+        return FrameResult(
+            {
+                "raw_frame": bgr,  # 未经修改的原始帧
+                "detections": detections, # 列式检测结果
+                "speed": speed # 推理速度
+            },
+            lazy={
+                "boxes": detections.to_boxes, # 旧版 Box 列表，首次访问时才生成
+                "annotated_frame": annotate, # 画了所有框的帧，GUI 自己画框，只在真正访问时才渲染
+            },
+        )
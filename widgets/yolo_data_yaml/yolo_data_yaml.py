@@ -3,7 +3,6 @@ from PySide6.QtWidgets import QApplication, QWidget, QFileDialog
 from .Ui_main import Ui_Form  # 导入你编译生成的 Ui_Form 类
 from functions.sub_dir_names_len import get_subfolders  # 导入 get_subfolders 函数
 from pathlib import Path
-import yaml
 
 results={"data_path":"", "class_num":0, "class_name":""}
 
@@ -67,6 +66,7 @@ class YoloDataYamlWidget(QWidget):
             "nc":    int(results["class_num"]) if results["class_num"].isdigit() else 0,
             "names": [s for s in results["class_name"]]
         }
+        import yaml # 只在生成 yaml 时才需要，不拖慢界面启动
         self.yaml_content = yaml.dump(self.yaml_dict, sort_keys=False, allow_unicode=True)
         self.ui.lb_show.setText(self.yaml_content)
 